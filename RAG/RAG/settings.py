@@ -130,11 +130,20 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
 import os
+import sys
 from dotenv import load_dotenv
 
 load_dotenv()
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+# SQLite database written by src/database/json_loader.py
+CREDIT_REPORTS_DB = os.getenv("CREDIT_REPORTS_DB", str(BASE_DIR.parent / "credit_reports.db"))
+
+# Shared modules of src/database (flat imports, as when run from that directory)
+CREDIT_DATABASE_DIR = BASE_DIR.parent / "src" / "database"
+if str(CREDIT_DATABASE_DIR) not in sys.path:
+    sys.path.append(str(CREDIT_DATABASE_DIR))
+
 # settings.py additions
 # WKHTMLTOPDF_PATH = r'C:/Program Files/wkhtmltopdf/binwkhtmltopdf.exe'  # Adjust path as needed
\ No newline at end of file
@@ -0,0 +1,146 @@
+import json
+import sqlite3
+from typing import Dict, List, Optional, Sequence
+
+
+class AccountRecord:
+    """
+    One account as the dispute pipeline sees it.
+
+    Only the fields the pipeline reads are loaded; every other column of
+    account_histories is fetched on first access to ``details`` and cached.
+    ``__slots__`` drops the per-instance dict, so a record costs a fixed
+    handful of pointers instead of a 40-key dict with nested JSON.
+    """
+    FIELDS = ('id', 'report_id', 'credit_bureau_id', 'furnisher_name', 'account_number',
+              'account_status', 'date_last_payment',
+              # Classification inputs, see classification_inputs.CLASSIFICATION_FIELDS
+              'payment_status', 'past_due', 'late_status', 'comments')
+    __slots__ = FIELDS + ('_details',)
+
+    def __init__(self, id, report_id, credit_bureau_id, furnisher_name, account_number,
+                 account_status, date_last_payment, payment_status=None, past_due=None,
+                 late_status=None, comments=None):
+        self.id = id
+        self.report_id = report_id
+        self.credit_bureau_id = credit_bureau_id
+        self.furnisher_name = furnisher_name
+        self.account_number = account_number
+        self.account_status = account_status
+        self.date_last_payment = date_last_payment
+        self.payment_status = payment_status
+        self.past_due = past_due
+        self.late_status = late_status
+        self.comments = comments
+        self._details = None
+
+    @classmethod
+    def select_list(cls, alias: str = '') -> str:
+        prefix = f"{alias}." if alias else ''
+        return ", ".join(prefix + name for name in cls.FIELDS)
+
+    @property
+    def details(self) -> Dict:
+        """Remaining account_histories columns, loaded once on first use."""
+        if self._details is None:
+            from .report_store import connect
+            conn = connect()
+            try:
+                self._details = load_account_details(conn, self.id)
+            finally:
+                conn.close()
+        return self._details
+
+    def get(self, name: str, default=None):
+        """Dict-style access, falling back to the lazily loaded details."""
+        if name in self.FIELDS:
+            return getattr(self, name)
+        return self.details.get(name, default)
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    def __repr__(self):
+        return f"AccountRecord(id={self.id}, furnisher_name={self.furnisher_name!r}, account_status={self.account_status!r})"
+
+
+# JSON text columns decoded when details are loaded
+_JSON_COLUMNS = {'payment_history', 'credit_contact'}
+
+
+def load_account_details(conn: sqlite3.Connection, account_id: int) -> Dict:
+    cursor = conn.execute("SELECT * FROM account_histories WHERE id = ?", (account_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return {}
+    details = {}
+    for (name, *_), value in zip(cursor.description, row):
+        if name in AccountRecord.FIELDS:
+            continue
+        if name in _JSON_COLUMNS and isinstance(value, str):
+            value = json.loads(value)
+        details[name] = value
+    return details
+
+
+def load_accounts(conn: sqlite3.Connection, report_id: int,
+                  statuses: Optional[Sequence[str]] = None) -> List[AccountRecord]:
+    """All accounts of a report as AccountRecords, optionally only some statuses."""
+    sql = f"SELECT {AccountRecord.select_list()} FROM account_histories WHERE report_id = ?"
+    params = [report_id]
+    if statuses:
+        sql += f" AND account_status IN ({', '.join('?' for _ in statuses)})"
+        params.extend(statuses)
+    return [AccountRecord(*row) for row in conn.execute(sql + " ORDER BY id", params)]
+
+
+def benchmark(json_path: str, db_path: str, report_id: int):
+    """
+    Compares the memory held per report by the JSON pipeline and by AccountRecords.
+
+    Three shapes are measured with tracemalloc: the parsed report JSON the
+    view used to keep, every account row as a full dict from the database,
+    and the AccountRecord list the pipeline uses now.
+    """
+    import gc
+    import tracemalloc
+
+    def measure(build):
+        gc.collect()
+        tracemalloc.start()
+        value = build()
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return value, current
+
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+
+    def load_report_json():
+        with open(json_path) as f:
+            return json.load(f)
+
+    def load_dicts():
+        cursor = conn.execute("SELECT * FROM account_histories WHERE report_id = ?", (report_id,))
+        names = [d[0] for d in cursor.description]
+        return [dict(zip(names, row)) for row in cursor]
+
+    report, json_bytes = measure(load_report_json)
+    dicts, dict_bytes = measure(load_dicts)
+    records, record_bytes = measure(lambda: load_accounts(conn, report_id))
+    conn.close()
+
+    json_accounts = len(report.get('report', {}).get('accountHistories', []))
+    print(f"Parsed report JSON:      {json_bytes / 1024:8.1f} KB ({json_accounts} accounts)")
+    print(f"Full account dicts:      {dict_bytes / 1024:8.1f} KB ({len(dicts)} accounts)")
+    print(f"AccountRecord list:      {record_bytes / 1024:8.1f} KB ({len(records)} accounts)")
+    if records:
+        print(f"Per account: {dict_bytes / len(dicts):.0f} B as dict, {record_bytes / len(records):.0f} B as record")
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 4:
+        print("Usage: python -m api.records REPORT_JSON CREDIT_REPORTS_DB REPORT_ID")
+        sys.exit(1)
+    benchmark(sys.argv[1], sys.argv[2], int(sys.argv[3]))
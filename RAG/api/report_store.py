@@ -0,0 +1,366 @@
+import base64
+import json
+import logging
+import sqlite3
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from django.conf import settings
+from classification_inputs import classification_inputs_hash
+from .records import AccountRecord, load_accounts
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Rows pulled from SQLite per fetch while a page is being streamed
+FETCH_SIZE = 200
+
+BUREAU_NAMES = {1: 'TransUnion', 2: 'Equifax', 3: 'Experian'}
+BUREAU_IDS = {name.lower(): bureau_id for bureau_id, name in BUREAU_NAMES.items()}
+
+
+def _bureau_id(value: str) -> int:
+    value = value.strip().lower()
+    if value.isdigit():
+        return int(value)
+    if value not in BUREAU_IDS:
+        raise ValueError(f"Unknown bureau: {value}")
+    return BUREAU_IDS[value]
+
+
+def _bureau_name(value: str) -> str:
+    # Inquiries store the bureau name ('TransUnion') rather than its id
+    return BUREAU_NAMES[_bureau_id(value)]
+
+
+@dataclass
+class Resource:
+    """
+    One list endpoint over a table of credit_reports.db.
+
+    ``fields`` maps output names to SQL expressions, ``filters`` maps query
+    parameters to a column and a converter for the raw parameter value. A
+    filter column containing ``{}`` is a condition template instead, with
+    the placeholders of the values substituted for ``{}``.
+    Fields listed in ``json_fields`` hold JSON text and are emitted as is.
+    """
+    source: str
+    key: str
+    fields: Dict[str, str]
+    default_fields: Sequence[str]
+    filters: Dict[str, Tuple[str, Callable[[str], object]]] = field(default_factory=dict)
+    json_fields: Sequence[str] = ()
+
+
+def _columns(prefix: str, names: Sequence[str]) -> Dict[str, str]:
+    return {name: f"{prefix}.{name}" for name in names}
+
+
+RESOURCES = {
+    'reports': Resource(
+        source="reports r LEFT JOIN report_overviews o ON o.report_id = r.id",
+        key="r.id",
+        fields={
+            'id': "r.id",
+            'slug': "r.slug",
+            **_columns('o', [
+                'consumer_name', 'transunion_score', 'equifax_score', 'experian_score',
+                'account_count', 'open_accounts', 'closed_accounts', 'derogatory_accounts',
+                'late_accounts', 'inquiry_count', 'public_records', 'has_derogatory',
+                'has_late_payments', 'status_counts',
+            ]),
+        },
+        default_fields=['id', 'slug', 'consumer_name', 'transunion_score', 'equifax_score',
+                        'experian_score', 'account_count', 'derogatory_accounts', 'late_accounts'],
+        filters={'slug': ("r.slug", str)},
+        json_fields=['status_counts'],
+    ),
+    'accounts': Resource(
+        source="account_histories a",
+        key="a.id",
+        fields=_columns('a', [
+            'id', 'report_id', 'credit_bureau_id', 'furnisher_name', 'account_number',
+            'account_type', 'account_detail', 'account_status', 'payment_status', 'monthly_payment',
+            'date_opened', 'balance', 'high_credit', 'credit_limit', 'past_due', 'late_status',
+            'last_reported', 'comments', 'date_last_active', 'date_last_payment',
+            'payment_history_start', 'payment_history_codes', 'class_type', 'credit_contact',
+        ]),
+        default_fields=['id', 'report_id', 'credit_bureau_id', 'furnisher_name', 'account_number',
+                        'account_status', 'balance', 'date_opened', 'date_last_payment'],
+        filters={
+            'report_id': ("a.report_id", int),
+            'status': ("a.account_status", str),
+            'bureau': ("a.credit_bureau_id", _bureau_id),
+        },
+        json_fields=['credit_contact'],
+    ),
+    'inquiries': Resource(
+        source="inquiries i",
+        key="i.id",
+        fields=_columns('i', [
+            'id', 'report_id', 'creditor_name', 'type_of_business', 'date_of_inquiry',
+            'credit_bureau', 'bureau_dispute_status', 'creditor_dispute_status', 'credit_contact',
+        ]),
+        default_fields=['id', 'report_id', 'creditor_name', 'date_of_inquiry', 'credit_bureau'],
+        filters={
+            'report_id': ("i.report_id", int),
+            'bureau': ("i.credit_bureau", _bureau_name),
+        },
+        json_fields=['credit_contact'],
+    ),
+    'contacts': Resource(
+        source="credit_contacts c",
+        key="c.id",
+        fields={
+            **_columns('c', [
+                'id', 'user_id', 'creditor_name', 'address', 'address_line', 'city', 'state',
+                'zipcode', 'phone', 'fax_number',
+            ]),
+            'provider_report_id': "c.report_id",
+        },
+        default_fields=['id', 'creditor_name', 'address', 'city', 'state', 'zipcode', 'phone'],
+        filters={
+            # credit_contacts keeps the provider's report id, see reports.provider_report_id
+            'report_id': ("c.report_id IN (SELECT provider_report_id FROM reports WHERE id IN ({}))", int),
+            'creditor': ("c.creditor_name", str),
+        },
+    ),
+}
+
+
+def encode_cursor(key: int) -> str:
+    return base64.urlsafe_b64encode(str(key).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+
+def connect(db_path: Optional[str] = None, readonly: bool = True) -> sqlite3.Connection:
+    """Connection to credit_reports.db; read-only ones are safe to hand to a streaming response."""
+    db_path = db_path or settings.CREDIT_REPORTS_DB
+    mode = "ro" if readonly else "rw"
+    return sqlite3.connect(f"file:{db_path}?mode={mode}", uri=True, check_same_thread=False)
+
+
+@dataclass
+class PageQuery:
+    resource: Resource
+    fields: List[str]
+    sql: str
+    params: List
+    limit: int
+
+
+def build_query(resource_name: str, params, fixed: Optional[Dict[str, str]] = None) -> PageQuery:
+    """
+    Builds the keyset query for one page of a resource from request parameters.
+
+    Args:
+        resource_name (str): Key of RESOURCES.
+        params: Query parameters (a QueryDict or a plain dict).
+        fixed (Dict[str, str], optional): Filters taken from the URL, e.g. report_id.
+
+    Raises:
+        ValueError: On unknown fields, bad filter values or a malformed cursor.
+    """
+    resource = RESOURCES[resource_name]
+
+    requested = params.get('fields')
+    fields = [f.strip() for f in requested.split(',') if f.strip()] if requested else list(resource.default_fields)
+    unknown = [f for f in fields if f not in resource.fields]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+
+    try:
+        limit = min(int(params.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+    except ValueError:
+        raise ValueError("limit must be a number")
+    if limit < 1:
+        raise ValueError("limit must be positive")
+
+    conditions, values = [], []
+    filters = {name: params.getlist(name) if hasattr(params, 'getlist') else [params[name]]
+               for name in resource.filters if params.get(name)}
+    for name, value in (fixed or {}).items():
+        filters[name] = [value]
+    for name, raw_values in filters.items():
+        column, convert = resource.filters[name]
+        try:
+            converted = [convert(v) for v in raw_values]
+        except (ValueError, KeyError):
+            raise ValueError(f"Invalid value for {name}")
+        placeholders = ', '.join('?' for _ in converted)
+        conditions.append(column.format(placeholders) if '{}' in column else f"{column} IN ({placeholders})")
+        values.extend(converted)
+
+    cursor = params.get('cursor')
+    if cursor:
+        conditions.append(f"{resource.key} > ?")
+        values.append(decode_cursor(cursor))
+
+    # The key is always selected last so the next cursor is known without
+    # forcing 'id' into the projection
+    select = ", ".join([resource.fields[f] for f in fields] + [resource.key])
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    sql = f"SELECT {select} FROM {resource.source}{where} ORDER BY {resource.key} LIMIT ?"
+    values.append(limit + 1)
+    return PageQuery(resource, fields, sql, values, limit)
+
+
+def _encode_row(names: Sequence[str], row: Sequence, json_fields) -> str:
+    parts = []
+    for name, value in zip(names, row):
+        if name in json_fields and value is not None:
+            encoded = value if isinstance(value, str) else json.dumps(value)
+        else:
+            encoded = json.dumps(value)
+        parts.append(f"{json.dumps(name)}:{encoded}")
+    return "{" + ",".join(parts) + "}"
+
+
+def stream_page(query: PageQuery, conn: sqlite3.Connection) -> Iterator[str]:
+    """
+    Streams one page as a JSON document: ``{"results": [...], "next_cursor": ...}``.
+
+    Rows are encoded one at a time straight from the cursor, so the page is
+    never materialized as a list of dicts. The connection is closed once the
+    page has been written.
+    """
+    try:
+        cursor = conn.execute(query.sql, query.params)
+        json_fields = set(query.resource.json_fields)
+        yield '{"results":['
+        written, last_key, has_more = 0, None, False
+        while not has_more:
+            rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                if written == query.limit:
+                    has_more = True
+                    break
+                yield ("," if written else "") + _encode_row(query.fields, row[:-1], json_fields)
+                last_key = row[-1]
+                written += 1
+        next_cursor = encode_cursor(last_key) if has_more else None
+        yield f'],"count":{written},"next_cursor":{json.dumps(next_cursor)}}}'
+    finally:
+        conn.close()
+
+
+def fetch_one(resource_name: str, key: int, fields: Optional[Sequence[str]] = None,
+              conn: Optional[sqlite3.Connection] = None) -> Optional[Dict]:
+    """Single row of a resource by id, or None. A connection passed in is left open."""
+    resource = RESOURCES[resource_name]
+    fields = list(fields or resource.fields)
+    select = ", ".join(resource.fields[f] for f in fields)
+    own_conn = conn is None
+    if own_conn:
+        conn = connect()
+    try:
+        row = conn.execute(f"SELECT {select} FROM {resource.source} WHERE {resource.key} = ?", (key,)).fetchone()
+    finally:
+        if own_conn:
+            conn.close()
+    if row is None:
+        return None
+    result = dict(zip(fields, row))
+    for name in resource.json_fields:
+        if isinstance(result.get(name), str):
+            result[name] = json.loads(result[name])
+    return result
+
+
+def resolve_report_id(conn: sqlite3.Connection, report_id=None, slug: Optional[str] = None) -> Optional[int]:
+    """Local report id from an id or a slug, or None when no such report exists."""
+    if report_id is not None:
+        row = conn.execute("SELECT id FROM reports WHERE id = ?", (int(report_id),)).fetchone()
+    else:
+        row = conn.execute("SELECT id FROM reports WHERE slug = ? ORDER BY id DESC LIMIT 1", (slug,)).fetchone()
+    return row[0] if row else None
+
+
+def accounts_by_status(conn: sqlite3.Connection, report_id: int, statuses: Sequence[str]) -> Dict[str, AccountRecord]:
+    """
+    First account of a report for each of the given statuses.
+
+    One query over the (report_id, account_status) index, fetching only
+    the AccountRecord fields, replaces walking every account of the report.
+
+    Returns:
+        Dict[str, AccountRecord]: Accounts keyed by account status.
+    """
+    statuses = list(dict.fromkeys(statuses))
+    if not statuses:
+        return {}
+    accounts = {}
+    for account in load_accounts(conn, report_id, statuses):
+        accounts.setdefault(account.account_status, account)
+    return accounts
+
+
+def _first(value):
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return value
+    if isinstance(value, list):
+        return value[0] if value else ""
+    return value or ""
+
+
+def personal_details(conn: sqlite3.Connection, report_id: int) -> Optional[Dict]:
+    """Name, current address and bureau name from a report's first personal information row."""
+    row = conn.execute(
+        "SELECT name, current_addresses, credit_reporting_agency FROM personal_information "
+        "WHERE report_id = ? ORDER BY id LIMIT 1",
+        (report_id,),
+    ).fetchone()
+    if row is None:
+        return None
+    name, addresses, agency = row
+    agency = json.loads(agency) if isinstance(agency, str) else agency
+    return {
+        'name': _first(name),
+        'address': _first(addresses),
+        'credit_bureau_name': (agency or {}).get('name', ""),
+    }
+
+
+def stored_classification(conn: sqlite3.Connection, account_id: int, inputs_hash: str) -> Optional[Dict]:
+    """
+    Classification already on record for an account and classifier inputs.
+
+    Rows come from earlier requests or are carried forward from the
+    consumer's previous report by report_diff.
+    """
+    try:
+        row = conn.execute(
+            "SELECT category, reason FROM account_classifications "
+            "WHERE account_id = ? AND inputs_hash = ? ORDER BY id DESC LIMIT 1",
+            (account_id, inputs_hash),
+        ).fetchone()
+    except sqlite3.OperationalError:
+        # Database predates account_classifications
+        return None
+    return {'category': row[0], 'reason': row[1]} if row else None
+
+
+def save_classification(conn: sqlite3.Connection, account: AccountRecord, inputs_hash: str, result: Dict):
+    """Records a classification on a writable connection (see connect(readonly=False))."""
+    try:
+        with conn:
+            conn.execute(
+                "INSERT INTO account_classifications "
+                "(account_id, report_id, inputs_hash, category, reason, created_at) "
+                "VALUES (?, ?, ?, ?, ?, datetime('now'))",
+                (account.id, account.report_id, inputs_hash, result.get('category'), result.get('reason')),
+            )
+    except sqlite3.Error as e:
+        logger.warning(f"Could not store classification of account {account.id}: {e}")
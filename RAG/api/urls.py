@@ -1,8 +1,16 @@
 from django.urls import path
-from .views import ProcessView
+from .views import ProcessView, CreditReportListView, CreditReportDetailView
 
 urlpatterns = [
     path("process/", ProcessView.as_view(), name="process"),
+    path("reports/", CreditReportListView.as_view(resource="reports"), name="reports"),
+    path("reports/<int:report_id>/", CreditReportDetailView.as_view(), name="report-detail"),
+    path("reports/<int:report_id>/accounts/", CreditReportListView.as_view(resource="accounts"), name="report-accounts"),
+    path("reports/<int:report_id>/inquiries/", CreditReportListView.as_view(resource="inquiries"), name="report-inquiries"),
+    path("reports/<int:report_id>/contacts/", CreditReportListView.as_view(resource="contacts"), name="report-contacts"),
+    path("accounts/", CreditReportListView.as_view(resource="accounts"), name="accounts"),
+    path("inquiries/", CreditReportListView.as_view(resource="inquiries"), name="inquiries"),
+    path("contacts/", CreditReportListView.as_view(resource="contacts"), name="contacts"),
 ]
 
 ##
\ No newline at end of file
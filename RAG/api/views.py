@@ -1,15 +1,17 @@
 import json
 import os
 import base64
+import sqlite3
 import pdfkit  
 import google.generativeai as genai
 from django.conf import settings
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from .models import Process
 from .serializers import ProcessSerializer
+from . import report_store
 import markdown
 import logging
 
@@ -112,6 +114,50 @@ with personalized and detailed reasons based on the account data provided.
         response = model.generate_content(prompt)
         return response.text
 
+class CreditReportListView(APIView):
+    """
+    Keyset-paginated list of one resource of credit_reports.db.
+
+    Query parameters:
+     - fields: comma separated projection, see report_store.RESOURCES
+     - limit: page size (max report_store.MAX_PAGE_SIZE)
+     - cursor: next_cursor of the previous page
+     - report_id, status, bureau, slug, creditor: filters, where the resource supports them
+    """
+    resource = None
+
+    def get(self, request, report_id=None, format=None):
+        fixed = {'report_id': str(report_id)} if report_id is not None else None
+        try:
+            query = report_store.build_query(self.resource, request.query_params, fixed)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            conn = report_store.connect()
+        except Exception as e:
+            logger.error(f"Could not open credit report database: {str(e)}")
+            return Response({"error": "Credit report database unavailable"},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return StreamingHttpResponse(report_store.stream_page(query, conn), content_type="application/json")
+
+
+class CreditReportDetailView(APIView):
+    def get(self, request, report_id, format=None):
+        fields = request.query_params.get('fields')
+        fields = [f.strip() for f in fields.split(',') if f.strip()] if fields else None
+        if fields and any(f not in report_store.RESOURCES['reports'].fields for f in fields):
+            return Response({"error": "Unknown field(s)"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            report = report_store.fetch_one('reports', report_id, fields)
+        except sqlite3.OperationalError as e:
+            logger.error(f"Could not read credit report database: {str(e)}")
+            return Response({"error": "Credit report database unavailable"},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        if report is None:
+            return Response({"error": f"Report {report_id} not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(report, status=status.HTTP_200_OK)
+
+
 class ProcessView(APIView):
     def load_json(self, filename):
         """Load the specified JSON file."""
@@ -126,20 +172,14 @@ class ProcessView(APIView):
             logger.error(f"JSON file is malformed: {filename}")
             return {}
 
-    def find_matching_account(self, json_data, account_status):
-        """Find account with matching status in accountHistories."""
-        account_histories = json_data.get('report', {}).get('accountHistories', [])
-        normalized_status = account_status.title()
-        for account in account_histories:
-            if account.get('account_status') == normalized_status:
-                return account
-        return None
+    def find_matching_accounts(self, conn, report_id, account_statuses):
+        """Find the first account of the report for each requested status."""
+        return report_store.accounts_by_status(conn, report_id, [s.title() for s in account_statuses])
 
     def classify_account(self, account_status, payment_status=None, creditor_remark=None):
         """
         Uses Google Gemini API to classify an account using both Credit Data and Knowledge Base.
         """
-        credit_data = self.load_json("identityiq_1.json")
         knowledge_base = self.load_json("output_data.json")
 
         prompt = f"""
@@ -182,6 +222,27 @@ class ProcessView(APIView):
             logger.error("LLM response could not be parsed into JSON.")
             return {"category": "Uncategorized", "reason": "LLM response could not be parsed"}
 
+    def classify_matched_account(self, conn, account, account_status, payment_status=None, creditor_remark=None,
+                                 store=False):
+        """
+        Classifies an account, reusing a stored classification for the same inputs.
+
+        The inputs are the account's own classification fields plus the
+        request parameters. Stored rows include ones carried forward from the
+        consumer's previous report, so Gemini is only called for accounts
+        that are new or changed. New results are recorded only when ``store``
+        is set, which needs ``conn`` to be writable.
+        """
+        inputs_hash = report_store.classification_inputs_hash(account, account_status, payment_status, creditor_remark)
+        stored = report_store.stored_classification(conn, account.id, inputs_hash)
+        if stored:
+            return stored
+
+        result = self.classify_account(account_status, payment_status, creditor_remark)
+        if store and result.get("category") != "Uncategorized":
+            report_store.save_classification(conn, account, inputs_hash, result)
+        return result
+
     def evaluate_dispute_letter_needed(self, account_status, payment_status=None, creditor_remark=None):
         """
         Determines if a dispute letter is needed based on the provided criteria.
@@ -307,10 +368,32 @@ class ProcessView(APIView):
          - account_status
          - payment_days
          - creditor_remark
+        and one of report_id or slug selecting the report in credit_reports.db.
+
+        GET only reads credit_reports.db; use POST to record new classifications.
         """
-        account_status_list = request.query_params.getlist("account_status")
-        payment_days_list = request.query_params.getlist("payment_days")
-        creditor_remark_list = request.query_params.getlist("creditor_remark")
+        return self.process(request.query_params, store=False)
+
+    def post(self, request, format=None):
+        """
+        Same as GET with the parameters in the request body; new
+        classifications are recorded so later requests can reuse them.
+        """
+        return self.process(request.data, store=True)
+
+    def process(self, params, store):
+        """Classifies the requested accounts on one connection to credit_reports.db."""
+        getlist = getattr(params, "getlist", None)
+        if getlist is None:
+            # JSON body: lists or single values
+            def getlist(key):
+                value = params.get(key)
+                if value is None:
+                    return []
+                return [str(v) for v in value] if isinstance(value, list) else [str(value)]
+        account_status_list = getlist("account_status")
+        payment_days_list = getlist("payment_days")
+        creditor_remark_list = getlist("creditor_remark")
 
         if not account_status_list:
             return Response(
@@ -318,12 +401,48 @@ class ProcessView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        report_param = params.get("report_id")
+        slug = params.get("slug")
+        if report_param is not None:
+            report_param = str(report_param)
+        if not report_param and not slug:
+            return Response(
+                {"error": "Missing report_id or slug parameter"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if report_param and not report_param.isdigit():
+            return Response(
+                {"error": "report_id must be a number"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            conn = report_store.connect(readonly=not store)
+            try:
+                return self._process(conn, report_param, slug, account_status_list, payment_days_list,
+                                     creditor_remark_list, store)
+            finally:
+                conn.close()
+        except sqlite3.OperationalError as e:
+            # Missing, locked or read-only database file
+            logger.error(f"Could not use credit report database: {str(e)}")
+            return Response({"error": "Credit report database unavailable"},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def _process(self, conn, report_param, slug, account_status_list, payment_days_list, creditor_remark_list, store):
+        report_id = report_store.resolve_report_id(conn, report_param or None, slug)
+        if report_id is None:
+            return Response(
+                {"error": f"Report {report_param or slug} not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        matched_accounts = self.find_matching_accounts(conn, report_id, account_status_list)
+        personal = report_store.personal_details(conn, report_id)
+
         disputed_accounts = []
         overall_account_category = "Uncategorized"
         overall_reason = []
 
-        credit_data = self.load_json("identityiq_1.json")
-
         # Process each account provided in the query parameters
         # In the for loop processing each account, update the disputed_accounts entry as follows:
         for idx, account_status in enumerate(account_status_list):
@@ -338,11 +457,13 @@ class ProcessView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            matched_history = self.find_matching_account(credit_data, account_status)
+            matched_history = matched_accounts.get(account_status.title())
             if not matched_history:
                 continue
 
-            gemini_result = self.classify_account(account_status, payment_days_int, creditor_remark)
+            gemini_result = self.classify_matched_account(
+                conn, matched_history, account_status, payment_days_int, creditor_remark, store=store
+            )
             account_category_for_this = gemini_result.get("category", "Uncategorized")
             overall_account_category = account_category_for_this  # You may aggregate if needed.
             reason = gemini_result.get("reason", "")
@@ -350,22 +471,20 @@ class ProcessView(APIView):
 
             if self.evaluate_dispute_letter_needed(account_status, payment_days_int, creditor_remark):
                 disputed_account = {
-                    "creditor_name": matched_history.get("furnisher_name"),
-                    "account_number": matched_history.get("account_number"),
+                    "creditor_name": matched_history.furnisher_name,
+                    "account_number": matched_history.account_number,
                     "reason_for_dispute": reason or "Incorrect account status or payment history."
                 }
                 # Add reported late payment dates only for late payment dispute letters.
                 if account_category_for_this.lower() == "delinquent/late account":
-                    disputed_account["reported_late_payment_dates"] = matched_history.get("date_last_payment")
+                    disputed_account["reported_late_payment_dates"] = matched_history.date_last_payment
                 disputed_accounts.append(disputed_account)
 
         # Get common personal info from credit report
-        personal_info = credit_data.get("report", {}).get("personalInformation", [])
-        if personal_info and len(personal_info) > 0:
-            personal = personal_info[0]
-            your_name = personal.get("name", [""])[0]
-            your_address = personal.get("current_addresses", [""])[0]
-            credit_bureau_name = personal.get("credit_reporting_agency", {}).get("name", "")
+        if personal:
+            your_name = personal["name"]
+            your_address = personal["address"]
+            credit_bureau_name = personal["credit_bureau_name"]
         else:
             your_name = "John Doe"
             your_address = "123 Main St"
@@ -1,27 +1,150 @@
-from langchain_community.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from pypdf import PdfReader
 import asyncio
-from typing import List
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional, Tuple
 from langchain_core.documents import Document
 
+# Bump when the cached chunk layout or the extraction changes
+CHUNK_CACHE_VERSION = 2
+# PDFs with fewer pages are parsed in-process; a pool costs more than it saves
+MIN_PAGES_FOR_POOL = 16
+
+
+# PdfReader of the PDF being parsed, opened once per worker process by _open_worker_reader
+_worker_reader: Optional[PdfReader] = None
+
+
+def _open_worker_reader(file_path: str):
+    global _worker_reader
+    _worker_reader = PdfReader(file_path)
+
+
+def _extract_and_split(reader: PdfReader, start: int, stop: int, chunk_size: int, chunk_overlap: int,
+                       separators: List[str]) -> List[Tuple[int, List[Tuple[int, str]]]]:
+    """
+    Extracts pages [start, stop) and splits each page.
+
+    pypdf resolves page objects lazily, so only the pages in the range are parsed.
+
+    Returns (page number, [(offset in page text, chunk text)]) per page.
+    """
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap,
+                                              separators=separators, add_start_index=True)
+    pages = []
+    for number in range(start, stop):
+        docs = splitter.create_documents([reader.pages[number].extract_text() or ""])
+        pages.append((number + 1, [(doc.metadata["start_index"], doc.page_content) for doc in docs]))
+    return pages
+
+
+def _extract_and_split_in_worker(start: int, stop: int, chunk_size: int, chunk_overlap: int,
+                                 separators: List[str]) -> List[Tuple[int, List[Tuple[int, str]]]]:
+    """_extract_and_split on the worker's own reader; runs in a worker process."""
+    return _extract_and_split(_worker_reader, start, stop, chunk_size, chunk_overlap, separators)
+
+
 class RegulationLoader:
-    def __init__(self):
+    def __init__(self, cache_dir: Optional[str] = None, max_workers: Optional[int] = None):
+        """
+        Args:
+            cache_dir (str, optional): Chunk cache directory. Defaults to
+                REGULATION_CACHE_DIR, or .regulation_cache; "" disables the cache.
+            max_workers (int, optional): Worker processes. Defaults to the CPU count.
+        """
+        if cache_dir is None:
+            cache_dir = os.getenv("REGULATION_CACHE_DIR", ".regulation_cache")
+        self.chunk_size = 1000
+        self.chunk_overlap = 100
+        self.separators = ["\n\n", "\n", ".", "!", "?", ",", " ", ""]
         self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=100,
-            separators=["\n\n", "\n", ".", "!", "?", ",", " ", ""]
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.chunk_overlap,
+            separators=self.separators
         )
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    def _cache_key(self, file_path: str) -> str:
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        settings = json.dumps([CHUNK_CACHE_VERSION, self.chunk_size, self.chunk_overlap, self.separators])
+        digest.update(settings.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _read_cache(self, key: str) -> Optional[List[Dict]]:
+        if self.cache_dir is None:
+            return None
+        try:
+            with open(self.cache_dir / f"{key}.json", "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_cache(self, key: str, chunks: List[Dict]):
+        if self.cache_dir is None:
+            return
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            path = self.cache_dir / f"{key}.json"
+            tmp = path.with_name(path.name + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(chunks, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Could not write chunk cache for {key}: {str(e)}")
+
+    async def _parse(self, file_path: str) -> List[Dict]:
+        reader = PdfReader(file_path)
+        page_count = len(reader.pages)
+        args = (self.chunk_size, self.chunk_overlap, self.separators)
+        if page_count < MIN_PAGES_FOR_POOL or self.max_workers == 1:
+            pages = await asyncio.to_thread(_extract_and_split, reader, 0, page_count, *args)
+        else:
+            workers = min(self.max_workers, page_count)
+            # A few ranges per worker so one slow, dense range does not hold up the rest
+            step = max(1, page_count // (workers * 4))
+            loop = asyncio.get_running_loop()
+            # Each worker opens the PDF once and then parses only the pages of its ranges
+            with ProcessPoolExecutor(max_workers=workers, initializer=_open_worker_reader,
+                                     initargs=(file_path,)) as pool:
+                ranges = await asyncio.gather(*(
+                    loop.run_in_executor(pool, _extract_and_split_in_worker, start,
+                                         min(start + step, page_count), *args)
+                    for start in range(0, page_count, step)
+                ))
+            pages = [page for pages_in_range in ranges for page in pages_in_range]
+        return [{"page": page, "offset": offset, "text": text}
+                for page, chunks in pages for offset, text in chunks]
 
     async def load_pdf(self, file_path: str, regulation_type: str) -> List[Document]:
-        loader = PyPDFLoader(file_path)
-        pages = []
-        async for page in loader.alazy_load():
-            page.metadata.update({
-                "regulation_type": regulation_type,
-                "source": file_path,
-                "page": len(pages) + 1
-            })
-            pages.append(page)
-        
-        split_docs = self.text_splitter.split_documents(pages)
-        return split_docs
\ No newline at end of file
+        """
+        Loads a regulation PDF as split chunks.
+
+        Pages are extracted and split across a process pool, and the chunks
+        are cached under cache_dir keyed by the PDF's hash and the splitter
+        settings, so an unchanged PDF is never parsed twice.
+        """
+        key = self._cache_key(file_path)
+        chunks = self._read_cache(key)
+        if chunks is None:
+            chunks = await self._parse(file_path)
+            self._write_cache(key, chunks)
+        return [
+            Document(
+                page_content=chunk["text"],
+                metadata={
+                    "regulation_type": regulation_type,
+                    "source": file_path,
+                    "page": chunk["page"],
+                    "start_index": chunk["offset"]
+                }
+            )
+            for chunk in chunks
+        ]
@@ -0,0 +1,173 @@
+from langchain_core.embeddings import Embeddings
+from typing import Dict, List, Optional, Sequence
+import hashlib
+import sqlite3
+import threading
+import time
+import numpy as np
+
+# SQLite's default limit on bound parameters is 999
+_MAX_PARAMS = 900
+# Share of max_entries evicted at once when the cache overflows
+EVICTION_BATCH_FRACTION = 0.05
+
+
+def cache_namespace(embeddings: Embeddings) -> str:
+    """Identifies the model behind an Embeddings object, so a model change never reuses vectors."""
+    parts = [type(embeddings).__name__]
+    for attr in ("model", "deployment", "dimensions"):
+        value = getattr(embeddings, attr, None)
+        if value:
+            parts.append(f"{attr}={value}")
+    return ":".join(parts)
+
+
+class EmbeddingCache:
+    """
+    SQLite store of float32 vectors keyed by sha256(namespace, text).
+
+    ``max_entries`` bounds the table. The row count is tracked in memory,
+    and once a put takes it over the limit the least recently used rows
+    are evicted in one batch, down to ``EVICTION_BATCH_FRACTION`` below
+    the limit, so most puts do no eviction work at all.
+    """
+
+    def __init__(self, db_path: str = "embedding_cache.db", max_entries: Optional[int] = None):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_last_used ON embeddings (last_used)")
+        self.conn.commit()
+        self._count = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def key(namespace: str, text: str) -> str:
+        return hashlib.sha256(f"{namespace}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), _MAX_PARAMS):
+                chunk = list(keys[i:i + _MAX_PARAMS])
+                placeholders = ", ".join("?" for _ in chunk)
+                hits = []
+                for key, blob in self.conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ):
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+                    hits.append(key)
+                if hits:
+                    self.conn.execute(
+                        f"UPDATE embeddings SET last_used = ? WHERE key IN ({', '.join('?' for _ in hits)})",
+                        [time.time()] + hits
+                    )
+            if self.conn.in_transaction:
+                self.conn.commit()
+        return found
+
+    def _count_existing(self, keys: List[str]) -> int:
+        existing = 0
+        for i in range(0, len(keys), _MAX_PARAMS):
+            chunk = keys[i:i + _MAX_PARAMS]
+            existing += self.conn.execute(
+                f"SELECT COUNT(*) FROM embeddings WHERE key IN ({', '.join('?' for _ in chunk)})", chunk
+            ).fetchone()[0]
+        return existing
+
+    def put_many(self, items: Dict[str, List[float]]):
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            added = len(items) - self._count_existing(list(items))
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in items.items()]
+            )
+            self._count += added
+            if self.max_entries is not None and self._count > self.max_entries:
+                target = self.max_entries - int(self.max_entries * EVICTION_BATCH_FRACTION)
+                # Walks the last_used index from the oldest end, touching only the evicted rows
+                evicted = self.conn.execute("""
+                    DELETE FROM embeddings WHERE key IN (
+                        SELECT key FROM embeddings ORDER BY last_used LIMIT ?
+                    )
+                """, (self._count - target,)).rowcount
+                self._count -= evicted
+            self.conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._count
+
+    def close(self):
+        self.conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps any LangChain Embeddings with an EmbeddingCache.
+
+    Document and query vectors are cached under separate keys, since
+    asymmetric models embed the same text differently for the two roles.
+    Duplicate texts within a call are embedded once; only texts never seen
+    before in that role reach the underlying model.
+    """
+
+    def __init__(self, underlying: Embeddings, cache: EmbeddingCache, namespace: Optional[str] = None):
+        self.underlying = underlying
+        self.cache = cache
+        self.namespace = namespace or cache_namespace(underlying)
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, texts: List[str], role: str):
+        namespace = f"{self.namespace}:{role}"
+        keys = [EmbeddingCache.key(namespace, text) for text in texts]
+        found = self.cache.get_many(list(dict.fromkeys(keys)))
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+        self.hits += len(texts) - sum(1 for key in keys if key in missing)
+        self.misses += len(missing)
+        return keys, found, missing
+
+    def _store(self, found: Dict[str, List[float]], missing: Dict[str, str], vectors: List[List[float]]):
+        computed = dict(zip(missing, vectors))
+        self.cache.put_many(computed)
+        found.update(computed)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, missing = self._lookup(texts, "document")
+        if missing:
+            self._store(found, missing, self.underlying.embed_documents(list(missing.values())))
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        keys, found, missing = self._lookup([text], "query")
+        if missing:
+            self._store(found, missing, [self.underlying.embed_query(text)])
+        return found[keys[0]]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, missing = self._lookup(texts, "document")
+        if missing:
+            self._store(found, missing, await self.underlying.aembed_documents(list(missing.values())))
+        return [found[key] for key in keys]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        keys, found, missing = self._lookup([text], "query")
+        if missing:
+            self._store(found, missing, [await self.underlying.aembed_query(text)])
+        return found[keys[0]]
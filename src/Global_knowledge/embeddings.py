@@ -1,12 +1,24 @@
 from langchain_openai import AzureOpenAIEmbeddings
+from embedding_cache import CachedEmbeddings, EmbeddingCache
+from typing import Optional
 import os
 
 class EmbeddingManager:
-    def __init__(self):
-        self.embeddings = AzureOpenAIEmbeddings(
+    def __init__(self, cache_path: Optional[str] = None, max_cache_entries: Optional[int] = None):
+        if cache_path is None:
+            cache_path = os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache.db")
+        if max_cache_entries is None:
+            max_cache_entries = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "500000"))
+        self.base_embeddings = AzureOpenAIEmbeddings(
             deployment="text-embedding-ada-002",  # Add your Azure deployment name
             model="text-embedding-ada-002",
             azure_endpoint="https://langrag.openai.azure.com/",
             api_key=os.environ["AZURE_OPENAI_API_KEY"],
             api_version="2023-05-15"  # Make sure to use the correct API version
-        )
\ No newline at end of file
+        )
+        # Unchanged chunks and repeated queries are served from the cache;
+        # an empty EMBEDDING_CACHE_PATH disables it
+        if cache_path:
+            self.embeddings = CachedEmbeddings(self.base_embeddings, EmbeddingCache(cache_path, max_cache_entries))
+        else:
+            self.embeddings = self.base_embeddings
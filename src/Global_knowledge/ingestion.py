@@ -0,0 +1,168 @@
+from langchain_core.documents import Document
+from typing import List, Optional
+import asyncio
+import os
+import random
+import threading
+import time
+
+try:
+    from openai import RateLimitError
+except ImportError:  # openai comes with langchain_openai; without it only status codes are checked
+    RateLimitError = None
+
+# Azure OpenAI quotas of the embedding deployment; set these to the deployment's limits
+EMBEDDING_TOKENS_PER_MINUTE = int(os.getenv("EMBEDDING_TOKENS_PER_MINUTE", "120000"))
+EMBEDDING_REQUESTS_PER_MINUTE = int(os.getenv("EMBEDDING_REQUESTS_PER_MINUTE", "720"))
+# Batches in flight at once
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "4"))
+
+
+def estimate_tokens(text: str) -> int:
+    """ada-002 averages about four characters per token on English text."""
+    return max(1, len(text) // 4)
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    for owner in (error, getattr(error, "response", None)):
+        for attr in ("status_code", "status"):
+            status = getattr(owner, attr, None)
+            if isinstance(status, int):
+                return status
+    return None
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """
+    True for an OpenAI RateLimitError or any error carrying HTTP status 429,
+    including errors raised from one (e.g. a wrapper around the client error).
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if RateLimitError is not None and isinstance(error, RateLimitError):
+            return True
+        if _status_code(error) == 429:
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class TokenBucket:
+    """
+    Async token bucket refilled continuously at ``rate`` tokens per second.
+
+    The rate is lowered after a rate-limit error and recovers gradually
+    toward the configured rate as requests succeed.
+
+    ``acquire`` reserves its tokens under the lock, letting the balance go
+    negative, and sleeps off the deficit outside it; callers are served in
+    the order they arrive and none holds the lock while waiting.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.max_rate = rate_per_minute / 60.0
+        self.rate = self.max_rate
+        self.capacity = capacity or rate_per_minute / 6.0  # ten seconds of burst
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, tokens: float = 1):
+        # A request larger than the bucket is let through once the bucket is full
+        tokens = min(tokens, self.capacity)
+        with self._lock:
+            self._refill()
+            self.tokens -= tokens
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            await asyncio.sleep(wait)
+
+    def throttle(self):
+        with self._lock:
+            self._refill()
+            self.rate = max(self.max_rate / 16, self.rate / 2)
+
+    def recover(self):
+        with self._lock:
+            self._refill()
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
+
+class IngestionScheduler:
+    """
+    Upserts documents in concurrent batches under embedding quotas.
+
+    Each batch first takes its estimated embedding tokens and one request
+    from token buckets sized to the deployment's quotas, so the scheduler
+    runs as fast as the quotas allow without fixed sleeps. Only rate-limit
+    errors are retried, with exponential backoff and jitter, and they also
+    halve the bucket rates; any other error fails the ingest and cancels
+    the batches that have not finished.
+    """
+
+    def __init__(self, pinecone_manager, tokens_per_minute: int = EMBEDDING_TOKENS_PER_MINUTE,
+                 requests_per_minute: int = EMBEDDING_REQUESTS_PER_MINUTE,
+                 concurrency: int = INGEST_CONCURRENCY, max_retries: int = 6, base_delay: float = 2.0):
+        self.pinecone_manager = pinecone_manager
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+
+    async def _process_batch(self, batch: List[Document], namespace: str, number: int, total: int):
+        tokens = sum(estimate_tokens(doc.page_content) for doc in batch)
+        for attempt in range(self.max_retries + 1):
+            await self.token_bucket.acquire(tokens)
+            await self.request_bucket.acquire()
+            try:
+                await asyncio.to_thread(self.pinecone_manager.upsert_documents, batch, namespace,
+                                        raise_on_error=True)
+                self.token_bucket.recover()
+                self.request_bucket.recover()
+                return
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == self.max_retries:
+                    print(f"Failed to process batch {number} of {total}: {str(e)}")
+                    raise
+                self.token_bucket.throttle()
+                self.request_bucket.throttle()
+                delay = self.base_delay * 2 ** attempt * (0.5 + random.random())
+                print(f"Rate limited on batch {number}, retrying in {delay:.1f}s "
+                      f"({self.max_retries - attempt} retries left)")
+                await asyncio.sleep(delay)
+
+    async def ingest(self, docs: List[Document], namespace: str, batch_size: int = 50) -> dict:
+        batches = [docs[i:i + batch_size] for i in range(0, len(docs), batch_size)]
+        semaphore = asyncio.Semaphore(self.concurrency)
+        start = time.perf_counter()
+        done = 0
+
+        async def run(number, batch):
+            nonlocal done
+            async with semaphore:
+                await self._process_batch(batch, namespace, number, len(batches))
+            done += len(batch)
+            elapsed = time.perf_counter() - start
+            print(f"[{namespace}] {done}/{len(docs)} documents, batch {number} of {len(batches)} done, "
+                  f"{done / elapsed:.1f} docs/s")
+
+        tasks = [asyncio.create_task(run(i + 1, batch)) for i, batch in enumerate(batches)]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # One failed batch fails the ingest; stop the batches still queued or waiting
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        elapsed = time.perf_counter() - start
+        print(f"[{namespace}] Ingested {len(docs)} documents in {elapsed:.1f}s")
+        return {"documents": len(docs), "batches": len(batches), "seconds": elapsed,
+                "docs_per_second": len(docs) / elapsed if elapsed > 0 else 0.0}
@@ -1,42 +1,23 @@
 from document_loader import RegulationLoader
 from embeddings import EmbeddingManager
 from vectordb import PineconeManager
+from ingestion import IngestionScheduler
 import asyncio
 from dotenv import load_dotenv
 import os
-import time
 from typing import List
 from langchain_core.documents import Document
 
 load_dotenv()
 
+# Set SWEEP_LEGACY_IDS=1 once to delete the chunks uploaded under random ids
+SWEEP_LEGACY_IDS = os.getenv("SWEEP_LEGACY_IDS", "").lower() in ("1", "true", "yes")
+
 async def process_in_batches(docs: List[Document], pinecone_manager: PineconeManager, reg_type: str, batch_size: int = 50):
-    total_docs = len(docs)
-    for i in range(0, total_docs, batch_size):
-        batch = docs[i:i + batch_size]
-        print(f"Processing batch {i//batch_size + 1} of {(total_docs + batch_size - 1)//batch_size}")
-        
-        retries = 3
-        while retries > 0:
-            try:
-                success = pinecone_manager.upsert_documents(batch, namespace=reg_type)
-                if success:
-                    print(f"Successfully processed batch of {len(batch)} documents")
-                    break
-            except Exception as e:
-                print(f"Error processing batch: {str(e)}")
-                retries -= 1
-                if retries > 0:
-                    print(f"Retrying in 60 seconds... ({retries} retries left)")
-                    time.sleep(60)
-                else:
-                    print("Failed to process batch after all retries")
-                    raise
-        
-        # Rate limiting - wait between batches
-        if i + batch_size < total_docs:
-            print("Waiting 30 seconds before next batch...")
-            time.sleep(30)
+    # Paced by the embedding quotas (EMBEDDING_TOKENS_PER_MINUTE / EMBEDDING_REQUESTS_PER_MINUTE)
+    # instead of fixed sleeps between batches
+    scheduler = IngestionScheduler(pinecone_manager)
+    return await scheduler.ingest(docs, reg_type, batch_size)
 
 async def process_regulations():
     loader = RegulationLoader()
@@ -53,8 +34,17 @@ async def process_regulations():
         print(f"Processing {reg_type} document...")
         if os.path.exists(file_path):
             docs = await loader.load_pdf(file_path, reg_type)
-            print(f"Loaded {len(docs)} documents, processing in batches...")
-            await process_in_batches(docs, pinecone_manager, reg_type)
+            # Only new or changed chunks are embedded; stale ones go after the upload succeeds
+            new_docs, stale_ids = pinecone_manager.plan_sync(docs, reg_type)
+            print(f"Loaded {len(docs)} documents, {len(new_docs)} new or changed, "
+                  f"{len(stale_ids)} stale, processing in batches...")
+            if new_docs:
+                await process_in_batches(new_docs, pinecone_manager, reg_type)
+            pinecone_manager.delete_ids(stale_ids, reg_type)
+            if SWEEP_LEGACY_IDS:
+                # Chunks uploaded under random ids, before ids were deterministic
+                swept = pinecone_manager.sweep_legacy_uuid_ids(reg_type)
+                print(f"Swept {swept} legacy chunks from {reg_type}")
             print(f"Completed processing {reg_type}")
         else:
             print(f"File not found: {file_path}")
@@ -1,35 +1,83 @@
 from pinecone import Pinecone, ServerlessSpec
 from langchain_pinecone import PineconeVectorStore
+import hashlib
 import os
-from uuid import uuid4
-from typing import List
+import re
+from typing import Dict, List, Set, Tuple
 from langchain_core.documents import Document
 
+# Pinecone accepts at most 1000 ids per delete request
+DELETE_BATCH_SIZE = 1000
+
+
+# Chunk ids are prefixed with the source path relative to this directory
+CORPUS_ROOT = os.getenv("REGULATION_CORPUS_ROOT", ".")
+# Every chunk id contains this; ids without it predate deterministic ids
+ID_SEPARATOR = "#"
+# Ids LangChain generated (str(uuid.uuid4())) before chunk ids were deterministic
+LEGACY_ID_PATTERN = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+
+
+def source_prefix(document: Document, root: str = None) -> str:
+    """
+    Id prefix of a chunk's source file: its path relative to the corpus root.
+
+    The full relative path keeps files with the same name in different
+    directories apart.
+    """
+    source = os.path.abspath(document.metadata.get('source', ''))
+    relative = os.path.relpath(source, os.path.abspath(root or CORPUS_ROOT))
+    return f"{relative.replace(os.sep, '/')}{ID_SEPARATOR}"
+
+
+def legacy_source_prefix(document: Document) -> str:
+    """Prefix of the ids written before they carried the relative path."""
+    return f"{os.path.basename(document.metadata.get('source', ''))}{ID_SEPARATOR}"
+
+
+def chunk_id(document: Document, root: str = None) -> str:
+    """
+    Deterministic id from the chunk's source, page, offset and content.
+
+    Re-ingesting an unchanged chunk yields the same id, and a changed chunk a
+    new one, so ids double as a record of what is stored.
+    """
+    content_hash = hashlib.sha256(document.page_content.encode("utf-8")).hexdigest()[:16]
+    return (f"{source_prefix(document, root)}p{document.metadata.get('page', 0)}"
+            f"#o{document.metadata.get('start_index', 0)}#{content_hash}")
+
+
 class PineconeManager:
-    def __init__(self, embeddings):
-        pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-        
-        # Initialize index
-        index_name = os.getenv("PINECONE_INDEX")
-        existing_indexes = [index_info["name"] for index_info in pc.list_indexes()]
-        
-        if index_name not in existing_indexes:
-            pc.create_index(
-                name=index_name,
-                dimension=1536,  # Azure OpenAI ada-002 dimension
-                metric="cosine",
-                spec=ServerlessSpec(cloud="aws", region="us-east-1")
-            )
-        
-        self.index = pc.Index(index_name)
+    def __init__(self, embeddings, index=None, corpus_root: str = None):
+        # Any object with the pinecone.Index interface can be passed in,
+        # e.g. vector_db.local_index.LocalIndex for offline runs
+        if index is None:
+            pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+
+            # Initialize index
+            index_name = os.getenv("PINECONE_INDEX")
+            existing_indexes = [index_info["name"] for index_info in pc.list_indexes()]
+
+            if index_name not in existing_indexes:
+                pc.create_index(
+                    name=index_name,
+                    dimension=1536,  # Azure OpenAI ada-002 dimension
+                    metric="cosine",
+                    spec=ServerlessSpec(cloud="aws", region="us-east-1")
+                )
+
+            index = pc.Index(index_name)
+
+        self.index = index
+        self.corpus_root = corpus_root or CORPUS_ROOT
         self.vector_store = PineconeVectorStore(
             index=self.index,
             embedding=embeddings
         )
 
-    def upsert_documents(self, documents: List[Document], namespace: str):
+    def upsert_documents(self, documents: List[Document], namespace: str, raise_on_error: bool = False):
         try:
-            ids = [str(uuid4()) for _ in range(len(documents))]
+            ids = [chunk_id(doc, self.corpus_root) for doc in documents]
             self.vector_store.add_documents(
                 documents=documents,
                 ids=ids,
@@ -38,9 +86,81 @@ class PineconeManager:
             print(f"Successfully uploaded {len(documents)} documents to namespace: {namespace}")
             return True
         except Exception as e:
+            if raise_on_error:
+                raise
             print(f"Error uploading documents: {str(e)}")
             return False
 
+    def stored_ids(self, namespace: str, prefix: str = None) -> Set[str]:
+        """Ids stored in the namespace, optionally under a source prefix, listed without fetching vectors."""
+        ids = set()
+        for page in self.index.list(prefix=prefix, namespace=namespace):
+            ids.update(page)
+        return ids
+
+    def sweep_legacy_uuid_ids(self, namespace: str) -> int:
+        """
+        Deletes vectors stored under random uuid ids.
+
+        Chunks uploaded before ids were deterministic got uuid4 ids, which no
+        sync ever matches. Only ids of exactly that shape are removed, so
+        vectors other tools wrote to the namespace under their own ids are
+        kept. Run it once per namespace after the first sync has uploaded
+        the replacements; afterwards it finds nothing.
+
+        Returns:
+            int: Number of vectors deleted.
+        """
+        orphans = sorted(i for i in self.stored_ids(namespace) if LEGACY_ID_PATTERN.fullmatch(i))
+        self.delete_ids(orphans, namespace)
+        return len(orphans)
+
+    def plan_sync(self, documents: List[Document], namespace: str) -> Tuple[List[Document], List[str]]:
+        """
+        Diffs chunks against what the namespace holds for the same sources.
+
+        Ids a source got under its bare file name, before ids carried the
+        relative path, are stale unless a file of that name sits at the
+        corpus root, so they are replaced on first sync.
+
+        Returns:
+            The chunks that are new or changed, and the stored ids of those
+            sources that no longer correspond to any chunk.
+        """
+        wanted: Dict[str, Document] = {}
+        prefixes = set()
+        for doc in documents:
+            wanted.setdefault(chunk_id(doc, self.corpus_root), doc)
+            prefixes.add(source_prefix(doc, self.corpus_root))
+            legacy = legacy_source_prefix(doc)
+            # A file of that name at the corpus root owns those ids now
+            if not os.path.exists(os.path.join(self.corpus_root, legacy[:-len(ID_SEPARATOR)])):
+                prefixes.add(legacy)
+        stored = set()
+        for prefix in prefixes:
+            stored |= self.stored_ids(namespace, prefix)
+        new_docs = [doc for doc_id, doc in wanted.items() if doc_id not in stored]
+        stale_ids = sorted(stored - wanted.keys())
+        return new_docs, stale_ids
+
+    def delete_ids(self, ids: List[str], namespace: str):
+        for i in range(0, len(ids), DELETE_BATCH_SIZE):
+            self.index.delete(ids=ids[i:i + DELETE_BATCH_SIZE], namespace=namespace)
+        if ids:
+            print(f"Deleted {len(ids)} stale chunks from namespace: {namespace}")
+
+    def sync_documents(self, documents: List[Document], namespace: str) -> Dict[str, int]:
+        """
+        Re-indexes documents incrementally: upserts only new or changed chunks,
+        then deletes the stale ones, so the namespace is never missing content.
+        """
+        new_docs, stale_ids = self.plan_sync(documents, namespace)
+        if new_docs:
+            self.upsert_documents(new_docs, namespace, raise_on_error=True)
+        self.delete_ids(stale_ids, namespace)
+        return {"upserted": len(new_docs), "deleted": len(stale_ids),
+                "unchanged": len(documents) - len(new_docs)}
+
     def similarity_search(self, query: str, namespace: str, k=5):
         return self.vector_store.similarity_search(
             query=query,
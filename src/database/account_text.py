@@ -0,0 +1,74 @@
+from sqlalchemy import inspect, text
+import logging
+
+logger = logging.getLogger(__name__)
+
+# FTS5 index over the free-text columns of account_histories. The rowid is
+# the account id; report and bureau are stored unindexed for filtering.
+ACCOUNT_TEXT_TABLE = 'account_text_fts'
+TEXT_COLUMNS = ('comments', 'text', 'account_detail', 'late_status')
+
+_CREATE_TABLE = f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {ACCOUNT_TEXT_TABLE} USING fts5(
+        {', '.join(TEXT_COLUMNS)},
+        report_id UNINDEXED,
+        credit_bureau_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+"""
+
+# Provider placeholders ('-', '--', 'N/A') carry no text worth indexing
+_TEXT_VALUE = "NULLIF(NULLIF(NULLIF(TRIM({0}), '-'), '--'), 'N/A')"
+
+_INSERT_ROWS = f"""
+    INSERT INTO {ACCOUNT_TEXT_TABLE} (rowid, {', '.join(TEXT_COLUMNS)}, report_id, credit_bureau_id)
+    SELECT id, {', '.join(_TEXT_VALUE.format(c) for c in TEXT_COLUMNS)}, report_id, credit_bureau_id
+    FROM account_histories
+"""
+
+
+def ensure_account_text_table(engine) -> bool:
+    """
+    Creates the FTS5 table if it is missing.
+
+    Returns:
+        bool: True if the table was created.
+    """
+    if ACCOUNT_TEXT_TABLE in inspect(engine).get_table_names():
+        return False
+    with engine.begin() as conn:
+        conn.execute(text(_CREATE_TABLE))
+    logger.info(f"Created full-text table {ACCOUNT_TEXT_TABLE}")
+    return True
+
+
+def index_account_text(conn, report_id: int) -> int:
+    """
+    Rebuilds the full-text rows of one report's accounts.
+
+    Called from JsonLoader inside the ingest transaction, after the
+    account_histories rows are flushed.
+
+    Returns:
+        int: Number of accounts indexed.
+    """
+    conn.execute(text(
+        f"DELETE FROM {ACCOUNT_TEXT_TABLE} WHERE rowid IN "
+        "(SELECT id FROM account_histories WHERE report_id = :id)"
+    ), {'id': report_id})
+    return conn.execute(text(_INSERT_ROWS + " WHERE report_id = :id"), {'id': report_id}).rowcount
+
+
+def index_missing_account_text(engine) -> int:
+    """Indexes accounts that were loaded before the full-text table existed."""
+    ensure_account_text_table(engine)
+    with engine.begin() as conn:
+        indexed = conn.execute(text(
+            _INSERT_ROWS + f" WHERE id NOT IN (SELECT rowid FROM {ACCOUNT_TEXT_TABLE})"
+        )).rowcount
+        if indexed:
+            conn.execute(text(f"INSERT INTO {ACCOUNT_TEXT_TABLE} ({ACCOUNT_TEXT_TABLE}) VALUES ('optimize')"))
+    if indexed:
+        logger.info(f"Indexed text of {indexed} account(s)")
+    return indexed
@@ -0,0 +1,34 @@
+from typing import Mapping
+import hashlib
+import json
+from normalize import is_placeholder
+
+# Account fields an account classification is computed from. Kept free of
+# database dependencies so the Django app can import it as well.
+CLASSIFICATION_FIELDS = ('account_status', 'payment_status', 'past_due', 'late_status', 'comments')
+
+
+def classification_inputs(account) -> list:
+    """
+    The classification fields of an account, normalized the way report_diff
+    compares them: surrounding whitespace is ignored and placeholders are None.
+
+    ``account`` is anything with ``get`` (a row mapping or an AccountRecord).
+    """
+    values = []
+    for name in CLASSIFICATION_FIELDS:
+        value = account.get(name)
+        values.append(None if is_placeholder(value) else str(value).strip())
+    return values
+
+
+def classification_inputs_hash(account, *extra) -> str:
+    """
+    Stable hash of an account's classification fields plus any other
+    classifier inputs (e.g. the parameters of the request).
+
+    An account that report_diff carries forward unchanged hashes the same as
+    its predecessor, so carried-over classifications are found again.
+    """
+    inputs = [classification_inputs(account), list(extra)]
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
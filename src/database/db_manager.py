@@ -1,12 +1,40 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect
 from sqlalchemy.orm import sessionmaker
-from models import Base
+import migrations
 
 class DatabaseManager:
-    def __init__(self, db_path="credit_reports.db"):
+    """
+    Engine and session factory for a credit report database.
+
+    A new, empty database gets the full schema on construction. An existing
+    one is only checked: schema changes and back-fills of older databases
+    run through upgrade(), or ``python migrations.py <db>``, and until then
+    construction raises a RuntimeError naming what is missing.
+    """
+
+    def __init__(self, db_path="credit_reports.db", check_schema=True):
+        """
+        Args:
+            db_path (str): SQLite file, created if missing.
+            check_schema (bool): Raise if an existing database is out of date.
+                Pass False to open one for upgrade().
+        """
+        self.db_path = db_path
         self.engine = create_engine(f'sqlite:///{db_path}')
-        Base.metadata.create_all(self.engine)
         self.Session = sessionmaker(bind=self.engine)
-    
+        if not inspect(self.engine).get_table_names():
+            migrations.create_schema(self.engine)
+            return
+        missing = migrations.schema_problems(self.engine) if check_schema else []
+        if missing:
+            raise RuntimeError(
+                f"{db_path} predates the current schema (missing {', '.join(missing[:5])}"
+                f"{', ...' if len(missing) > 5 else ''}); run `python migrations.py {db_path}` first"
+            )
+
+    def upgrade(self, **kwargs):
+        """Creates missing tables, columns and indexes; see migrations.upgrade."""
+        return migrations.upgrade(self.engine, **kwargs)
+
     def get_session(self):
-        return self.Session()
\ No newline at end of file
+        return self.Session()
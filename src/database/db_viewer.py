@@ -2,6 +2,7 @@ from sqlalchemy import create_engine
 import pandas as pd
 import json
 from tabulate import tabulate
+from overview import get_report_overview
 
 class DatabaseViewer:
     def __init__(self):
@@ -12,16 +13,28 @@ class DatabaseViewer:
                  'personal_information', 'account_histories',
                  'inquiries', 'credit_contacts', 'data_furnishers']
         
-        counts = {}
-        for table in tables:
-            df = pd.read_sql(f'SELECT COUNT(*) as count FROM {table}', self.engine)
-            counts[table] = df['count'][0]
+        # One round trip for every table instead of one query per table
+        query = "SELECT " + ", ".join(f"(SELECT COUNT(*) FROM {table}) AS {table}" for table in tables)
+        df = pd.read_sql(query, self.engine)
+        counts = df.iloc[0].to_dict()
         
         print("\nDatabase Summary:")
         print(tabulate([(k, v) for k, v in counts.items()], 
                       headers=['Table', 'Count'], 
                       tablefmt='grid'))
 
+    def show_report_overview(self, report_id):
+        with self.engine.connect() as conn:
+            overview = get_report_overview(conn, report_id=report_id)
+        if overview is None:
+            print(f"No overview for report {report_id}")
+            return
+
+        print(f"\nReport {report_id} Overview:")
+        print(tabulate([(k, v) for k, v in overview.items()],
+                      headers=['Field', 'Value'],
+                      tablefmt='grid'))
+
 
 def main():
     viewer = DatabaseViewer()
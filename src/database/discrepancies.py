@@ -0,0 +1,342 @@
+from collections import defaultdict
+from dataclasses import dataclass, field
+from itertools import groupby
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import bindparam, text
+from db_manager import DatabaseManager
+from normalize import (is_placeholder, normalize_account_number, normalize_amount,
+                       normalize_month, normalize_text)
+from furnisher_lookup import trigrams
+from payment_codec import BUREAU_NAMES, SEVERITY, encode_payment_history, month_ordinal, month_string
+
+# Field -> normalizer. Dates are compared by month because bureaus disagree on
+# the day (some report the first of the month, some the actual day).
+COMPARED_FIELDS = {
+    'balance': normalize_amount,
+    'account_status': lambda value: normalize_text(value) or None,
+    'date_opened': normalize_month,
+    'date_last_payment': normalize_month,
+}
+
+FIELD_LABELS = {
+    'balance': 'Balance',
+    'account_status': 'Account status',
+    'date_opened': 'Date opened',
+    'date_last_payment': 'Date of last payment',
+    'payment_history': 'Payment history',
+}
+
+ACCOUNT_COLUMNS = (
+    "id, report_id, credit_bureau_id, furnisher_name, account_number, account_status, "
+    "balance, date_opened, date_last_payment, payment_history_start, "
+    "payment_history_codes, payment_history"
+)
+
+
+@dataclass
+class Discrepancy:
+    report_id: int
+    furnisher_name: str
+    account_number: str
+    field: str
+    values: Dict[str, object]  # bureau name -> value that bureau reports
+    account_ids: Dict[str, int]  # bureau name -> account_histories.id
+    months: List[str] = field(default_factory=list)  # differing months, payment history only
+
+    def describe(self) -> str:
+        label = FIELD_LABELS.get(self.field, self.field)
+        if self.field == 'payment_history':
+            return (f"{label} for {self.furnisher_name} differs between "
+                    f"{', '.join(self.values)} for {', '.join(self.months)}")
+        reported = "; ".join(f"{bureau}: {value if value is not None else 'not reported'}"
+                             for bureau, value in self.values.items())
+        return f"{label} for {self.furnisher_name} is reported inconsistently ({reported})"
+
+
+# Legal-form words some bureaus append to a furnisher name ('AVA FINANCE INC')
+LEGAL_SUFFIXES = {'inc', 'llc', 'corp', 'co', 'na', 'ltd'}
+# Account numbers need this many visible characters to be matched on
+MIN_NUMBER_LENGTH = 4
+# Characters a start-masked and an end-masked copy of one number must share
+MIN_NUMBER_OVERLAP = 6
+# Visible characters an identical account number needs to match without the furnisher names agreeing
+STRONG_NUMBER_LENGTH = 8
+# Trigram similarity above which two furnisher names are the same furnisher
+MIN_FURNISHER_SIMILARITY = 0.4
+_VOWELS = str.maketrans('', '', 'aeiou')
+
+
+def furnisher_match_key(name) -> str:
+    """Normalized furnisher name without legal-form suffixes, e.g. 'ava finance'."""
+    words = normalize_text(name).split()
+    while len(words) > 1 and words[-1] in LEGAL_SUFFIXES:
+        words.pop()
+    return ' '.join(words)
+
+
+def same_furnisher(a: str, b: str) -> bool:
+    """
+    Whether two furnisher_match_key values name the same furnisher.
+
+    Bureaus truncate names ('SYNCB/BAN'), drop vowels ('CRDTONEBNK') and
+    abbreviate words ('DPT ED/AIDV'), so besides equality a truncation, a
+    first word with the same consonants or a trigram Dice coefficient of at
+    least MIN_FURNISHER_SIMILARITY count as a match.
+    """
+    if not a or not b:
+        return False
+    joined_a, joined_b = a.replace(' ', ''), b.replace(' ', '')
+    if joined_a.startswith(joined_b) or joined_b.startswith(joined_a):
+        return True
+    first_a, first_b = a.split()[0].translate(_VOWELS), b.split()[0].translate(_VOWELS)
+    if min(len(first_a), len(first_b)) >= 2 and (first_a.startswith(first_b) or first_b.startswith(first_a)):
+        return True
+    grams_a, grams_b = trigrams(joined_a), trigrams(joined_b)
+    return 2 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b)) >= MIN_FURNISHER_SIMILARITY
+
+
+def account_number_keys(stem: str) -> List[tuple]:
+    """
+    Hash keys of a normalized account number: its last visible characters
+    and, for longer numbers, its first six. Numbers with fewer than
+    MIN_NUMBER_LENGTH visible characters give no keys.
+    """
+    if len(stem) < MIN_NUMBER_LENGTH:
+        return []
+    keys = [('suffix', stem[-MIN_NUMBER_LENGTH:])]
+    if len(stem) >= 6:
+        keys.append(('prefix', stem[:6]))
+    return keys
+
+
+def _masked_ends(stem: str) -> Optional[Tuple[str, str]]:
+    """Visible head and tail around masking inside a normalized account number, or None."""
+    if 'X' not in stem:
+        return None
+    return stem[:stem.index('X')], stem[stem.rindex('X') + 1:]
+
+
+def same_account_number(a: str, b: str) -> bool:
+    """
+    Whether two normalized account numbers can be the same number.
+
+    Bureaus mask different ends of it ('406095522154****', '406095XXXX****',
+    '98487051811E00120100219240711' against 'E00120100219240711'), so the
+    visible part of one must start or end the other. When one bureau masks
+    the start and another the end ('E00120100219240711' against
+    '98487051811E00120100'), their visible parts must overlap by at least
+    MIN_NUMBER_OVERLAP characters. A number masked in the middle
+    ('403216XXXXXX4781') matches one with the same head and tail, whatever
+    lies between them ('4032164781', '403216XXXX4781').
+    """
+    if a.startswith(b) or b.startswith(a) or a.endswith(b) or b.endswith(a):
+        return True
+    ends_a, ends_b = _masked_ends(a), _masked_ends(b)
+    if ends_a and ends_b:
+        (head_a, tail_a), (head_b, tail_b) = ends_a, ends_b
+        if ((head_a.startswith(head_b) or head_b.startswith(head_a))
+                and (tail_a.endswith(tail_b) or tail_b.endswith(tail_a))):
+            return True
+    for ends, other in ((ends_a, b), (ends_b, a)):
+        if ends and other.startswith(ends[0]) and other.endswith(ends[1]) \
+                and len(other) >= len(ends[0]) + len(ends[1]):
+            return True
+    for head, tail in ((a, b), (b, a)):
+        for length in range(MIN_NUMBER_OVERLAP, min(len(head), len(tail))):
+            if tail[-length:] == head[:length]:
+                return True
+    return False
+
+
+class _Tradeline:
+    __slots__ = ('members', 'furnishers', 'stems', 'opened')
+
+    def __init__(self, opened):
+        self.members = {}
+        self.furnishers = []
+        self.stems = []
+        self.opened = opened
+
+    def accepts(self, bureau_id, furnisher, stem) -> bool:
+        """At most three members each, so this is a constant amount of work."""
+        if bureau_id in self.members:
+            return False
+        if not all(same_account_number(stem, other) for other in self.stems):
+            return False
+        # A long identical number identifies the account even under unrelated-looking
+        # names ('CAF'); numbers that only share a prefix or suffix still need the furnisher
+        if len(stem) >= STRONG_NUMBER_LENGTH and self.stems and all(stem == other for other in self.stems):
+            return True
+        return any(same_furnisher(furnisher, other) for other in self.furnishers)
+
+
+def match_tradelines(rows: Iterable[Dict]) -> List[Dict[int, Dict]]:
+    """
+    Groups one report's account rows into tradelines, one row per bureau.
+
+    Rows are matched on (furnisher, account number): tradelines are hashed
+    by the visible suffix and prefix of the account number, and a candidate
+    must carry a compatible account number, name the same furnisher unless
+    the numbers are identical and at least STRONG_NUMBER_LENGTH characters
+    long (see same_account_number and same_furnisher), and have no row from
+    the row's bureau yet. The opened month only breaks ties between several
+    candidates, e.g. student loans of one servicer ending alike. Rows
+    without a usable account number match only on furnisher and opened
+    month together. Each row looks at the few tradelines under its own
+    keys, so a report is grouped in a single linear pass.
+
+    Returns:
+        List[Dict[int, Dict]]: Tradelines as ``{credit_bureau_id: row}``.
+    """
+    tradelines = []
+    index = defaultdict(list)
+
+    for row in rows:
+        if is_placeholder(row.get('furnisher_name')):
+            continue
+        bureau_id = row.get('credit_bureau_id')
+        furnisher = furnisher_match_key(row.get('furnisher_name'))
+        opened = normalize_month(row.get('date_opened'))
+        stem = normalize_account_number(row.get('account_number'))
+        keys = account_number_keys(stem)
+        if not keys:
+            keys = [('opened', opened)] if opened else []
+
+        candidates = [t for key in keys for t in index[key] if t.accepts(bureau_id, furnisher, stem)]
+        target = next((t for t in candidates if opened and t.opened == opened),
+                      candidates[0] if candidates else None)
+        if target is None:
+            target = _Tradeline(opened)
+            tradelines.append(target)
+
+        target.members[bureau_id] = row
+        target.stems.append(stem)
+        target.furnishers.append(furnisher)
+        for key in keys:
+            if target not in index[key]:
+                index[key].append(target)
+
+    return [t.members for t in tradelines]
+
+
+def _payment_months(row) -> Dict[int, str]:
+    start, codes = row.get('payment_history_start'), row.get('payment_history_codes')
+    if codes is None and row.get('payment_history') is not None:
+        start, codes = encode_payment_history(row['payment_history'], row.get('credit_bureau_id'))
+    origin = month_ordinal(start) if start else None
+    if not codes or origin is None:
+        return {}
+    return {origin - offset: code for offset, code in enumerate(codes)
+            if SEVERITY[ord(code)] >= 0}
+
+
+def compare_tradeline(report_id: int, members: Dict[int, Dict]) -> List[Discrepancy]:
+    """Flags every compared field on which the bureaus of one tradeline disagree."""
+    if len(members) < 2:
+        return []
+    bureaus = {BUREAU_NAMES.get(b, str(b)): row for b, row in sorted(members.items())}
+    first = next(iter(bureaus.values()))
+    account_ids = {name: row['id'] for name, row in bureaus.items()}
+
+    def discrepancy(field_name, values, months=None):
+        return Discrepancy(
+            report_id=report_id,
+            furnisher_name=first.get('furnisher_name'),
+            account_number=first.get('account_number'),
+            field=field_name,
+            values=values,
+            account_ids=account_ids,
+            months=months or [],
+        )
+
+    found = []
+    for field_name, normalizer in COMPARED_FIELDS.items():
+        values = {name: normalizer(row.get(field_name)) for name, row in bureaus.items()}
+        reported = {v for v in values.values() if v is not None}
+        if len(reported) > 1:
+            found.append(discrepancy(field_name, values))
+
+    histories = {name: _payment_months(row) for name, row in bureaus.items()}
+    differing = []
+    for month in sorted(set().union(*histories.values()), reverse=True):
+        codes = {name: months[month] for name, months in histories.items() if month in months}
+        if len(codes) > 1 and len({SEVERITY[ord(c)] for c in codes.values()}) > 1:
+            differing.append(month)
+    if differing:
+        values = {name: {month_string(m): months.get(m) for m in differing}
+                  for name, months in histories.items() if months}
+        found.append(discrepancy('payment_history', values, [month_string(m) for m in differing]))
+
+    return found
+
+
+def detect_report(report_id: int, rows: Sequence[Dict]) -> List[Discrepancy]:
+    discrepancies = []
+    for members in match_tradelines(rows):
+        discrepancies.extend(compare_tradeline(report_id, members))
+    return discrepancies
+
+
+class DiscrepancyDetector:
+    def __init__(self, db_path="credit_reports.db"):
+        self.engine = DatabaseManager(db_path).engine
+
+    def _rows(self, report_ids: Optional[Sequence[int]] = None):
+        sql = f"SELECT {ACCOUNT_COLUMNS} FROM account_histories"
+        params = {}
+        if report_ids is not None:
+            sql += " WHERE report_id IN :report_ids"
+            params = {'report_ids': [int(r) for r in report_ids]}
+        query = text(sql + " ORDER BY report_id, id")
+        if params:
+            query = query.bindparams(bindparam('report_ids', expanding=True))
+        with self.engine.connect() as conn:
+            for row in conn.execute(query, params).mappings():
+                yield dict(row)
+
+    def detect(self, report_ids: Optional[Sequence[int]] = None) -> Dict[int, List[Discrepancy]]:
+        """
+        Detects cross-bureau discrepancies for the given reports, or all of them.
+
+        Rows are streamed in report order, so memory stays bounded by the
+        largest report.
+        """
+        results = {}
+        for report_id, rows in groupby(self._rows(report_ids), key=lambda r: r['report_id']):
+            results[report_id] = detect_report(report_id, list(rows))
+        return results
+
+    def for_report(self, report_id: int) -> List[Discrepancy]:
+        return self.detect([report_id]).get(report_id, [])
+
+    def dispute_reasons(self, report_id: int) -> Dict[int, List[str]]:
+        """
+        Human-readable dispute reasons per account id for one report.
+
+        Every bureau row of a tradeline gets the reasons of that tradeline.
+        """
+        reasons = defaultdict(list)
+        for discrepancy in self.for_report(report_id):
+            for account_id in discrepancy.account_ids.values():
+                reasons[account_id].append(discrepancy.describe())
+        return dict(reasons)
+
+
+def main():
+    import sys
+    from tabulate import tabulate
+
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "credit_reports.db"
+    results = DiscrepancyDetector(db_path).detect()
+    rows = []
+    for report_id, discrepancies in results.items():
+        counts = defaultdict(int)
+        for d in discrepancies:
+            counts[d.field] += 1
+        rows.append([report_id] + [counts[f] for f in FIELD_LABELS])
+    print("\nCross-Bureau Discrepancies:")
+    print(tabulate(rows, headers=['Report'] + list(FIELD_LABELS.values()), tablefmt='grid'))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+from typing import Dict, List
+from sqlalchemy import text
+from models import FurnisherAddress
+from normalize import is_placeholder, normalize_text
+
+# Source table -> (source label, query mapping its columns onto furnisher_addresses).
+# credit_contacts keeps the provider's report id, see reports.provider_report_id.
+SOURCES = {
+    'credit_contacts': ('credit_contact', """
+        SELECT id, creditor_name AS name, address_line, city, state, zipcode, phone
+        FROM credit_contacts
+        WHERE report_id = (SELECT provider_report_id FROM reports WHERE id = :id)
+    """),
+    'data_furnishers': ('data_furnisher', """
+        SELECT id, name, street_address AS address_line, city,
+               state_abbrev AS state, zipcode, phone_number AS phone
+        FROM data_furnishers WHERE report_id = :id
+    """),
+}
+
+
+def furnisher_key(name) -> str:
+    """Lookup key of a furnisher name: normalized, with spaces dropped ('CAP ONE' -> 'capone')."""
+    return normalize_text(name).replace(' ', '')
+
+
+def extract_furnisher_addresses(conn, report_id: int) -> List[Dict]:
+    rows = []
+    for table, (source, query) in SOURCES.items():
+        for row in conn.execute(text(query), {'id': report_id}).mappings():
+            key = furnisher_key(row['name'])
+            if not key or is_placeholder(row['address_line']):
+                continue
+            rows.append({
+                'report_id': report_id,
+                'source': source,
+                'source_id': row['id'],
+                'name': row['name'],
+                'key': key,
+                'address_line': row['address_line'],
+                'city': row['city'],
+                'state': row['state'],
+                'zipcode': row['zipcode'],
+                'phone': row['phone'],
+            })
+    return rows
+
+
+def index_furnisher_addresses(conn, report_id: int) -> int:
+    """
+    Rebuilds the furnisher address rows of one report.
+
+    Called from JsonLoader inside the ingest transaction, after the
+    credit_contacts and data_furnishers rows are flushed.
+
+    Returns:
+        int: Number of addresses written.
+    """
+    table = FurnisherAddress.__table__
+    conn.execute(table.delete().where(table.c.report_id == report_id))
+    rows = extract_furnisher_addresses(conn, report_id)
+    if rows:
+        conn.execute(table.insert(), rows)
+    return len(rows)
+
+
+def index_missing_furnisher_addresses(engine) -> int:
+    """Builds furnisher addresses for reports that were loaded before the table existed."""
+    with engine.begin() as conn:
+        report_ids = [r for (r,) in conn.execute(text(
+            "SELECT id FROM reports WHERE id NOT IN (SELECT report_id FROM furnisher_addresses) "
+            "AND (id IN (SELECT report_id FROM data_furnishers) OR id IN ("
+            "SELECT r.id FROM reports r JOIN credit_contacts c ON c.report_id = r.provider_report_id))"
+        ))]
+        for report_id in report_ids:
+            index_furnisher_addresses(conn, report_id)
+    return len(report_ids)
@@ -0,0 +1,179 @@
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from itertools import islice, takewhile
+from typing import Dict, List, Optional
+from sqlalchemy import text
+from db_manager import DatabaseManager
+from furnisher_addresses import furnisher_key
+
+# Matches below this confidence are not returned
+MIN_CONFIDENCE = 0.5
+# Shortest key that may match as a truncation of a longer name
+MIN_PREFIX_LENGTH = 5
+
+# Prefer contacts tied to an account over the specialty agencies in data_furnishers
+_SOURCE_RANK = {'credit_contact': 0, 'data_furnisher': 1}
+
+ADDRESS_FIELDS = ('name', 'address_line', 'city', 'state', 'zipcode', 'phone', 'source', 'source_id')
+
+
+@dataclass
+class AddressMatch:
+    query: str
+    name: str
+    address_line: str
+    city: str
+    state: str
+    zipcode: str
+    phone: str
+    source: str
+    source_id: int
+    method: str  # exact, prefix or trigram
+    confidence: float
+
+    def mailing_address(self) -> str:
+        return f"{self.name}\n{self.address_line}\n{self.city}, {self.state} {self.zipcode}"
+
+
+def trigrams(key: str) -> set:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FurnisherAddressIndex:
+    """
+    In-memory lookup from furnisher names to mailing addresses.
+
+    Loaded once from furnisher_addresses (written at ingest). A name is
+    resolved by exact key, then as a truncation of a longer name (bureaus
+    cut names at 20-odd characters), then by trigram similarity; each step
+    is a dict or bisect lookup, not a scan of the contact list.
+    """
+
+    def __init__(self, rows: List[Dict]):
+        best = {}
+        for row in rows:
+            current = best.get(row['key'])
+            rank = (_SOURCE_RANK.get(row['source'], 9), -row['report_id'])
+            if current is None or rank < current[0]:
+                best[row['key']] = (rank, {f: row[f] for f in ADDRESS_FIELDS})
+        self.addresses = {key: value for key, (_, value) in best.items()}
+        self.sorted_keys = sorted(self.addresses)
+        self.grams = {key: trigrams(key) for key in self.sorted_keys}
+        self.postings = defaultdict(list)
+        for key, grams in self.grams.items():
+            for gram in grams:
+                self.postings[gram].append(key)
+
+    @classmethod
+    def load(cls, engine) -> 'FurnisherAddressIndex':
+        with engine.connect() as conn:
+            rows = conn.execute(text(
+                "SELECT key, report_id, " + ", ".join(ADDRESS_FIELDS) + " FROM furnisher_addresses"
+            )).mappings().all()
+        return cls(rows)
+
+    def __len__(self):
+        return len(self.addresses)
+
+    def _match(self, query: str, key: str, method: str, confidence: float) -> AddressMatch:
+        return AddressMatch(query=query, method=method, confidence=round(confidence, 3),
+                            **self.addresses[key])
+
+    def _prefix(self, key: str) -> Optional[str]:
+        if len(key) < MIN_PREFIX_LENGTH:
+            return None
+        # Query truncated: the shortest stored key that extends it, then the
+        # first in name order. Keys extending it sit together from the bisect
+        # point, but in name order, so 'abcd' can follow 'abcaaaaa'.
+        i = bisect_left(self.sorted_keys, key)
+        extensions = takewhile(lambda k: k.startswith(key), islice(self.sorted_keys, i, None))
+        shortest = min(extensions, key=lambda k: (len(k), k), default=None)
+        if shortest is not None:
+            return shortest
+        # Stored name truncated: the longest stored key the query extends
+        for end in range(len(key) - 1, MIN_PREFIX_LENGTH - 1, -1):
+            if key[:end] in self.addresses:
+                return key[:end]
+        return None
+
+    def resolve(self, name: str, min_confidence: float = MIN_CONFIDENCE) -> Optional[AddressMatch]:
+        """
+        Best address for a furnisher name, or None below ``min_confidence``.
+
+        Confidence is 1.0 for an exact key, 0.6-0.95 for a truncation
+        depending on how much of the longer name is covered, and the
+        trigram Dice coefficient otherwise.
+        """
+        key = furnisher_key(name)
+        if not key:
+            return None
+        if key in self.addresses:
+            return self._match(name, key, 'exact', 1.0)
+
+        prefix = self._prefix(key)
+        if prefix is not None:
+            shorter, longer = sorted((len(prefix), len(key)))
+            confidence = 0.6 + 0.35 * shorter / longer
+            if confidence >= min_confidence:
+                return self._match(name, prefix, 'prefix', confidence)
+
+        grams = trigrams(key)
+        shared = Counter(candidate for gram in grams for candidate in self.postings.get(gram, ()))
+        if not shared:
+            return None
+        candidate, overlap = max(shared.items(), key=lambda item: (item[1], -len(item[0])))
+        confidence = 2 * overlap / (len(grams) + len(self.grams[candidate]))
+        if confidence < min_confidence:
+            return None
+        return self._match(name, candidate, 'trigram', confidence)
+
+    def resolve_many(self, names, min_confidence: float = MIN_CONFIDENCE) -> Dict[str, Optional[AddressMatch]]:
+        return {name: self.resolve(name, min_confidence) for name in dict.fromkeys(names)}
+
+
+class FurnisherLookup:
+    def __init__(self, db_path="credit_reports.db"):
+        self.engine = DatabaseManager(db_path).engine
+        self.index = FurnisherAddressIndex.load(self.engine)
+
+    def refresh(self):
+        """Reloads the index after an ingest."""
+        self.index = FurnisherAddressIndex.load(self.engine)
+
+    def resolve(self, name: str, min_confidence: float = MIN_CONFIDENCE) -> Optional[AddressMatch]:
+        return self.index.resolve(name, min_confidence)
+
+    def addresses_for_report(self, report_id: int) -> Dict[str, Optional[AddressMatch]]:
+        """Resolved mailing address for every furnisher on a report."""
+        with self.engine.connect() as conn:
+            names = [name for (name,) in conn.execute(text(
+                "SELECT DISTINCT furnisher_name FROM account_histories WHERE report_id = :id"
+            ), {'id': report_id}) if furnisher_key(name)]
+        return self.index.resolve_many(names)
+
+
+def main():
+    import sys
+    import time
+    from tabulate import tabulate
+
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "credit_reports.db"
+    lookup = FurnisherLookup(db_path)
+    with lookup.engine.connect() as conn:
+        names = [name for (name,) in conn.execute(text(
+            "SELECT DISTINCT furnisher_name FROM account_histories"
+        )) if furnisher_key(name)]
+
+    t0 = time.perf_counter()
+    matches = lookup.index.resolve_many(names)
+    elapsed = (time.perf_counter() - t0) * 1e6 / max(len(names), 1)
+
+    methods = Counter(m.method if m else 'unresolved' for m in matches.values())
+    print(tabulate(sorted(methods.items()), headers=['Method', 'Furnishers'], tablefmt='grid'))
+    print(f"{len(lookup.index)} addresses indexed, {elapsed:.1f} us per lookup")
+
+
+if __name__ == "__main__":
+    main()
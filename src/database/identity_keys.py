@@ -0,0 +1,98 @@
+from typing import Dict, Iterable, List, Optional
+import json
+from sqlalchemy import text
+from models import IdentityKey
+from normalize import is_placeholder, normalize_text
+
+# PersonalInformation column -> identity key kind
+IDENTITY_COLUMNS = {
+    'name': 'name',
+    'aka_name': 'aka_name',
+    'current_addresses': 'current_address',
+    'previous_addresses': 'previous_address',
+    'employers': 'employer',
+    'dob': 'dob',
+}
+
+
+def _values(raw) -> Iterable[str]:
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except ValueError:
+            raw = [raw]
+    if raw is None:
+        return []
+    if not isinstance(raw, list):
+        raw = [raw]
+    values = []
+    for item in raw:
+        if isinstance(item, dict):
+            # Employers come as {'name': ..., 'date_updated': ...}
+            item = item.get('name')
+        if isinstance(item, str) and not is_placeholder(item):
+            values.append(item.strip())
+    return values
+
+
+def extract_identity_keys(info: Dict) -> List[Dict]:
+    """
+    Turns one personal_information row into identity_keys rows.
+
+    Args:
+        info (Dict): Row with ``id``, ``report_id``, ``credit_bureau_id`` and the
+            JSON identity columns (decoded or as stored text).
+
+    Returns:
+        List[Dict]: One row per distinct (kind, normalized key).
+    """
+    keys, seen = [], set()
+    for column, kind in IDENTITY_COLUMNS.items():
+        for value in _values(info.get(column)):
+            key = normalize_text(value)
+            if not key or (kind, key) in seen:
+                continue
+            seen.add((kind, key))
+            keys.append({
+                'report_id': info['report_id'],
+                'personal_information_id': info['id'],
+                'credit_bureau_id': info.get('credit_bureau_id'),
+                'kind': kind,
+                'value': value,
+                'key': key,
+            })
+    return keys
+
+
+def index_personal_information(conn, report_id: int) -> int:
+    """
+    Rebuilds the identity keys of one report.
+
+    Called from JsonLoader inside the ingest transaction, after the
+    personal_information rows are flushed.
+
+    Returns:
+        int: Number of keys written.
+    """
+    table = IdentityKey.__table__
+    conn.execute(table.delete().where(table.c.report_id == report_id))
+    rows = conn.execute(text(
+        "SELECT id, report_id, credit_bureau_id, name, aka_name, current_addresses, "
+        "previous_addresses, employers, dob FROM personal_information WHERE report_id = :id"
+    ), {'id': report_id}).mappings()
+    keys = [key for info in rows for key in extract_identity_keys(info)]
+    if keys:
+        conn.execute(table.insert(), keys)
+    return len(keys)
+
+
+def index_missing_identity_keys(engine) -> int:
+    """Extracts identity keys for reports that were loaded before the index, or its dob keys, existed."""
+    with engine.begin() as conn:
+        report_ids = [r for (r,) in conn.execute(text(
+            "SELECT DISTINCT report_id FROM personal_information "
+            "WHERE report_id NOT IN (SELECT report_id FROM identity_keys WHERE kind = 'dob')"
+        ))]
+        for report_id in report_ids:
+            index_personal_information(conn, report_id)
+    return len(report_ids)
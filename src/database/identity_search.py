@@ -0,0 +1,101 @@
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import bindparam, text
+from db_manager import DatabaseManager
+from normalize import normalize_text
+
+NAME_KINDS = ('name', 'aka_name')
+ADDRESS_KINDS = ('current_address', 'previous_address')
+
+# Upper bound for prefix ranges; normalized keys only hold [0-9a-z ]
+_PREFIX_END = '~'
+
+
+class IdentitySearch:
+    def __init__(self, db_path="credit_reports.db"):
+        self.engine = DatabaseManager(db_path).engine
+
+    def find(self, value: str, kinds: Optional[Iterable[str]] = None, prefix: bool = False,
+             limit: int = 100) -> List[Dict]:
+        """
+        Looks up reports whose identity values match ``value``.
+
+        Matching is on the normalized key, so case, accents, punctuation and
+        spacing are ignored. Both exact and prefix lookups are index range
+        scans on ``(kind, key)``.
+
+        Args:
+            value (str): Name, address or employer to look for.
+            kinds (Iterable[str], optional): Restrict to these key kinds.
+            prefix (bool): Match keys starting with ``value`` instead of equal to it.
+            limit (int): Maximum number of matches.
+
+        Returns:
+            List[Dict]: Matches with report_id, credit_bureau_id, kind and the stored value.
+        """
+        key = normalize_text(value)
+        if not key:
+            return []
+
+        if prefix:
+            conditions = ["key >= :low", "key < :high"]
+            params = {'low': key, 'high': key + _PREFIX_END}
+        else:
+            conditions = ["key = :key"]
+            params = {'key': key}
+        if kinds:
+            conditions.append("kind IN :kinds")
+            params['kinds'] = list(kinds)
+
+        query = text(
+            "SELECT report_id, personal_information_id, credit_bureau_id, kind, value "
+            f"FROM identity_keys WHERE {' AND '.join(conditions)} LIMIT :limit"
+        )
+        if kinds:
+            query = query.bindparams(bindparam('kinds', expanding=True))
+        params['limit'] = limit
+
+        with self.engine.connect() as conn:
+            return [dict(row) for row in conn.execute(query, params).mappings()]
+
+    def find_by_name(self, name: str, prefix: bool = False, limit: int = 100) -> List[Dict]:
+        return self.find(name, NAME_KINDS, prefix, limit)
+
+    def find_by_address(self, address: str, prefix: bool = False, limit: int = 100) -> List[Dict]:
+        return self.find(address, ADDRESS_KINDS, prefix, limit)
+
+    def find_by_employer(self, employer: str, prefix: bool = False, limit: int = 100) -> List[Dict]:
+        return self.find(employer, ('employer',), prefix, limit)
+
+    def report_ids_for(self, name: str, address: Optional[str] = None, limit: int = 100) -> List[int]:
+        """
+        Report ids for a consumer name, optionally narrowed to those also matching an address.
+
+        The name and address keys are joined on report_id in one query, so
+        ``limit`` applies to the reports matching both rather than to each
+        side before they are intersected.
+        """
+        name_key = normalize_text(name)
+        if not name_key:
+            return []
+        query = (
+            "SELECT DISTINCT n.report_id FROM identity_keys n "
+            "{join}WHERE n.kind IN :name_kinds AND n.key = :name_key{where} "
+            "ORDER BY n.report_id LIMIT :limit"
+        )
+        params = {'name_kinds': list(NAME_KINDS), 'name_key': name_key, 'limit': limit}
+        bindparams = [bindparam('name_kinds', expanding=True)]
+        if address is None:
+            query = query.format(join='', where='')
+        else:
+            address_key = normalize_text(address)
+            if not address_key:
+                return []
+            query = query.format(
+                join="JOIN identity_keys a ON a.report_id = n.report_id ",
+                where=" AND a.kind IN :address_kinds AND a.key = :address_key",
+            )
+            params.update(address_kinds=list(ADDRESS_KINDS), address_key=address_key)
+            bindparams.append(bindparam('address_kinds', expanding=True))
+
+        with self.engine.connect() as conn:
+            return list(conn.execute(text(query).bindparams(*bindparams), params).scalars())
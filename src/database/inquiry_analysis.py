@@ -0,0 +1,333 @@
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import date
+from itertools import groupby
+from typing import Dict, List, Optional, Sequence
+from sqlalchemy import bindparam, text
+from db_manager import DatabaseManager
+from discrepancies import furnisher_match_key, same_furnisher
+from normalize import normalize_date, normalize_text
+
+# Same creditor within this many days is one application reported twice
+DUPLICATE_WINDOW_DAYS = 14
+# Scoring models count auto, mortgage and student loan shopping within this window once
+RATE_SHOPPING_WINDOW_DAYS = 45
+# Hard inquiries stay on a report for two years (FCRA)
+REPORTING_LIFETIME_DAYS = 730
+# An account from the same creditor opened this long after an inquiry (or up to
+# DUPLICATE_WINDOW_DAYS before it, bureaus date both loosely) resulted from it
+ACCOUNT_OPENING_WINDOW_DAYS = 90
+
+RATE_SHOPPING_CATEGORIES = {
+    'auto': ('auto',),
+    'mortgage': ('mortgage', 'real estate'),
+    'student_loan': ('student', 'education'),
+}
+
+INQUIRY_COLUMNS = ("id, report_id, creditor_name, type_of_business, date_of_inquiry, "
+                   "credit_bureau, account_history_id")
+
+
+@dataclass
+class InquiryFinding:
+    inquiry_id: int
+    report_id: int
+    creditor_name: str
+    credit_bureau: str
+    date_of_inquiry: Optional[str]
+    creditor_key: str
+    cluster_id: int  # lowest inquiry id of its same-creditor cluster
+    duplicate_of: Optional[int] = None  # earlier inquiry from the same bureau in the cluster
+    rate_shopping_cluster: Optional[int] = None
+    expired: bool = False
+    reasons: List[str] = field(default_factory=list)
+
+    @property
+    def disputable(self) -> bool:
+        return bool(self.reasons)
+
+
+class _Creditor:
+    """Normalized forms of a creditor name used to match spellings across bureaus."""
+    __slots__ = ('compact', 'acronym')
+
+    def __init__(self, name):
+        words = normalize_text(name).split()
+        self.compact = ''.join(words)
+        self.acronym = ''.join(w[0] for w in words) if len(words) > 1 else ''
+
+    def matches(self, other: '_Creditor') -> bool:
+        if not self.compact or not other.compact:
+            return False
+        if self.compact == other.compact:
+            return True
+        # Bureaus truncate long names: 'ALLY FINANCI' vs 'ALLY FINANCIAL'
+        shorter, longer = sorted((self.compact, other.compact), key=len)
+        if len(shorter) >= 4 and longer.startswith(shorter):
+            return True
+        # 'COAF' vs 'CAPITAL ONE AUTO FIN'
+        return len(self.compact) >= 3 and (self.compact == other.acronym or other.compact == self.acronym)
+
+
+def rate_shopping_category(type_of_business) -> Optional[str]:
+    business = normalize_text(type_of_business)
+    for category, needles in RATE_SHOPPING_CATEGORIES.items():
+        if any(needle in business for needle in needles):
+            return category
+    return None
+
+
+def _day(value) -> Optional[int]:
+    normalized = normalize_date(value)
+    return date.fromisoformat(normalized).toordinal() if normalized else None
+
+
+def _find(parent: Dict[int, int], i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def _union(parent: Dict[int, int], a: int, b: int):
+    a, b = _find(parent, a), _find(parent, b)
+    if a != b:
+        # Keep the lowest id as the cluster root so cluster ids are stable
+        parent[max(a, b)] = min(a, b)
+
+
+def _opened_accounts(accounts: Sequence[Dict]) -> List:
+    opened = []
+    for account in accounts:
+        day = _day(account['date_opened'])
+        if day is not None:
+            opened.append((day, _Creditor(account['furnisher_name']), furnisher_match_key(account['furnisher_name'])))
+    return opened
+
+
+def _resulted_in_account(day: int, row: Dict, creditor: _Creditor, opened: List, duplicate_days: int,
+                         opening_days: int) -> bool:
+    # Tradelines carry the furnisher's name, which bureaus spell differently
+    # from the inquiry, so the looser tradeline matcher is tried as well
+    key = furnisher_match_key(row['creditor_name'])
+    return any(-duplicate_days <= opened_day - day <= opening_days
+               and (creditor.matches(account_creditor) or same_furnisher(key, account_key))
+               for opened_day, account_creditor, account_key in opened)
+
+
+def analyze_report(rows: Sequence[Dict], as_of: Optional[date] = None,
+                   accounts: Optional[Sequence[Dict]] = None,
+                   duplicate_days: int = DUPLICATE_WINDOW_DAYS,
+                   rate_shopping_days: int = RATE_SHOPPING_WINDOW_DAYS,
+                   lifetime_days: int = REPORTING_LIFETIME_DAYS,
+                   opening_days: int = ACCOUNT_OPENING_WINDOW_DAYS) -> List[InquiryFinding]:
+    """
+    Clusters, ages and flags the inquiries of one report in a single sweep.
+
+    Inquiries are sorted by date and swept with a window of the widest
+    configured span; each inquiry is only compared with the ones still in
+    the window, so the pass is linear in the number of inquiries for a
+    bounded inquiry rate.
+
+    Args:
+        rows: Inquiry rows of one report (INQUIRY_COLUMNS).
+        as_of (date, optional): Date to age inquiries against, normally the
+            report's pull date (report_pull_date). Defaults to the newest
+            inquiry of the report, which is never after the pull.
+        accounts (Sequence[Dict], optional): Tradelines of the same report
+            (furnisher_name, date_opened). An inquiry without a linked
+            account is only flagged as unauthorized when none of these comes
+            from its creditor and was opened around the inquiry; without
+            them that reason is never given.
+        duplicate_days (int): Window for same-creditor duplicates.
+        rate_shopping_days (int): Window for rate-shopping clusters.
+        lifetime_days (int): Reporting lifetime of a hard inquiry.
+        opening_days (int): Window after an inquiry for the account it led to.
+
+    Returns:
+        List[InquiryFinding]: One finding per inquiry, oldest first.
+    """
+    items = []
+    for row in rows:
+        items.append((_day(row['date_of_inquiry']), row, _Creditor(row['creditor_name']),
+                      rate_shopping_category(row['type_of_business'])))
+    # Undated inquiries sort first and never join a window
+    items.sort(key=lambda item: (item[0] is not None, item[0] or 0, item[1]['id']))
+    if as_of is not None:
+        as_of = as_of.toordinal()
+    elif items and items[-1][0] is not None:
+        as_of = items[-1][0]
+    opened = _opened_accounts(accounts) if accounts is not None else None
+
+    same_creditor = {item[1]['id']: item[1]['id'] for item in items}
+    shopping = dict(same_creditor)
+    duplicates = {}
+    window = deque()
+    span = max(duplicate_days, rate_shopping_days)
+
+    for day, row, creditor, category in items:
+        if day is None:
+            continue
+        while window and day - window[0][0] > span:
+            window.popleft()
+        for other_day, other, other_creditor, other_category in window:
+            gap = day - other_day
+            if gap <= duplicate_days and creditor.matches(other_creditor):
+                _union(same_creditor, row['id'], other['id'])
+                if other['credit_bureau'] == row['credit_bureau'] and row['id'] not in duplicates:
+                    duplicates[row['id']] = other['id']
+            if category and category == other_category and gap <= rate_shopping_days:
+                _union(shopping, row['id'], other['id'])
+        window.append((day, row, creditor, category))
+
+    shopping_sizes = {}
+    for inquiry_id in shopping:
+        root = _find(shopping, inquiry_id)
+        shopping_sizes[root] = shopping_sizes.get(root, 0) + 1
+
+    # Clusters (same creditor, or one rate-shopping burst) in which some
+    # inquiry led to an account: the consumer was applying, so none of
+    # their inquiries is flagged as unauthorized
+    fruitful = set()
+    if opened is not None:
+        for day, row, creditor, category in items:
+            if row['account_history_id'] is not None or (
+                    day is not None and _resulted_in_account(day, row, creditor, opened, duplicate_days, opening_days)):
+                fruitful.add(('creditor', _find(same_creditor, row['id'])))
+                fruitful.add(('shopping', _find(shopping, row['id'])))
+
+    findings = []
+    for day, row, creditor, category in items:
+        shopping_root = _find(shopping, row['id'])
+        finding = InquiryFinding(
+            inquiry_id=row['id'],
+            report_id=row['report_id'],
+            creditor_name=row['creditor_name'],
+            credit_bureau=row['credit_bureau'],
+            date_of_inquiry=normalize_date(row['date_of_inquiry']),
+            creditor_key=creditor.compact,
+            cluster_id=_find(same_creditor, row['id']),
+            duplicate_of=duplicates.get(row['id']),
+            rate_shopping_cluster=shopping_root if shopping_sizes[shopping_root] > 1 else None,
+            expired=day is not None and as_of is not None and as_of - day > lifetime_days,
+        )
+        if finding.expired:
+            finding.reasons.append("Inquiry is older than the two-year reporting period")
+        if finding.duplicate_of is not None:
+            finding.reasons.append("Duplicate of an earlier inquiry from the same creditor")
+        if (opened is not None and day is not None and not finding.expired
+                and ('creditor', finding.cluster_id) not in fruitful
+                and ('shopping', shopping_root) not in fruitful):
+            finding.reasons.append("No account resulted from this inquiry; verify it was authorized")
+        findings.append(finding)
+    return findings
+
+
+def report_pull_date(conn, report_id: int) -> Optional[date]:
+    """Date the report was pulled: when the provider created its account rows."""
+    created = conn.execute(text(
+        "SELECT MAX(created_at) FROM account_histories WHERE report_id = :id"
+    ), {'id': report_id}).scalar()
+    normalized = normalize_date(created)
+    return date.fromisoformat(normalized) if normalized else None
+
+
+def report_accounts(conn, report_id: int) -> List[Dict]:
+    """Furnisher and opened date of every tradeline of a report, for analyze_report."""
+    return [dict(row) for row in conn.execute(text(
+        "SELECT furnisher_name, date_opened FROM account_histories WHERE report_id = :id"
+    ), {'id': report_id}).mappings()]
+
+
+class InquiryAnalyzer:
+    def __init__(self, db_path="credit_reports.db", **windows):
+        self.engine = DatabaseManager(db_path).engine
+        self.windows = windows
+
+    def _rows(self, report_ids: Optional[Sequence[int]] = None):
+        sql = f"SELECT {INQUIRY_COLUMNS} FROM inquiries"
+        params = {}
+        if report_ids is not None:
+            sql += " WHERE report_id IN :report_ids"
+            params = {'report_ids': [int(r) for r in report_ids]}
+        query = text(sql + " ORDER BY report_id, date_of_inquiry")
+        if params:
+            query = query.bindparams(bindparam('report_ids', expanding=True))
+        with self.engine.connect() as conn:
+            for row in conn.execute(query, params).mappings():
+                yield dict(row)
+
+    def analyze(self, report_ids: Optional[Sequence[int]] = None,
+                as_of: Optional[date] = None) -> Dict[int, List[InquiryFinding]]:
+        """
+        Analyzes the inquiries of the given reports, or of the whole database.
+
+        Rows are streamed in report order, so memory stays bounded by the
+        largest report. Each report is aged against its own pull date unless
+        ``as_of`` is given.
+        """
+        results = {}
+        with self.engine.connect() as conn:
+            for report_id, rows in groupby(self._rows(report_ids), key=lambda r: r['report_id']):
+                results[report_id] = analyze_report(
+                    list(rows), as_of or report_pull_date(conn, report_id),
+                    report_accounts(conn, report_id), **self.windows
+                )
+        return results
+
+    def for_report(self, report_id: int, as_of: Optional[date] = None) -> List[InquiryFinding]:
+        return self.analyze([report_id], as_of).get(report_id, [])
+
+    def dispute_candidates(self, report_id: int, as_of: Optional[date] = None) -> List[Dict]:
+        """
+        Disputable inquiries of one report in the shape the letter pipeline consumes.
+
+        Only the first inquiry of each bureau per cluster is kept, so a
+        rate-shopping burst does not produce a letter row per application.
+        """
+        candidates, seen = [], set()
+        for finding in self.for_report(report_id, as_of):
+            if not finding.disputable:
+                continue
+            key = (finding.cluster_id, finding.credit_bureau, tuple(finding.reasons))
+            if key in seen:
+                continue
+            seen.add(key)
+            candidates.append({
+                "creditor_name": finding.creditor_name,
+                "credit_bureau": finding.credit_bureau,
+                "date_of_inquiry": finding.date_of_inquiry,
+                "reason_for_dispute": "; ".join(finding.reasons),
+            })
+        return candidates
+
+
+def main():
+    import sys
+    import time
+    from tabulate import tabulate
+
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "credit_reports.db"
+    analyzer = InquiryAnalyzer(db_path)
+    t0 = time.perf_counter()
+    results = analyzer.analyze()
+    elapsed = (time.perf_counter() - t0) * 1000
+    rows = []
+    for report_id, findings in results.items():
+        rows.append([
+            report_id,
+            len(findings),
+            len({f.cluster_id for f in findings}),
+            sum(f.duplicate_of is not None for f in findings),
+            len({f.rate_shopping_cluster for f in findings if f.rate_shopping_cluster}),
+            sum(f.expired for f in findings),
+            sum(f.disputable for f in findings),
+        ])
+    print("\nInquiry Analysis:")
+    print(tabulate(rows, headers=['Report', 'Inquiries', 'Creditors', 'Duplicates',
+                                  'Rate shopping', 'Expired', 'Disputable'], tablefmt='grid'))
+    print(f"Analyzed {sum(r[1] for r in rows)} inquiries in {elapsed:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
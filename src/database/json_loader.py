@@ -1,20 +1,36 @@
 from models import Report, CreditScore, Summary, PersonalInformation, AccountHistory, Inquiry, CreditContact, DataFurnisher
+from payment_codec import encode_payment_history
+from overview import refresh_report_overview
+from identity_keys import index_personal_information
+from account_text import index_account_text
+from snapshots import load_report_json
+from furnisher_addresses import index_furnisher_addresses
+from report_diff import carry_forward_classifications, diff_report
 from datetime import datetime
-import json
+
+
+def provider_report_id(report):
+    """The provider's id of a pull, as carried by its scores, accounts and contacts."""
+    for section in ('creditScores', 'accountHistories', 'creditContacts'):
+        for row in report.get(section) or []:
+            if row.get('report_id') is not None:
+                return row['report_id']
+    return None
 
 class JsonLoader:
     def __init__(self, db_manager):
         self.db_manager = db_manager
 
     def load_json(self, file_path):
-        with open(file_path, 'r') as f:
-            data = json.load(f)
+        # Writes the binary snapshot on first ingest, reuses it afterwards
+        data = load_report_json(file_path)
         
         session = self.db_manager.get_session()
         try:
             # Create Report
             report = Report(
-                slug=data['report']['slug']
+                slug=data['report']['slug'],
+                provider_report_id=provider_report_id(data['report'])
             )
             session.add(report)
             session.flush()
@@ -81,6 +97,10 @@ class JsonLoader:
 
             # Load Account Histories
             for account in data['report']['accountHistories']:
+                # The raw JSON stays the stored form; the packed copy is for analytics
+                history_start, history_codes = encode_payment_history(
+                    account['payment_history'], account['credit_bureau_id']
+                )
                 account_history = AccountHistory(
                     id=account['id'],
                     account_unique_id=account.get('account_unique_id'),
@@ -107,6 +127,8 @@ class JsonLoader:
                     date_last_active=account['date_last_active'],
                     date_last_payment=account['date_last_payment'],
                     payment_history=account['payment_history'],
+                    payment_history_start=history_start,
+                    payment_history_codes=history_codes,
                     type=account['type'],
                     report_id=report.id,
                     created_at=datetime.fromisoformat(account['created_at']),
@@ -198,6 +220,14 @@ class JsonLoader:
                 )
                 session.add(data_furnisher)
 
+            session.flush()
+            refresh_report_overview(session.connection(), report.id)
+            index_personal_information(session.connection(), report.id)
+            index_account_text(session.connection(), report.id)
+            index_furnisher_addresses(session.connection(), report.id)
+            # Unchanged accounts keep the classification of the previous pull
+            carry_forward_classifications(session.connection(), diff_report(session.connection(), report.id))
+
             session.commit()
             print(f"Successfully loaded data from {file_path}")
             
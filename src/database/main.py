@@ -51,6 +51,7 @@ def process_json_files():
         return
         
     db_manager = DatabaseManager()
+    db_manager.upgrade()
     loader = JsonLoader(db_manager)
     
     json_dir = "src/sample_json"
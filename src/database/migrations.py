@@ -0,0 +1,221 @@
+from sqlalchemy import inspect, text
+from models import Base
+from payment_codec import encode_payment_history
+from overview import refresh_missing_overviews, refresh_report_overview
+from identity_keys import index_missing_identity_keys
+from account_text import ACCOUNT_TEXT_TABLE, ensure_account_text_table, index_missing_account_text
+from furnisher_addresses import index_furnisher_addresses, index_missing_furnisher_addresses
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def create_schema(engine):
+    """
+    Creates every table of a new database, including the full-text table.
+
+    On an existing database this only adds missing tables; their rows still
+    need the back-fills of upgrade().
+    """
+    Base.metadata.create_all(engine)
+    ensure_account_text_table(engine)
+
+
+def schema_problems(engine):
+    """
+    Tables and columns the current code expects that the database lacks.
+
+    Returns:
+        List[str]: Missing ``table`` or ``table.column`` names; empty when
+        the database is up to date.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            missing.append(table.name)
+            continue
+        existing = {col['name'] for col in inspector.get_columns(table.name)}
+        missing.extend(f"{table.name}.{column.name}" for column in table.columns if column.name not in existing)
+    if ACCOUNT_TEXT_TABLE not in existing_tables:
+        missing.append(ACCOUNT_TEXT_TABLE)
+    return missing
+
+
+def ensure_columns(engine):
+    """
+    Adds columns declared on the models that are missing from existing tables.
+
+    Only nullable columns without server defaults are handled, which is what
+    SQLite's ALTER TABLE ADD COLUMN supports.
+
+    Returns:
+        List[str]: ``table.column`` names that were added.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {col['name'] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}'))
+                added.append(f"{table.name}.{column.name}")
+                logger.info(f"Added column {column.name} to {table.name}")
+
+    return added
+
+
+def pack_payment_histories(engine, batch_size=500):
+    """
+    Fills the packed start/codes columns for rows that only have the JSON.
+
+    Additive: the JSON column is left as it is, because the packed form
+    drops the day of the month, the provider's key style and the other
+    bureaus' grid columns. The database therefore grows slightly rather
+    than shrinking; the packed columns only buy faster late-payment
+    analytics. Analytics fall back to encoding the JSON on the fly, so this
+    is an optional speed-up, run with
+    ``python migrations.py DB --pack-payment-history``.
+
+    Returns:
+        int: Number of account rows packed.
+    """
+    packed = 0
+    with engine.begin() as conn:
+        rows = conn.execute(text(
+            "SELECT id, credit_bureau_id, payment_history FROM account_histories "
+            "WHERE payment_history_codes IS NULL AND payment_history IS NOT NULL"
+        )).fetchall()
+        for i in range(0, len(rows), batch_size):
+            params = []
+            for account_id, bureau_id, history in rows[i:i + batch_size]:
+                start, codes = encode_payment_history(history, bureau_id)
+                params.append({'id': account_id, 'start': start, 'codes': codes})
+            conn.execute(text(
+                "UPDATE account_histories SET payment_history_start = :start, "
+                "payment_history_codes = :codes WHERE id = :id"
+            ), params)
+            packed += len(params)
+
+    if packed:
+        logger.info(f"Packed payment history for {packed} account(s)")
+    return packed
+
+
+def link_provider_report_ids(engine):
+    """
+    Fills reports.provider_report_id for reports loaded before it was stored.
+
+    The pull's scores and contacts carry the provider's report id; of those
+    belonging to the report's user, the ones created closest to the
+    report's accounts are taken.
+
+    Returns:
+        List[int]: Ids of the reports that were linked.
+    """
+    linked = []
+    with engine.begin() as conn:
+        reports = conn.execute(text(
+            "SELECT r.id, MIN(a.created_at) FROM reports r JOIN account_histories a ON a.report_id = r.id "
+            "WHERE r.provider_report_id IS NULL GROUP BY r.id"
+        )).fetchall()
+        for report_id, created_at in reports:
+            provider_id = conn.execute(text("""
+                SELECT report_id FROM (
+                    SELECT report_id, user_id, created_at FROM credit_scores
+                    UNION ALL
+                    SELECT report_id, user_id, created_at FROM credit_contacts
+                )
+                WHERE user_id IN (SELECT user_id FROM account_histories WHERE report_id = :id)
+                ORDER BY ABS(julianday(created_at) - julianday(:created_at))
+                LIMIT 1
+            """), {'id': report_id, 'created_at': created_at}).scalar()
+            if provider_id is None:
+                continue
+            conn.execute(text("UPDATE reports SET provider_report_id = :provider WHERE id = :id"),
+                         {'provider': provider_id, 'id': report_id})
+            # Overviews and addresses built before the link mixed in the user's other pulls
+            refresh_report_overview(conn, report_id)
+            index_furnisher_addresses(conn, report_id)
+            linked.append(report_id)
+    if linked:
+        logger.info(f"Linked {len(linked)} report(s) to their provider report id")
+    return linked
+
+
+def ensure_indexes(engine):
+    """
+    Creates every index declared on the models that is missing from the database.
+
+    ``Base.metadata.create_all`` only emits CREATE INDEX for tables it creates,
+    so databases built before an index was declared never pick it up. This
+    walks the declared indexes and creates the missing ones in place.
+
+    Args:
+        engine: SQLAlchemy engine bound to the credit report database.
+
+    Returns:
+        List[str]: Names of the indexes that were created.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {ix['name'] for ix in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in existing:
+                    continue
+                index.create(bind=conn, checkfirst=True)
+                created.append(index.name)
+                logger.info(f"Created index {index.name} on {table.name}")
+
+        if created:
+            # Refresh planner statistics so the new indexes are actually picked
+            conn.execute(text("ANALYZE"))
+
+    return created
+
+
+def upgrade(engine, pack_payment_history=False):
+    """Brings an existing credit report database up to the current schema."""
+    create_schema(engine)
+    ensure_columns(engine)
+    if pack_payment_history:
+        pack_payment_histories(engine)
+    created = ensure_indexes(engine)
+    link_provider_report_ids(engine)
+    refresh_missing_overviews(engine)
+    index_missing_identity_keys(engine)
+    index_missing_account_text(engine)
+    index_missing_furnisher_addresses(engine)
+    return created
+
+
+if __name__ == "__main__":
+    import argparse
+    from sqlalchemy import create_engine
+
+    parser = argparse.ArgumentParser(description="Upgrade a credit report database to the current schema.")
+    parser.add_argument("db_path", nargs="?", default="credit_reports.db")
+    parser.add_argument("--pack-payment-history", action="store_true",
+                        help="also fill the packed payment history columns (the JSON is kept)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    engine = create_engine(f'sqlite:///{args.db_path}')
+    created = upgrade(engine, pack_payment_history=args.pack_payment_history)
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+    print(f"Upgraded {args.db_path}, created {len(created)} index(es)")
@@ -1,6 +1,7 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey, JSON, UniqueConstraint
+from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey, JSON, UniqueConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
+from payment_codec import decode_payment_history
 
 Base = declarative_base()
 
@@ -8,6 +9,8 @@ class Report(Base):
     __tablename__ = 'reports'
     id = Column(Integer, primary_key=True)
     slug = Column(String(36))  # UUID format
+    # The provider's id of this pull, which credit_scores and credit_contacts keep as their report_id
+    provider_report_id = Column(Integer, nullable=True)
     credit_scores = relationship("CreditScore", back_populates="report")
     summaries = relationship("Summary", back_populates="report")
     personal_information = relationship("PersonalInformation", back_populates="report")
@@ -15,7 +18,13 @@ class Report(Base):
     inquiries = relationship("Inquiry", back_populates="report")
     credit_contacts = relationship("CreditContact", back_populates="report")
     data_furnishers = relationship("DataFurnisher", back_populates="report")
-    
+    overview = relationship("ReportOverview", back_populates="report", uselist=False)
+
+    __table_args__ = (
+        Index('ix_reports_slug', 'slug'),
+        Index('ix_reports_provider_report_id', 'provider_report_id'),
+    )
+
 
 class CreditScore(Base):
     __tablename__ = 'credit_scores'
@@ -28,7 +37,7 @@ class CreditScore(Base):
     lender_rank = Column(String, nullable=True)
     score_scale = Column(String, nullable=True)
     type = Column(Integer)
-    report_id = Column(Integer, ForeignKey('reports.id'))
+    report_id = Column(Integer, ForeignKey('reports.id'))  # The provider's report id; joins to reports through user_id
     created_at = Column(DateTime)
     updated_at = Column(DateTime)
     deleted_at = Column(DateTime, nullable=True)
@@ -37,6 +46,11 @@ class CreditScore(Base):
     credit_reporting_agency = Column(JSON)
     report = relationship("Report", back_populates="credit_scores")
 
+    __table_args__ = (
+        Index('ix_credit_scores_report_bureau', 'report_id', 'credit_bureau_id'),
+        Index('ix_credit_scores_user', 'user_id'),
+    )
+
 class Summary(Base):
     __tablename__ = 'summaries'
     id = Column(Integer, primary_key=True)
@@ -56,6 +70,10 @@ class Summary(Base):
     credit_reporting_agency = Column(JSON)
     report = relationship("Report", back_populates="summaries")
 
+    __table_args__ = (
+        Index('ix_summaries_report_bureau', 'report_id', 'credit_bureau_id'),
+    )
+
 class PersonalInformation(Base):
     __tablename__ = 'personal_information'
     id = Column(Integer, primary_key=True)
@@ -71,6 +89,11 @@ class PersonalInformation(Base):
     type = Column(String)
     credit_reporting_agency = Column(JSON)
     report = relationship("Report", back_populates="personal_information")
+    identity_keys = relationship("IdentityKey", back_populates="personal_information")
+
+    __table_args__ = (
+        Index('ix_personal_information_report_bureau', 'report_id', 'credit_bureau_id'),
+    )
 
 class AccountHistory(Base):
     __tablename__ = 'account_histories'
@@ -98,7 +121,11 @@ class AccountHistory(Base):
     comments = Column(String)
     date_last_active = Column(String)
     date_last_payment = Column(String)
-    payment_history = Column(JSON)
+    payment_history = Column(JSON, nullable=True)  # As sent by the provider; the source of truth
+    # Packed copy for analytics, see payment_codec. It is lossy, so it is kept
+    # next to the JSON rather than replacing it and adds to the row size.
+    payment_history_start = Column(String(7), nullable=True)  # YYYY-MM of the newest month
+    payment_history_codes = Column(String, nullable=True)  # Worst status per month, newest first
     type = Column(Integer)
     report_id = Column(Integer, ForeignKey('reports.id'))
     created_at = Column(DateTime)
@@ -114,6 +141,20 @@ class AccountHistory(Base):
     credit_contact = Column(JSON)
     report = relationship("Report", back_populates="account_histories")
 
+    __table_args__ = (
+        Index('ix_account_histories_report_bureau', 'report_id', 'credit_bureau_id'),
+        Index('ix_account_histories_report_status', 'report_id', 'account_status'),
+        Index('ix_account_histories_furnisher', 'furnisher_name'),
+        Index('ix_account_histories_account_number', 'account_number'),
+        Index('ix_account_histories_user_report', 'user_id', 'report_id'),
+    )
+
+    def get_payment_history(self):
+        """Returns the stored payment history JSON, or an approximation from the packed codes if it is missing."""
+        if self.payment_history is not None or self.payment_history_codes is None:
+            return self.payment_history
+        return decode_payment_history(self.payment_history_start, self.payment_history_codes)
+
 class Inquiry(Base):
     __tablename__ = 'inquiries'
     id = Column(Integer, primary_key=True)  # Using ID from JSON
@@ -132,6 +173,11 @@ class Inquiry(Base):
     report_id = Column(Integer, ForeignKey('reports.id'))
     report = relationship("Report", back_populates="inquiries")
 
+    __table_args__ = (
+        Index('ix_inquiries_report_date', 'report_id', 'date_of_inquiry'),
+        Index('ix_inquiries_creditor', 'creditor_name'),
+    )
+
 class CreditContact(Base):
     __tablename__ = 'credit_contacts'
     id = Column(Integer, primary_key=True)  # Using ID from JSON
@@ -146,13 +192,19 @@ class CreditContact(Base):
     phone = Column(String)
     fax_number = Column(String, nullable=True)
     type = Column(Integer)
-    report_id = Column(Integer, ForeignKey('reports.id'))
+    report_id = Column(Integer, ForeignKey('reports.id'))  # The provider's report id; joins to reports through user_id
     created_at = Column(DateTime)
     updated_at = Column(DateTime)
     deleted_at = Column(DateTime, nullable=True)
     contacted = Column(Integer)
     report = relationship("Report", back_populates="credit_contacts")
 
+    __table_args__ = (
+        Index('ix_credit_contacts_report', 'report_id'),
+        Index('ix_credit_contacts_user', 'user_id'),
+        Index('ix_credit_contacts_creditor', 'creditor_name'),
+    )
+
 class DataFurnisher(Base):
     __tablename__ = 'data_furnishers'
     # Composite primary key (id, report_id)
@@ -186,4 +238,93 @@ class DataFurnisher(Base):
 
     __table_args__ = (
         UniqueConstraint('id', 'report_id', name='uix_data_furnisher'),
-    )
\ No newline at end of file
+        Index('ix_data_furnishers_report', 'report_id'),
+    )
+
+
+class ReportOverview(Base):
+    # Denormalized per-report read model, maintained by overview.refresh_report_overview
+    __tablename__ = 'report_overviews'
+    report_id = Column(Integer, ForeignKey('reports.id'), primary_key=True)
+    slug = Column(String(36))
+    consumer_name = Column(String, nullable=True)
+    transunion_score = Column(Integer, nullable=True)
+    equifax_score = Column(Integer, nullable=True)
+    experian_score = Column(Integer, nullable=True)
+    account_count = Column(Integer)
+    open_accounts = Column(Integer)
+    closed_accounts = Column(Integer)
+    derogatory_accounts = Column(Integer)
+    late_accounts = Column(Integer)
+    status_counts = Column(JSON)  # {bureau name: {account status: count}}
+    transunion_balance = Column(Float, nullable=True)
+    equifax_balance = Column(Float, nullable=True)
+    experian_balance = Column(Float, nullable=True)
+    inquiry_count = Column(Integer)
+    public_records = Column(Integer)
+    has_derogatory = Column(Integer)
+    has_late_payments = Column(Integer)
+    refreshed_at = Column(DateTime)
+    report = relationship("Report", back_populates="overview")
+
+    __table_args__ = (
+        Index('ix_report_overviews_slug', 'slug'),
+    )
+
+
+class IdentityKey(Base):
+    # Normalized names, addresses, employers and dates of birth from PersonalInformation, see identity_keys
+    __tablename__ = 'identity_keys'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    report_id = Column(Integer, ForeignKey('reports.id'))
+    personal_information_id = Column(Integer, ForeignKey('personal_information.id'))
+    credit_bureau_id = Column(Integer)
+    kind = Column(String(20))  # name, aka_name, current_address, previous_address, employer, dob
+    value = Column(String)
+    key = Column(String)
+    personal_information = relationship("PersonalInformation", back_populates="identity_keys")
+
+    __table_args__ = (
+        Index('ix_identity_keys_kind_key', 'kind', 'key'),
+        Index('ix_identity_keys_key', 'key'),
+        Index('ix_identity_keys_report', 'report_id'),
+    )
+
+
+class AccountClassification(Base):
+    # Account categories from the LLM, carried forward across pulls by report_diff
+    __tablename__ = 'account_classifications'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    account_id = Column(Integer, ForeignKey('account_histories.id'))
+    report_id = Column(Integer, ForeignKey('reports.id'))
+    inputs_hash = Column(String(64))  # Hash of the classifier inputs, see classification_inputs.classification_inputs_hash
+    category = Column(String)
+    reason = Column(String, nullable=True)
+    carried_from = Column(Integer, nullable=True)  # account_id the result was copied from
+    created_at = Column(DateTime)
+
+    __table_args__ = (
+        Index('ix_account_classifications_account', 'account_id', 'inputs_hash'),
+        Index('ix_account_classifications_report', 'report_id'),
+    )
+
+
+class FurnisherAddress(Base):
+    # Mailing addresses from CreditContact and DataFurnisher by normalized name, see furnisher_addresses
+    __tablename__ = 'furnisher_addresses'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    report_id = Column(Integer, ForeignKey('reports.id'))
+    source = Column(String(20))  # credit_contact or data_furnisher
+    source_id = Column(Integer)
+    name = Column(String)
+    key = Column(String)  # normalize_text(name) without spaces
+    address_line = Column(String)
+    city = Column(String)
+    state = Column(String)
+    zipcode = Column(String)
+    phone = Column(String)
+
+    __table_args__ = (
+        Index('ix_furnisher_addresses_key', 'key'),
+        Index('ix_furnisher_addresses_report', 'report_id'),
+    )
@@ -0,0 +1,82 @@
+from typing import Optional
+import re
+import unicodedata
+
+# Values the providers use for "not reported"
+PLACEHOLDERS = {'', '-', '--', 'n/a', 'none', 'null'}
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+# Masking at either end of an account number
+_EDGE_MASK = re.compile(r'^[X*]+|[X*]+$')
+_AMOUNT = re.compile(r'[^0-9.\-]')
+
+
+def is_placeholder(value) -> bool:
+    return value is None or (isinstance(value, str) and value.strip().lower() in PLACEHOLDERS)
+
+
+def normalize_text(value) -> str:
+    """
+    Case-folds, strips accents and collapses everything but letters and digits
+    to single spaces, so 'José  Smith' and 'JOSE SMITH' give the same key.
+    """
+    if is_placeholder(value):
+        return ''
+    value = unicodedata.normalize('NFKD', str(value).casefold())
+    value = ''.join(c for c in value if not unicodedata.combining(c))
+    return _NON_ALNUM.sub(' ', value).strip()
+
+
+def normalize_account_number(value) -> str:
+    """
+    Strips masking and punctuation from an account number.
+
+    Bureaus mask different ends of the same number ('515676900712****',
+    '51567690****', '-349993045357****'), so 'X' and '*' runs at either end
+    and anything that is not a letter, digit or '*' go. Masking inside the
+    number ('403216XXXXXX4781') is kept, as one 'X' per masked character,
+    so the visible head and tail are not joined into a number that was never
+    reported, and letters inside alphanumeric numbers ('2164149X3') survive.
+    """
+    if is_placeholder(value):
+        return ''
+    visible = _EDGE_MASK.sub('', re.sub(r'[^0-9A-Z*]', '', str(value).upper()))
+    return visible.replace('*', 'X')
+
+
+def normalize_month(value) -> Optional[str]:
+    """'YYYY-MM' from 'YYYY-MM-DD', 'YYYY-MM' or 'MM/DD/YYYY' dates."""
+    if is_placeholder(value):
+        return None
+    value = str(value).strip()
+    match = re.match(r'^(\d{4})-(\d{1,2})', value)
+    if match:
+        return f"{match.group(1)}-{int(match.group(2)):02d}"
+    match = re.match(r'^(\d{1,2})/\d{1,2}/(\d{4})', value)
+    if match:
+        return f"{match.group(2)}-{int(match.group(1)):02d}"
+    return None
+
+
+def normalize_date(value) -> Optional[str]:
+    """'YYYY-MM-DD' from 'YYYY-MM-DD' or 'MM/DD/YYYY' dates."""
+    if is_placeholder(value):
+        return None
+    value = str(value).strip()
+    match = re.match(r'^(\d{4})-(\d{1,2})-(\d{1,2})', value)
+    if match:
+        return f"{match.group(1)}-{int(match.group(2)):02d}-{int(match.group(3)):02d}"
+    match = re.match(r'^(\d{1,2})/(\d{1,2})/(\d{4})', value)
+    if match:
+        return f"{match.group(3)}-{int(match.group(1)):02d}-{int(match.group(2)):02d}"
+    return None
+
+
+def normalize_amount(value) -> Optional[float]:
+    """Parses '$19,919.00', '4052' and friends; placeholders give None."""
+    if is_placeholder(value):
+        return None
+    try:
+        return float(_AMOUNT.sub('', str(value)))
+    except ValueError:
+        return None
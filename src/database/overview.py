@@ -0,0 +1,158 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Optional
+import json
+from sqlalchemy import select, text
+from sqlalchemy.dialects.sqlite import insert
+from models import ReportOverview
+from normalize import is_placeholder, normalize_amount, normalize_text
+from payment_codec import BUREAU_NAMES, SEVERITY, encode_payment_history
+
+OPEN_STATUSES = {'open'}
+CLOSED_STATUSES = {'closed', 'paid', 'transferred', 'refinanced'}
+DEROGATORY_STATUSES = {'derogatory', 'collection', 'charge off', 'chargeoff'}
+
+SCORE_COLUMNS = {1: 'transunion_score', 2: 'equifax_score', 3: 'experian_score'}
+BALANCE_COLUMNS = {1: 'transunion_balance', 2: 'equifax_balance', 3: 'experian_balance'}
+
+
+def _first_name(value) -> Optional[str]:
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return None if is_placeholder(value) else value
+    if isinstance(value, list):
+        return next((v for v in value if isinstance(v, str) and not is_placeholder(v)), None)
+    return None
+
+
+def _worst_severity(start, codes, legacy, bureau_id) -> int:
+    if codes is None and legacy is not None:
+        start, codes = encode_payment_history(legacy, bureau_id)
+    return max((int(SEVERITY[ord(c)]) for c in codes or ''), default=-1)
+
+
+def build_report_overview(conn, report_id: int) -> Optional[Dict]:
+    """
+    Aggregates one report's child tables into a report_overviews row.
+
+    Args:
+        conn: SQLAlchemy connection (``session.connection()`` works during ingest).
+        report_id (int): Local id of the report.
+
+    Returns:
+        Optional[Dict]: Column values for report_overviews, or None if the report is missing.
+    """
+    report = conn.execute(text("SELECT id, slug FROM reports WHERE id = :id"), {'id': report_id}).first()
+    if report is None:
+        return None
+
+    row = {
+        'report_id': report_id,
+        'slug': report.slug,
+        'consumer_name': None,
+        'account_count': 0,
+        'open_accounts': 0,
+        'closed_accounts': 0,
+        'derogatory_accounts': 0,
+        'late_accounts': 0,
+        'inquiry_count': 0,
+        'public_records': 0,
+        'refreshed_at': datetime.utcnow(),
+    }
+    row.update({column: None for column in SCORE_COLUMNS.values()})
+    row.update({column: None for column in BALANCE_COLUMNS.values()})
+
+    # credit_scores keeps the provider's report id; only this pull's scores count
+    for bureau_id, score in conn.execute(text(
+        "SELECT credit_bureau_id, credit_score FROM credit_scores "
+        "WHERE report_id = (SELECT provider_report_id FROM reports WHERE id = :id) "
+        "ORDER BY id"
+    ), {'id': report_id}):
+        if bureau_id in SCORE_COLUMNS and score and str(score).isdigit():
+            row[SCORE_COLUMNS[bureau_id]] = int(score)
+
+    status_counts = defaultdict(lambda: defaultdict(int))
+    balances = defaultdict(float)
+    for bureau_id, status, balance, start, codes, legacy in conn.execute(text(
+        "SELECT credit_bureau_id, account_status, balance, payment_history_start, "
+        "payment_history_codes, payment_history FROM account_histories WHERE report_id = :id"
+    ), {'id': report_id}):
+        if is_placeholder(status):
+            continue
+        bureau = BUREAU_NAMES.get(bureau_id, str(bureau_id))
+        status_counts[bureau][status] += 1
+        normalized = normalize_text(status)
+        worst = _worst_severity(start, codes, legacy, bureau_id)
+        row['account_count'] += 1
+        row['open_accounts'] += normalized in OPEN_STATUSES
+        row['closed_accounts'] += normalized in CLOSED_STATUSES
+        row['derogatory_accounts'] += normalized in DEROGATORY_STATUSES or worst >= 7
+        row['late_accounts'] += 1 <= worst <= 6
+        amount = normalize_amount(balance)
+        if amount is not None and bureau_id in BALANCE_COLUMNS:
+            balances[bureau_id] += amount
+
+    for bureau_id, total in balances.items():
+        row[BALANCE_COLUMNS[bureau_id]] = total
+    row['status_counts'] = {bureau: dict(counts) for bureau, counts in status_counts.items()}
+
+    row['inquiry_count'] = conn.execute(text(
+        "SELECT COUNT(*) FROM inquiries WHERE report_id = :id"
+    ), {'id': report_id}).scalar()
+
+    for (public_records,) in conn.execute(text(
+        "SELECT public_records FROM summaries WHERE report_id = :id"
+    ), {'id': report_id}):
+        if public_records and str(public_records).isdigit():
+            row['public_records'] = max(row['public_records'], int(public_records))
+
+    for (name,) in conn.execute(text(
+        "SELECT name FROM personal_information WHERE report_id = :id ORDER BY credit_bureau_id"
+    ), {'id': report_id}):
+        row['consumer_name'] = _first_name(name)
+        if row['consumer_name']:
+            break
+
+    row['has_derogatory'] = int(row['derogatory_accounts'] > 0 or row['public_records'] > 0)
+    row['has_late_payments'] = int(row['late_accounts'] > 0)
+    return row
+
+
+def refresh_report_overview(conn, report_id: int) -> Optional[Dict]:
+    """Recomputes and upserts the overview row of one report."""
+    row = build_report_overview(conn, report_id)
+    if row is None:
+        conn.execute(ReportOverview.__table__.delete().where(
+            ReportOverview.__table__.c.report_id == report_id))
+        return None
+    statement = insert(ReportOverview.__table__).values(**row)
+    statement = statement.on_conflict_do_update(
+        index_elements=['report_id'],
+        set_={k: v for k, v in row.items() if k != 'report_id'},
+    )
+    conn.execute(statement)
+    return row
+
+
+def refresh_missing_overviews(engine) -> int:
+    """Builds overview rows for reports that do not have one yet."""
+    with engine.begin() as conn:
+        report_ids = [r for (r,) in conn.execute(text(
+            "SELECT id FROM reports WHERE id NOT IN (SELECT report_id FROM report_overviews)"
+        ))]
+        for report_id in report_ids:
+            refresh_report_overview(conn, report_id)
+    return len(report_ids)
+
+
+def get_report_overview(conn, report_id: int = None, slug: str = None) -> Optional[Dict]:
+    """Fetches one report's overview by id or slug with a single indexed lookup."""
+    table = ReportOverview.__table__
+    if report_id is not None:
+        query = select(table).where(table.c.report_id == report_id)
+    else:
+        query = select(table).where(table.c.slug == slug)
+    row = conn.execute(query.limit(1)).mappings().first()
+    return dict(row) if row else None
@@ -0,0 +1,289 @@
+from contextlib import closing
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+import logging
+import sqlite3
+import time
+from sqlalchemy import DateTime, Float, Integer
+import numpy as np
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError as exc:
+    raise ImportError(
+        "parquet_export needs pyarrow; install it with `pip install pyarrow` "
+        "(it is listed in src/requirements.txt)."
+    ) from exc
+from models import Base
+from payment_codec import NO_DATA, SEVERITY, codes_matrix, encode_payment_history, start_months
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched from SQLite per record batch; bounds memory per table
+DEFAULT_CHUNK_SIZE = 50_000
+
+# Tables whose report_id is the provider's, see reports.provider_report_id
+PROVIDER_REPORT_TABLES = ('credit_scores', 'credit_contacts')
+
+# Derived table with one row per account and reported month
+PAYMENT_HISTORY_TABLE = 'payment_history_months'
+
+PAYMENT_HISTORY_SCHEMA = pa.schema([
+    ('account_id', pa.int64()),
+    ('report_id', pa.int64()),
+    ('credit_bureau_id', pa.int64()),
+    ('month', pa.date32()),
+    ('status', pa.string()),
+    ('severity', pa.int8()),
+])
+
+_PAYMENT_COLUMNS = ("id, report_id, credit_bureau_id, payment_history_start, "
+                    "payment_history_codes, payment_history")
+
+
+def arrow_type(column) -> pa.DataType:
+    """Arrow type for a model column. JSON columns are kept as their JSON text."""
+    if isinstance(column.type, Integer):
+        return pa.int64()
+    if isinstance(column.type, Float):
+        return pa.float64()
+    if isinstance(column.type, DateTime):
+        return pa.timestamp('us')
+    return pa.string()
+
+
+def table_schema(table, columns: Optional[Sequence[str]] = None) -> pa.Schema:
+    """
+    Arrow schema of a model table, optionally projected to some columns.
+
+    The schema is fixed up front from the model rather than inferred per
+    chunk, so a chunk of all-NULL values cannot change a column's type.
+    """
+    if columns is None:
+        columns = [c.name for c in table.columns]
+    unknown = [c for c in columns if c not in table.columns]
+    if unknown:
+        raise ValueError(f"Unknown column(s) for {table.name}: {', '.join(unknown)}")
+    return pa.schema([(name, arrow_type(table.columns[name])) for name in columns])
+
+
+def _report_filter(table, report_ids: Optional[Sequence[int]]):
+    if report_ids is None:
+        return "", []
+    key = 'id' if table.name == 'reports' else 'report_id'
+    if key not in table.columns:
+        return None, []
+    placeholders = ", ".join("?" for _ in report_ids)
+    if table.name in PROVIDER_REPORT_TABLES:
+        return (f" WHERE report_id IN (SELECT provider_report_id FROM reports WHERE id IN ({placeholders}))",
+                [int(r) for r in report_ids])
+    return f" WHERE {key} IN ({placeholders})", [int(r) for r in report_ids]
+
+
+def _to_array(values: List, type_: pa.DataType) -> pa.Array:
+    if pa.types.is_timestamp(type_):
+        # SQLite hands DateTime columns back as 'YYYY-MM-DD HH:MM:SS.ffffff' text
+        return pa.array(values, type=pa.string()).cast(type_)
+    if pa.types.is_string(type_):
+        return pa.array([v if v is None or isinstance(v, str) else str(v) for v in values], type=type_)
+    return pa.array(values, type=type_)
+
+
+def read_batches(conn: sqlite3.Connection, table, schema: pa.Schema,
+                 report_ids: Optional[Sequence[int]] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[pa.RecordBatch]:
+    """
+    Streams a table as Arrow record batches of at most ``chunk_size`` rows.
+
+    Tables without a report id column yield nothing when ``report_ids`` is given.
+    """
+    where, params = _report_filter(table, report_ids)
+    if where is None:
+        return
+    column_list = ", ".join(f'"{name}"' for name in schema.names)
+    cursor = conn.execute(f'SELECT {column_list} FROM "{table.name}"{where}', params)
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        columns = zip(*rows)
+        arrays = [_to_array(list(values), field.type) for values, field in zip(columns, schema)]
+        yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def explode_payment_history(rows: Sequence[tuple]) -> pa.RecordBatch:
+    """
+    Turns account rows into one row per reported month.
+
+    Args:
+        rows: Tuples of (id, report_id, credit_bureau_id, payment_history_start,
+            payment_history_codes, payment_history).
+
+    Returns:
+        pa.RecordBatch: Rows matching PAYMENT_HISTORY_SCHEMA, newest month first per account.
+    """
+    account_ids, report_ids, bureau_ids, starts, codes = [], [], [], [], []
+    for account_id, report_id, bureau_id, start, packed, legacy in rows:
+        if packed is None and legacy is not None:
+            start, packed = encode_payment_history(legacy, bureau_id)
+        if not packed:
+            continue
+        account_ids.append(account_id)
+        report_ids.append(report_id)
+        bureau_ids.append(bureau_id)
+        starts.append(start)
+        codes.append(packed)
+
+    matrix = codes_matrix(codes)
+    row_index, offset = np.nonzero((matrix != 0) & (matrix != ord(NO_DATA)))
+    start = start_months(starts)[row_index]
+    month = np.where(start >= 0, start - offset, -1).astype('datetime64[M]')
+    month[start < 0] = np.datetime64('NaT')
+    status = matrix[row_index, offset]
+
+    arrays = [
+        pa.array(np.asarray(account_ids, dtype=np.int64)[row_index]),
+        pa.array(np.asarray(report_ids, dtype=np.int64)[row_index]),
+        pa.array([bureau_ids[i] for i in row_index], type=pa.int64()),
+        pa.array(month.astype('datetime64[D]'), type=pa.date32()),
+        pa.array(status.view('S1').astype(str)),
+        pa.array(SEVERITY[status]),
+    ]
+    return pa.RecordBatch.from_arrays(arrays, schema=PAYMENT_HISTORY_SCHEMA)
+
+
+class ParquetExporter:
+    """
+    Streams the credit report database into one Parquet file per table.
+
+    Rows are read with a plain sqlite3 cursor in chunks and appended to a
+    ParquetWriter as record batches, so memory is bounded by the chunk size,
+    not the table size.
+    """
+
+    def __init__(self, db_path="credit_reports.db", chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 compression: str = 'zstd'):
+        self.db_path = db_path
+        self.chunk_size = chunk_size
+        self.compression = compression
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+
+    def _existing_tables(self, conn) -> Dict[str, object]:
+        names = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        return {t.name: t for t in Base.metadata.sorted_tables if t.name in names}
+
+    def _write(self, path: Path, schema: pa.Schema, batches: Iterable[pa.RecordBatch]) -> int:
+        rows = 0
+        with pq.ParquetWriter(path, schema, compression=self.compression) as writer:
+            for batch in batches:
+                if batch.num_rows:
+                    writer.write_batch(batch)
+                    rows += batch.num_rows
+        return rows
+
+    def export_table(self, table_name: str, output_dir, columns: Optional[Sequence[str]] = None,
+                     report_ids: Optional[Sequence[int]] = None) -> int:
+        """
+        Exports one table to ``<output_dir>/<table_name>.parquet``.
+
+        Args:
+            table_name (str): Table to export.
+            output_dir: Directory for the Parquet file.
+            columns (Sequence[str], optional): Columns to keep. All columns by default.
+            report_ids (Sequence[int], optional): Only export rows of these reports.
+
+        Returns:
+            int: Number of rows written.
+        """
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn:
+            tables = self._existing_tables(conn)
+            if table_name not in tables:
+                raise ValueError(f"Unknown table: {table_name}")
+            table = tables[table_name]
+            schema = table_schema(table, columns)
+            batches = read_batches(conn, table, schema, report_ids, self.chunk_size)
+            return self._write(output_dir / f"{table_name}.parquet", schema, batches)
+
+    def export_payment_history(self, output_dir, report_ids: Optional[Sequence[int]] = None) -> int:
+        """Exports payment histories exploded to one row per account and month."""
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn:
+            where, params = _report_filter(Base.metadata.tables['account_histories'], report_ids)
+            cursor = conn.execute(f"SELECT {_PAYMENT_COLUMNS} FROM account_histories{where}", params)
+
+            def batches():
+                while True:
+                    rows = cursor.fetchmany(self.chunk_size)
+                    if not rows:
+                        break
+                    yield explode_payment_history(rows)
+
+            return self._write(output_dir / f"{PAYMENT_HISTORY_TABLE}.parquet",
+                               PAYMENT_HISTORY_SCHEMA, batches())
+
+    def export(self, output_dir, tables: Optional[Sequence[str]] = None,
+               columns: Optional[Dict[str, Sequence[str]]] = None,
+               report_ids: Optional[Sequence[int]] = None,
+               explode_payment_history: bool = False) -> Dict[str, int]:
+        """
+        Exports tables of the database to Parquet.
+
+        Args:
+            output_dir: Directory for the Parquet files.
+            tables (Sequence[str], optional): Tables to export. Every table by default.
+            columns (Dict[str, Sequence[str]], optional): Per-table column projection.
+            report_ids (Sequence[int], optional): Only export rows of these reports.
+            explode_payment_history (bool): Also write PAYMENT_HISTORY_TABLE.
+
+        Returns:
+            Dict[str, int]: Rows written per table.
+        """
+        columns = columns or {}
+        with closing(self._connect()) as conn:
+            names = list(self._existing_tables(conn))
+        counts = {}
+        for name in tables or names:
+            t0 = time.perf_counter()
+            counts[name] = self.export_table(name, output_dir, columns.get(name), report_ids)
+            logger.info(f"Exported {counts[name]} rows of {name} in {time.perf_counter() - t0:.2f}s")
+        if explode_payment_history:
+            t0 = time.perf_counter()
+            counts[PAYMENT_HISTORY_TABLE] = self.export_payment_history(output_dir, report_ids)
+            logger.info(f"Exported {counts[PAYMENT_HISTORY_TABLE]} payment history months "
+                        f"in {time.perf_counter() - t0:.2f}s")
+        return counts
+
+
+def main():
+    import argparse
+    from tabulate import tabulate
+
+    parser = argparse.ArgumentParser(description="Export the credit report database to Parquet")
+    parser.add_argument('output_dir')
+    parser.add_argument('--db', default="credit_reports.db")
+    parser.add_argument('--tables', nargs='+', help="Tables to export (default: all)")
+    parser.add_argument('--columns', nargs='+', default=[],
+                        help="Column projection as table=col1,col2")
+    parser.add_argument('--report-ids', nargs='+', type=int)
+    parser.add_argument('--explode-payment-history', action='store_true')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    columns = {}
+    for spec in args.columns:
+        table, _, names = spec.partition('=')
+        columns[table] = names.split(',')
+
+    counts = ParquetExporter(args.db, chunk_size=args.chunk_size).export(
+        args.output_dir, args.tables, columns, args.report_ids, args.explode_payment_history)
+    print(tabulate(list(counts.items()), headers=['Table', 'Rows'], tablefmt='grid'))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence
+from sqlalchemy import bindparam, text
+from db_manager import DatabaseManager
+from payment_codec import BUREAU_NAMES, encode_payment_history, severity_matrix, start_months
+import numpy as np
+import pandas as pd
+
+# Window used to compare recent delinquency against the year before it
+TREND_WINDOW_MONTHS = 12
+
+
+@dataclass
+class PaymentMatrix:
+    """
+    Payment histories of many accounts as aligned NumPy arrays.
+
+    Row i of ``severity`` is account i; column j is the month ``start[i] - j``
+    (months since 1970-01). Severity is 0 for current, 1-6 for 30-180 days
+    late, 7-9 for major derogatory codes and -1 for unreported months.
+    """
+    account_ids: np.ndarray
+    report_ids: np.ndarray
+    bureau_ids: np.ndarray
+    start: np.ndarray
+    severity: np.ndarray
+
+    def __len__(self):
+        return len(self.account_ids)
+
+    @property
+    def calendar(self) -> np.ndarray:
+        """Month (since 1970-01) of every cell in ``severity``."""
+        return self.start[:, None] - np.arange(self.severity.shape[1])[None, :]
+
+
+def _month_labels(months: np.ndarray) -> np.ndarray:
+    labels = months.astype('datetime64[M]').astype(str).astype(object)
+    labels[months < 0] = None
+    return labels
+
+
+def longest_run(mask: np.ndarray) -> np.ndarray:
+    """Length of the longest run of True values in each row of a boolean matrix."""
+    if mask.shape[1] == 0:
+        return np.zeros(mask.shape[0], dtype=np.int64)
+    filled = np.cumsum(mask, axis=1)
+    # Count at the last break before each cell; subtracting it restarts the run
+    at_break = np.where(mask, 0, filled)
+    run = filled - np.maximum.accumulate(at_break, axis=1)
+    return run.max(axis=1)
+
+
+def account_metrics(matrix: PaymentMatrix) -> pd.DataFrame:
+    """
+    Computes per-account late payment metrics in bulk.
+
+    Returns:
+        pd.DataFrame: One row per account indexed by account id, with late counts
+        by severity, the worst severity, the most recent delinquent month and the
+        longest streak of consecutive current months.
+    """
+    severity = matrix.severity
+    late = severity >= 1
+    has_late = late.any(axis=1)
+    latest_offset = np.argmax(late, axis=1)
+    latest_month = np.where(has_late, matrix.start - latest_offset, -1)
+
+    return pd.DataFrame({
+        'report_id': matrix.report_ids,
+        'credit_bureau_id': matrix.bureau_ids,
+        'reported_months': (severity >= 0).sum(axis=1),
+        'late_30': (severity == 1).sum(axis=1),
+        'late_60': (severity == 2).sum(axis=1),
+        'late_90': (severity == 3).sum(axis=1),
+        'late_120_plus': ((severity >= 4) & (severity <= 6)).sum(axis=1),
+        'derogatory_months': (severity >= 7).sum(axis=1),
+        'worst_severity': severity.max(axis=1, initial=-1),
+        'most_recent_delinquency': _month_labels(latest_month),
+        'longest_clean_streak': longest_run(severity == 0),
+    }, index=pd.Index(matrix.account_ids, name='account_id'))
+
+
+def bureau_trends(matrix: PaymentMatrix, window: int = TREND_WINDOW_MONTHS) -> pd.DataFrame:
+    """
+    Compares delinquency per report and bureau over the latest window against the one before.
+
+    The window ends at the newest month any bureau reported for the report, so
+    all three bureaus are judged over the same calendar months.
+
+    Returns:
+        pd.DataFrame: Indexed by (report_id, credit_bureau_id) with account and late
+        month totals, recent/prior late months and a trend label.
+    """
+    if len(matrix) == 0:
+        return pd.DataFrame(columns=['accounts', 'late_months', 'recent_late', 'prior_late', 'trend'])
+
+    report_codes, report_index = np.unique(matrix.report_ids, return_inverse=True)
+    as_of = np.full(len(report_codes), -1, dtype=np.int64)
+    np.maximum.at(as_of, report_index, matrix.start)
+
+    age = as_of[report_index][:, None] - matrix.calendar
+    late = matrix.severity >= 1
+    recent = (late & (age >= 0) & (age < window)).sum(axis=1)
+    prior = (late & (age >= window) & (age < 2 * window)).sum(axis=1)
+
+    frame = pd.DataFrame({
+        'report_id': matrix.report_ids,
+        'credit_bureau_id': matrix.bureau_ids,
+        'accounts': 1,
+        'late_months': late.sum(axis=1),
+        'recent_late': recent,
+        'prior_late': prior,
+    })
+    trends = frame.groupby(['report_id', 'credit_bureau_id']).sum()
+    trends['bureau'] = [BUREAU_NAMES.get(b, str(b)) for b in trends.index.get_level_values(1)]
+    trends['trend'] = np.select(
+        [trends['recent_late'] > trends['prior_late'], trends['recent_late'] < trends['prior_late']],
+        ['worsening', 'improving'],
+        default='stable',
+    )
+    return trends
+
+
+class PaymentAnalytics:
+    def __init__(self, db_path="credit_reports.db"):
+        self.engine = DatabaseManager(db_path).engine
+
+    def load_matrix(self, report_ids: Optional[Sequence[int]] = None) -> PaymentMatrix:
+        """
+        Loads payment histories into a PaymentMatrix.
+
+        Args:
+            report_ids (Sequence[int], optional): Reports to load. Loads every
+                report in the database when omitted.
+
+        Returns:
+            PaymentMatrix: Aligned arrays for every account with a payment history.
+        """
+        sql = ("SELECT id, report_id, credit_bureau_id, payment_history_start, "
+               "payment_history_codes, payment_history FROM account_histories")
+        params = {}
+        if report_ids is not None:
+            sql += " WHERE report_id IN :report_ids"
+            params = {'report_ids': [int(r) for r in report_ids]}
+        query = text(sql)
+        if params:
+            query = query.bindparams(bindparam('report_ids', expanding=True))
+
+        with self.engine.connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+
+        account_ids, reports, bureaus, starts, codes = [], [], [], [], []
+        for account_id, report_id, bureau_id, start, packed, legacy in rows:
+            if packed is None and legacy is not None:
+                # Rows written before payment_codec; encode them on the fly
+                start, packed = encode_payment_history(legacy, bureau_id)
+            if not packed:
+                continue
+            account_ids.append(account_id)
+            reports.append(report_id)
+            bureaus.append(bureau_id or 0)
+            starts.append(start)
+            codes.append(packed)
+
+        return PaymentMatrix(
+            account_ids=np.array(account_ids, dtype=np.int64),
+            report_ids=np.array(reports, dtype=np.int64),
+            bureau_ids=np.array(bureaus, dtype=np.int64),
+            start=start_months(starts),
+            severity=severity_matrix(codes),
+        )
+
+    def for_report(self, report_id: int) -> pd.DataFrame:
+        """Per-account late payment metrics for one report."""
+        return account_metrics(self.load_matrix([report_id]))
+
+    def all_reports(self) -> pd.DataFrame:
+        """Per-account late payment metrics for every report in the database."""
+        return account_metrics(self.load_matrix())
+
+    def bureau_trends(self, report_ids: Optional[Sequence[int]] = None) -> pd.DataFrame:
+        return bureau_trends(self.load_matrix(report_ids))
+
+    def late_summary(self, report_id: int) -> Dict[int, Dict]:
+        """
+        Per-account metrics for one report as plain dicts keyed by account id.
+
+        This is the shape the request pipeline consumes.
+        """
+        metrics = self.for_report(report_id)
+        summary = {int(account_id): values for account_id, values in metrics.to_dict(orient='index').items()}
+        for values in summary.values():
+            # pandas turns the None of accounts without delinquencies into NaN
+            month = values['most_recent_delinquency']
+            values['most_recent_delinquency'] = None if isinstance(month, float) and np.isnan(month) else month
+        return summary
+
+
+def main():
+    import sys
+    import time
+
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "credit_reports.db"
+    analytics = PaymentAnalytics(db_path)
+    t0 = time.perf_counter()
+    matrix = analytics.load_matrix()
+    t1 = time.perf_counter()
+    metrics = account_metrics(matrix)
+    trends = bureau_trends(matrix)
+    t2 = time.perf_counter()
+
+    print(f"Loaded {len(matrix)} payment histories in {(t1 - t0) * 1000:.1f} ms, "
+          f"computed metrics in {(t2 - t1) * 1000:.1f} ms")
+    print(metrics[metrics['worst_severity'] > 0].head(20).to_string())
+    print(trends.to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+import json
+import numpy as np
+
+# Monthly payment status codes, one ASCII character per month, newest first.
+# These are the codes the bureaus already use in MonthlyPayStatus.
+CURRENT = 'C'
+NO_DATA = ' '
+UNKNOWN = 'U'
+
+BUREAU_NAMES = {1: 'TransUnion', 2: 'Equifax', 3: 'Experian'}
+
+# The Month/Year grid format carries every bureau in one blob; each row
+# only keeps the column of its own bureau.
+BUREAU_COLUMNS = BUREAU_NAMES
+
+GRID_TOKENS = {
+    '': NO_DATA,
+    'OK': CURRENT,
+    '30': '1',
+    '60': '2',
+    '90': '3',
+    '120': '4',
+    '150': '5',
+    '180': '6',
+    'CO': '9',
+}
+
+MONTH_NAMES = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+               'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+# Severity per status byte: 0 current, 1-6 for 30-180 days late, 7-9 for
+# wage earner plan, repossession/foreclosure and collection/charge-off.
+# Unreported and unknown months are -1. Padding bytes (NUL) are unreported.
+SEVERITY = np.full(256, -1, dtype=np.int8)
+SEVERITY[ord(CURRENT)] = 0
+SEVERITY[ord('0')] = 0
+for _level in range(1, 10):
+    SEVERITY[ord(str(_level))] = _level
+
+
+def month_ordinal(value: str) -> Optional[int]:
+    """Parses 'YYYY-MM[-DD]' or 'MM/DD/YYYY' into months since year 0."""
+    if not value:
+        return None
+    try:
+        if '/' in value:
+            month, _, year = value.split('/')
+        else:
+            year, month = value.split('-')[:2]
+        return int(year) * 12 + int(month) - 1
+    except ValueError:
+        return None
+
+
+def month_string(ordinal: int) -> str:
+    return f"{ordinal // 12:04d}-{ordinal % 12 + 1:02d}"
+
+
+def _rank(code: str) -> Tuple[int, bool]:
+    """Orders codes for one month: the most severe wins, and any reported code beats a blank."""
+    return int(SEVERITY[ord(code)]) if code.isascii() else -1, code != NO_DATA
+
+
+def _place(entries: List[Tuple[Optional[int], str]], start: Optional[int]) -> str:
+    """
+    Lays (month, code) pairs out as a newest-first string starting at `start`.
+
+    Some providers report two entries in one calendar month (e.g. the 1st and
+    the 30th); those are folded into the worst status of the two rather than
+    keeping whichever came first. Undated entries cannot be placed on a dated
+    history and are skipped.
+    """
+    if start is None:
+        return ''.join(code for _, code in entries)
+    slots = {}
+    for month, code in entries:
+        if month is None or month > start:
+            continue
+        offset = start - month
+        if offset not in slots or _rank(code) > _rank(slots[offset]):
+            slots[offset] = code
+    if not slots:
+        return ''
+    return ''.join(slots.get(i, NO_DATA) for i in range(max(slots) + 1))
+
+
+def _normalize_code(code) -> str:
+    code = (code or NO_DATA)[:1]
+    return code if code.isascii() else UNKNOWN
+
+
+def _encode_grid(history: Dict, credit_bureau_id: Optional[int]) -> Tuple[Optional[str], str]:
+    column = history.get(BUREAU_COLUMNS.get(credit_bureau_id, ''), [])
+    entries = []
+    for year, month, token in zip(history.get('Year', []), history.get('Month', []), column):
+        try:
+            ordinal = (2000 + int(year)) * 12 + MONTH_NAMES.index(month[:3].title())
+        except ValueError:
+            ordinal = None
+        entries.append((ordinal, GRID_TOKENS.get(token.strip().upper(), UNKNOWN)))
+    months = [m for m, _ in entries if m is not None]
+    start = max(months) if months else None
+    codes = _place(entries, start)
+    if not codes.strip():
+        return None, ''
+    return (month_string(start) if start is not None else None), codes
+
+
+def encode_payment_history(payment_history, credit_bureau_id: Optional[int] = None) -> Tuple[Optional[str], str]:
+    """
+    Packs a payment history blob into a start month and a status code string.
+
+    Handles the three shapes the report providers send: plain keys
+    (``startDate``/``MonthlyPayStatus``), XML-style ``@``-prefixed keys, and
+    the Month/Year grid with one column per bureau.
+
+    Args:
+        payment_history: The decoded ``payment_history`` JSON value.
+        credit_bureau_id (int, optional): Bureau of the account row, used to pick
+            the column out of grid-format histories.
+
+    Returns:
+        Tuple[Optional[str], str]: ``('YYYY-MM', codes)`` where ``codes`` holds one
+        status character per month, newest first. Empty histories give ``(None, '')``.
+    """
+    if isinstance(payment_history, str):
+        payment_history = json.loads(payment_history) if payment_history.strip() else None
+    if not isinstance(payment_history, dict):
+        return None, ''
+    if 'Month' in payment_history:
+        return _encode_grid(payment_history, credit_bureau_id)
+
+    monthly = payment_history.get('MonthlyPayStatus') or []
+    if isinstance(monthly, dict):
+        monthly = [monthly]
+    entries = []
+    for entry in monthly:
+        month = month_ordinal(entry.get('date') or entry.get('@date'))
+        code = entry.get('status', entry.get('@status'))
+        entries.append((month, _normalize_code(code)))
+
+    start = month_ordinal(payment_history.get('startDate') or payment_history.get('@startDate'))
+    months = [m for m, _ in entries if m is not None]
+    if months:
+        start = max(months + ([start] if start is not None else []))
+    codes = _place(entries, start)
+    if not codes:
+        summary = payment_history.get('status', payment_history.get('@status')) or ''
+        codes = ''.join(_normalize_code(c) for c in summary)
+    if not codes.strip():
+        return None, ''
+    return (month_string(start) if start is not None else None), codes
+
+
+def decode_payment_history(start: Optional[str], codes: Optional[str]) -> Optional[Dict]:
+    """
+    Rebuilds a payment history from its compact form, for rows that were
+    packed without keeping the JSON.
+
+    This is not a lossless inverse of encode_payment_history: dates come back
+    as the first day of each month, months reported twice come back once with
+    their worst status, '@'-prefixed keys come back plain and grid histories
+    keep only the row's own bureau. The raw ``payment_history`` column stays
+    the source of truth.
+    """
+    if not codes:
+        return None
+    ordinal = month_ordinal(start) if start else None
+    monthly = []
+    for offset, code in enumerate(codes):
+        entry = {'status': code}
+        if ordinal is not None:
+            entry = {'date': f"{month_string(ordinal - offset)}-01", 'status': code}
+        monthly.append(entry)
+    return {
+        'status': codes,
+        'startDate': f"{start}-01" if start else None,
+        'MonthlyPayStatus': monthly,
+    }
+
+
+def codes_matrix(codes: Sequence[Optional[str]], width: Optional[int] = None) -> np.ndarray:
+    """
+    Decodes packed status strings into an (accounts x months) uint8 matrix.
+
+    Column 0 is each account's start month. Shorter histories are padded
+    with NUL bytes, which SEVERITY maps to unreported.
+    """
+    codes = [c or '' for c in codes]
+    if width is None:
+        width = max((len(c) for c in codes), default=0)
+    if not codes or width == 0:
+        return np.zeros((len(codes), width), dtype=np.uint8)
+    packed = np.array(codes, dtype=f'S{width}')
+    return packed.view(np.uint8).reshape(len(codes), width)
+
+
+def start_months(starts: Sequence[Optional[str]]) -> np.ndarray:
+    """Converts 'YYYY-MM' start months to months since 1970-01 (int64, -1 when missing)."""
+    months = np.array([s or 'NaT' for s in starts], dtype='datetime64[M]')
+    ordinals = months.astype(np.int64)
+    ordinals[np.isnat(months)] = -1
+    return ordinals
+
+
+def severity_matrix(codes: Sequence[Optional[str]], width: Optional[int] = None) -> np.ndarray:
+    """Decodes packed status strings straight into an int8 severity matrix."""
+    return SEVERITY[codes_matrix(codes, width)]
+
+
+def late_counts(severity: np.ndarray) -> Dict[str, np.ndarray]:
+    """Per-account 30/60/90+ day late month counts from a severity matrix."""
+    return {
+        'late_30': (severity == 1).sum(axis=1),
+        'late_60': (severity == 2).sum(axis=1),
+        'late_90_plus': (severity >= 3).sum(axis=1),
+    }
+
+
+def benchmark(db_path="credit_reports.db"):
+    """
+    Compares parsing the JSON against the packed encoding on a database.
+
+    The byte counts show how much smaller the packed columns are, but they
+    are stored in addition to the JSON, not instead of it.
+    """
+    import sqlite3
+    import time
+
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute(
+        "SELECT credit_bureau_id, payment_history FROM account_histories "
+        "WHERE payment_history IS NOT NULL"
+    ).fetchall()
+    conn.close()
+
+    json_bytes = sum(len(ph.encode('utf-8')) for _, ph in rows)
+    t0 = time.perf_counter()
+    json_late = [0, 0, 0]
+    for _, ph in rows:
+        history = json.loads(ph)
+        if not isinstance(history, dict):
+            continue
+        if 'Month' in history:
+            continue  # grid histories need bureau-aware handling, skip for the baseline
+        monthly = history.get('MonthlyPayStatus') or []
+        for entry in monthly if isinstance(monthly, list) else [monthly]:
+            status = entry.get('status', entry.get('@status'))
+            if status == '1':
+                json_late[0] += 1
+            elif status == '2':
+                json_late[1] += 1
+            elif status and status in '3456789':
+                json_late[2] += 1
+    json_seconds = time.perf_counter() - t0
+
+    encoded = [encode_payment_history(ph, bureau) for bureau, ph in rows]
+    packed_bytes = sum(len(codes) + len(start or '') for start, codes in encoded)
+    codes = [c for _, c in encoded]
+    t0 = time.perf_counter()
+    counts = late_counts(severity_matrix(codes))
+    packed_seconds = time.perf_counter() - t0
+
+    print(f"Accounts:        {len(rows)}")
+    print(f"JSON storage:    {json_bytes:,} bytes, late counts in {json_seconds * 1000:.2f} ms")
+    print(f"Packed columns:  {packed_bytes:,} bytes (extra), late counts in {packed_seconds * 1000:.2f} ms")
+    print(f"Late 30/60/90+:  {[int(v.sum()) for v in counts.values()]}")
+
+
+if __name__ == "__main__":
+    import sys
+    benchmark(sys.argv[1] if len(sys.argv) > 1 else "credit_reports.db")
@@ -0,0 +1,147 @@
+from sqlalchemy import create_engine, text
+from tabulate import tabulate
+import sys
+
+# Queries issued on every per-report read. Parameters hold representative
+# values; only the plan matters, not the rows returned.
+HOT_QUERIES = {
+    'report_by_slug': (
+        "SELECT id FROM reports WHERE slug = :slug",
+        {'slug': ''},
+    ),
+    'accounts_by_report': (
+        "SELECT * FROM account_histories WHERE report_id = :report_id",
+        {'report_id': 1},
+    ),
+    'accounts_by_report_bureau': (
+        "SELECT * FROM account_histories WHERE report_id = :report_id AND credit_bureau_id = :bureau_id",
+        {'report_id': 1, 'bureau_id': 1},
+    ),
+    'accounts_by_report_status': (
+        "SELECT * FROM account_histories WHERE report_id = :report_id AND account_status = :status",
+        {'report_id': 1, 'status': 'Derogatory'},
+    ),
+    'accounts_by_furnisher': (
+        "SELECT * FROM account_histories WHERE furnisher_name = :name",
+        {'name': ''},
+    ),
+    'account_by_number': (
+        "SELECT * FROM account_histories WHERE account_number = :number",
+        {'number': ''},
+    ),
+    'previous_report_by_user': (
+        "SELECT MAX(report_id) FROM account_histories WHERE user_id = :user_id AND report_id < :report_id",
+        {'user_id': 1, 'report_id': 1},
+    ),
+    'inquiries_by_report': (
+        "SELECT * FROM inquiries WHERE report_id = :report_id ORDER BY date_of_inquiry",
+        {'report_id': 1},
+    ),
+    'inquiries_since': (
+        "SELECT * FROM inquiries WHERE report_id = :report_id AND date_of_inquiry >= :since",
+        {'report_id': 1, 'since': '2023-01-01'},
+    ),
+    'scores_by_report': (
+        "SELECT * FROM credit_scores WHERE report_id = "
+        "(SELECT provider_report_id FROM reports WHERE id = :report_id)",
+        {'report_id': 1},
+    ),
+    'summaries_by_report': (
+        "SELECT * FROM summaries WHERE report_id = :report_id",
+        {'report_id': 1},
+    ),
+    'personal_information_by_report': (
+        "SELECT * FROM personal_information WHERE report_id = :report_id",
+        {'report_id': 1},
+    ),
+    'contacts_by_report': (
+        "SELECT * FROM credit_contacts WHERE report_id = "
+        "(SELECT provider_report_id FROM reports WHERE id = :report_id)",
+        {'report_id': 1},
+    ),
+    'contacts_by_creditor': (
+        "SELECT * FROM credit_contacts WHERE creditor_name = :name",
+        {'name': ''},
+    ),
+    'overview_by_report': (
+        "SELECT * FROM report_overviews WHERE report_id = :report_id",
+        {'report_id': 1},
+    ),
+    'overview_by_slug': (
+        "SELECT * FROM report_overviews WHERE slug = :slug",
+        {'slug': ''},
+    ),
+    'identity_by_name': (
+        "SELECT report_id FROM identity_keys WHERE kind IN ('name', 'aka_name') AND key >= :low AND key < :high",
+        {'low': 'john', 'high': 'john~'},
+    ),
+    'furnishers_by_report': (
+        "SELECT * FROM data_furnishers WHERE report_id = :report_id",
+        {'report_id': 1},
+    ),
+}
+
+
+def explain(conn, sql, params=None):
+    """Returns the EXPLAIN QUERY PLAN detail lines for a statement."""
+    rows = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params or {}).fetchall()
+    return [row[-1] for row in rows]
+
+
+def find_scans(plan):
+    """
+    Picks out the plan steps that read a whole table or index.
+
+    SQLite reports index lookups as ``SEARCH`` and full passes as ``SCAN``;
+    a sort that cannot use an index shows up as ``USE TEMP B-TREE``.
+    """
+    return [step for step in plan
+            if step.startswith('SCAN') or 'USE TEMP B-TREE' in step]
+
+
+class QueryPlanChecker:
+    def __init__(self, db_path="credit_reports.db"):
+        self.engine = create_engine(f'sqlite:///{db_path}')
+
+    def check(self, queries=None):
+        """
+        Explains each hot query and flags the ones that scan.
+
+        Args:
+            queries (Dict[str, Tuple[str, Dict]], optional): Named queries to check.
+                Defaults to HOT_QUERIES.
+
+        Returns:
+            List[Dict]: One entry per query with its plan and flagged steps.
+        """
+        results = []
+        with self.engine.connect() as conn:
+            for name, (sql, params) in (queries or HOT_QUERIES).items():
+                plan = explain(conn, sql, params)
+                results.append({
+                    'query': name,
+                    'plan': plan,
+                    'scans': find_scans(plan),
+                })
+        return results
+
+    def report(self, queries=None):
+        results = self.check(queries)
+        rows = [(r['query'], "\n".join(r['plan']), 'SCAN' if r['scans'] else 'ok')
+                for r in results]
+        print("\nHot Query Plans:")
+        print(tabulate(rows, headers=['Query', 'Plan', 'Status'], tablefmt='grid'))
+        return results
+
+
+def main():
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "credit_reports.db"
+    results = QueryPlanChecker(db_path).report()
+    flagged = [r['query'] for r in results if r['scans']]
+    if flagged:
+        print(f"\n{len(flagged)} query(ies) scan: {', '.join(flagged)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
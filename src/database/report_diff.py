@@ -0,0 +1,283 @@
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import text
+from classification_inputs import CLASSIFICATION_FIELDS
+from db_manager import DatabaseManager
+from models import AccountClassification
+from normalize import is_placeholder, normalize_account_number, normalize_month, normalize_text
+from payment_codec import SEVERITY, encode_payment_history, month_ordinal, month_string
+
+# Fields compared between pulls. Values are compared as stored text except
+# payment history, which is compared month by month.
+DIFF_FIELDS = (
+    'account_status', 'payment_status', 'balance', 'past_due', 'credit_limit', 'high_credit',
+    'monthly_payment', 'date_last_payment', 'date_last_active', 'late_status', 'comments',
+)
+
+# A change in one of these makes the prior classification unusable. Balance
+# and payment dates move every month without changing the category.
+RECLASSIFY_FIELDS = set(CLASSIFICATION_FIELDS) | {'payment_history'}
+
+ACCOUNT_COLUMNS = (
+    "id, report_id, user_id, credit_bureau_id, furnisher_name, account_number, date_opened, "
+    + ", ".join(DIFF_FIELDS)
+    + ", payment_history_start, payment_history_codes, payment_history"
+)
+
+
+@dataclass
+class FieldChange:
+    field: str
+    old: object
+    new: object
+
+
+@dataclass
+class AccountChange:
+    key: Tuple
+    old_id: int
+    new_id: int
+    changes: List[FieldChange]
+
+    @property
+    def needs_reclassification(self) -> bool:
+        return any(change.field in RECLASSIFY_FIELDS for change in self.changes)
+
+
+@dataclass
+class ReportDiff:
+    report_id: int
+    previous_report_id: Optional[int]
+    added: List[int] = field(default_factory=list)  # account ids in the new report
+    removed: List[int] = field(default_factory=list)  # account ids in the previous report
+    changed: List[AccountChange] = field(default_factory=list)
+    unchanged: Dict[int, int] = field(default_factory=dict)  # new account id -> previous account id
+
+    def carried_over(self) -> Dict[int, int]:
+        """New account id -> previous account id for accounts whose classification still holds."""
+        carried = dict(self.unchanged)
+        carried.update({c.new_id: c.old_id for c in self.changed if not c.needs_reclassification})
+        return carried
+
+    def needs_classification(self) -> List[int]:
+        """New account ids that have to go through the classifier."""
+        return self.added + [c.new_id for c in self.changed if c.needs_reclassification]
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            'added': len(self.added),
+            'removed': len(self.removed),
+            'changed': len(self.changed),
+            'unchanged': len(self.unchanged),
+            'to_classify': len(self.needs_classification()),
+        }
+
+
+def account_key(row) -> Tuple:
+    """
+    Key identifying a tradeline across pulls of the same consumer.
+
+    Bureau, furnisher, the visible account number and the opened month do
+    not change from one month to the next, unlike balances and statuses.
+    """
+    return (
+        row['credit_bureau_id'],
+        normalize_text(row['furnisher_name']).replace(' ', ''),
+        normalize_account_number(row['account_number']),
+        normalize_month(row['date_opened']),
+    )
+
+
+def keyed_accounts(rows: Sequence[Dict]) -> Dict[Tuple, Dict]:
+    """Accounts by account_key; identical keys within a report get an ordinal suffix."""
+    keyed = {}
+    seen = Counter()
+    for row in rows:
+        if is_placeholder(row['furnisher_name']):
+            continue
+        key = account_key(row)
+        keyed[key + (seen[key],)] = row
+        seen[key] += 1
+    return keyed
+
+
+def _history_months(row) -> Dict[int, str]:
+    start, codes = row['payment_history_start'], row['payment_history_codes']
+    if codes is None and row['payment_history'] is not None:
+        start, codes = encode_payment_history(row['payment_history'], row['credit_bureau_id'])
+    origin = month_ordinal(start) if start else None
+    if not codes or origin is None:
+        return {}
+    return {origin - offset: code for offset, code in enumerate(codes) if SEVERITY[ord(code)] >= 0}
+
+
+def payment_history_change(old_row, new_row) -> Optional[FieldChange]:
+    """
+    Months whose status differs between pulls, plus newly reported late months.
+
+    New current months are expected every pull and are not a change.
+    """
+    old, new = _history_months(old_row), _history_months(new_row)
+    months = [m for m in new if (m in old and old[m] != new[m]) or (m not in old and SEVERITY[ord(new[m])] >= 1)]
+    months += [m for m in old if m not in new and SEVERITY[ord(old[m])] >= 1]
+    if not months:
+        return None
+    months = sorted(set(months), reverse=True)
+    return FieldChange('payment_history',
+                       {month_string(m): old.get(m) for m in months},
+                       {month_string(m): new.get(m) for m in months})
+
+
+def compare_accounts(old_row, new_row) -> List[FieldChange]:
+    changes = []
+    for name in DIFF_FIELDS:
+        old_value, new_value = old_row[name], new_row[name]
+        if is_placeholder(old_value) and is_placeholder(new_value):
+            continue
+        if (old_value or '').strip() != (new_value or '').strip():
+            changes.append(FieldChange(name, old_value, new_value))
+    history = payment_history_change(old_row, new_row)
+    if history:
+        changes.append(history)
+    return changes
+
+
+def diff_accounts(report_id: int, previous_report_id: Optional[int],
+                  new_rows: Sequence[Dict], old_rows: Sequence[Dict]) -> ReportDiff:
+    """Matches two pulls by account_key and collects added, removed and changed accounts."""
+    diff = ReportDiff(report_id, previous_report_id)
+    new, old = keyed_accounts(new_rows), keyed_accounts(old_rows)
+    for key, row in new.items():
+        previous = old.get(key)
+        if previous is None:
+            diff.added.append(row['id'])
+            continue
+        changes = compare_accounts(previous, row)
+        if changes:
+            diff.changed.append(AccountChange(key, previous['id'], row['id'], changes))
+        else:
+            diff.unchanged[row['id']] = previous['id']
+    diff.removed = [row['id'] for key, row in old.items() if key not in new]
+    return diff
+
+
+def previous_report_id(conn, report_id: int) -> Optional[int]:
+    """
+    The consumer's most recent earlier report.
+
+    Matched on the provider's user id first. Failing that, an earlier report
+    sharing the normalized consumer name is only taken when it also shares a
+    date of birth or an address from identity_keys, since a name alone does
+    not tell two consumers apart.
+    """
+    previous = conn.execute(text("""
+        SELECT MAX(report_id) FROM account_histories
+        WHERE report_id < :id AND user_id IN (
+            SELECT user_id FROM account_histories WHERE report_id = :id
+        )
+    """), {'id': report_id}).scalar()
+    if previous is not None:
+        return previous
+    return conn.execute(text("""
+        SELECT MAX(other.report_id) FROM identity_keys mine
+        JOIN identity_keys other ON other.kind = mine.kind AND other.key = mine.key
+        WHERE mine.report_id = :id AND mine.kind = 'name' AND other.report_id < :id
+        AND EXISTS (
+            SELECT 1 FROM identity_keys mine_id
+            JOIN identity_keys other_id ON other_id.key = mine_id.key
+            WHERE mine_id.report_id = :id AND other_id.report_id = other.report_id
+            AND (
+                (mine_id.kind = 'dob' AND other_id.kind = 'dob')
+                OR (mine_id.kind IN ('current_address', 'previous_address')
+                    AND other_id.kind IN ('current_address', 'previous_address'))
+            )
+        )
+    """), {'id': report_id}).scalar()
+
+
+def _report_rows(conn, report_id: Optional[int]) -> List[Dict]:
+    if report_id is None:
+        return []
+    return [dict(row) for row in conn.execute(text(
+        f"SELECT {ACCOUNT_COLUMNS} FROM account_histories WHERE report_id = :id ORDER BY id"
+    ), {'id': report_id}).mappings()]
+
+
+def diff_report(conn, report_id: int, previous: Optional[int] = None) -> ReportDiff:
+    """
+    Diffs a report against the consumer's previous one.
+
+    Without a previous report every account counts as added.
+    """
+    if previous is None:
+        previous = previous_report_id(conn, report_id)
+    return diff_accounts(report_id, previous, _report_rows(conn, report_id), _report_rows(conn, previous))
+
+
+def carry_forward_classifications(conn, diff: ReportDiff) -> int:
+    """
+    Copies classifications of still-valid accounts onto the new report's rows.
+
+    Called from JsonLoader inside the ingest transaction.
+
+    Returns:
+        int: Number of classifications copied.
+    """
+    carried = diff.carried_over()
+    if not carried:
+        return 0
+    existing = defaultdict(list)
+    for row in conn.execute(text(
+        "SELECT account_id, inputs_hash, category, reason FROM account_classifications "
+        "WHERE report_id = :id"
+    ), {'id': diff.previous_report_id}).mappings():
+        existing[row['account_id']].append(row)
+
+    now = datetime.utcnow()
+    copied = [{
+        'account_id': new_id,
+        'report_id': diff.report_id,
+        'inputs_hash': row['inputs_hash'],
+        'category': row['category'],
+        'reason': row['reason'],
+        'carried_from': old_id,
+        'created_at': now,
+    } for new_id, old_id in carried.items() for row in existing.get(old_id, [])]
+    if copied:
+        conn.execute(AccountClassification.__table__.insert(), copied)
+    return len(copied)
+
+
+class ReportDiffer:
+    def __init__(self, db_path="credit_reports.db"):
+        self.engine = DatabaseManager(db_path).engine
+
+    def diff(self, report_id: int, previous: Optional[int] = None) -> ReportDiff:
+        with self.engine.connect() as conn:
+            return diff_report(conn, report_id, previous)
+
+    def carry_forward(self, diff: ReportDiff) -> int:
+        with self.engine.begin() as conn:
+            return carry_forward_classifications(conn, diff)
+
+
+def main():
+    import sys
+    from tabulate import tabulate
+
+    if len(sys.argv) < 2:
+        print("Usage: report_diff.py REPORT_ID [DB_PATH]")
+        sys.exit(1)
+    db_path = sys.argv[2] if len(sys.argv) > 2 else "credit_reports.db"
+    differ = ReportDiffer(db_path)
+    diff = differ.diff(int(sys.argv[1]))
+    print(f"Report {diff.report_id} against {diff.previous_report_id}: {diff.summary()}")
+    rows = [(c.new_id, c.key[1], change.field, change.old, change.new)
+            for c in diff.changed for change in c.changes]
+    print(tabulate(rows, headers=['Account', 'Furnisher', 'Field', 'Old', 'New'], tablefmt='grid'))
+
+
+if __name__ == "__main__":
+    main()
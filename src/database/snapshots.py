@@ -0,0 +1,146 @@
+from pathlib import Path
+import json
+import logging
+import marshal
+import mmap
+import os
+import struct
+import zlib
+
+logger = logging.getLogger(__name__)
+
+# Bump when the payload layout changes; older snapshots are then ignored
+SNAPSHOT_VERSION = 1
+SNAPSHOT_SUFFIX = '.snap'
+
+MAGIC = b'CRSNAP'
+# magic, format version, marshal version, source size, source mtime (ns), payload length, crc32
+HEADER = struct.Struct('<6sHHQqQI')
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot is missing, stale, corrupt or from another format version."""
+
+
+def snapshot_path(source_path) -> Path:
+    """Snapshots sit next to the JSON file they were built from: report.json -> report.json.snap."""
+    source_path = Path(source_path)
+    return source_path.with_name(source_path.name + SNAPSHOT_SUFFIX)
+
+
+def write_snapshot(data, source_path, path=None) -> Path:
+    """
+    Writes parsed report JSON as a binary snapshot.
+
+    The payload is ``marshal`` data, which loads faster than
+    json.load and needs no third-party codec. The header records the size
+    and mtime of the source file, so an edited source makes the snapshot
+    stale, plus the marshal version and a CRC32 of the payload.
+
+    Returns:
+        Path: Where the snapshot was written.
+    """
+    source = os.stat(source_path)
+    path = Path(path) if path else snapshot_path(source_path)
+    payload = marshal.dumps(data)
+    header = HEADER.pack(MAGIC, SNAPSHOT_VERSION, marshal.version, source.st_size,
+                         source.st_mtime_ns, len(payload), zlib.crc32(payload))
+    # Write then rename so readers never see a half-written snapshot
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(header)
+        f.write(payload)
+    os.replace(tmp, path)
+    return path
+
+
+def read_snapshot(path, source_path=None):
+    """
+    Loads a snapshot through a memory map, verifying header and checksum.
+
+    Args:
+        path: Snapshot file.
+        source_path (optional): JSON file the snapshot was built from; when
+            given, the snapshot must match its current size and mtime.
+
+    Raises:
+        SnapshotError: If the snapshot cannot be used.
+    """
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        raise SnapshotError(f"No snapshot at {path}")
+    with f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if len(mm) < HEADER.size:
+            raise SnapshotError(f"Truncated snapshot {path}")
+        magic, version, marshal_version, size, mtime_ns, length, crc = HEADER.unpack_from(mm)
+        if magic != MAGIC or version != SNAPSHOT_VERSION or marshal_version != marshal.version:
+            raise SnapshotError(f"Snapshot {path} has an unsupported format")
+        if source_path is not None:
+            source = os.stat(source_path)
+            if (source.st_size, source.st_mtime_ns) != (size, mtime_ns):
+                raise SnapshotError(f"Snapshot {path} is stale")
+        if len(mm) != HEADER.size + length:
+            raise SnapshotError(f"Truncated snapshot {path}")
+        with memoryview(mm) as view:
+            payload = view[HEADER.size:]
+            try:
+                if zlib.crc32(payload) != crc:
+                    raise SnapshotError(f"Checksum mismatch in snapshot {path}")
+                return marshal.loads(payload)
+            finally:
+                payload.release()
+
+
+def load_report_json(source_path, write_missing: bool = True):
+    """
+    Loads a report JSON file, from its snapshot when one is fresh.
+
+    Falls back to json.load when the snapshot is missing, stale or corrupt,
+    and rewrites it unless ``write_missing`` is False.
+    """
+    path = snapshot_path(source_path)
+    try:
+        return read_snapshot(path, source_path)
+    except SnapshotError as e:
+        if path.exists():
+            logger.info(f"Ignoring snapshot: {e}")
+
+    with open(source_path, 'r') as f:
+        data = json.load(f)
+    if write_missing:
+        try:
+            write_snapshot(data, source_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write snapshot for {source_path}: {e}")
+    return data
+
+
+def benchmark(source_path, rounds: int = 20):
+    """Times json.load against snapshot loading for one report file."""
+    import time
+
+    write_snapshot(json.load(open(source_path)), source_path)
+    path = snapshot_path(source_path)
+
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        with open(source_path, 'r') as f:
+            json.load(f)
+    t1 = time.perf_counter()
+    for _ in range(rounds):
+        read_snapshot(path, source_path)
+    t2 = time.perf_counter()
+
+    json_ms = (t1 - t0) / rounds * 1000
+    snap_ms = (t2 - t1) / rounds * 1000
+    print(f"{source_path}: {os.path.getsize(source_path) / 1024:.0f} KB JSON, "
+          f"{os.path.getsize(path) / 1024:.0f} KB snapshot")
+    print(f"json.load {json_ms:.2f} ms, snapshot {snap_ms:.2f} ms ({json_ms / snap_ms:.1f}x)")
+
+
+if __name__ == "__main__":
+    import sys
+
+    for source in sys.argv[1:] or ["RAG/api/identityiq_1.json"]:
+        benchmark(source)
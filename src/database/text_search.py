@@ -0,0 +1,145 @@
+from typing import Dict, Iterable, List, Optional
+import re
+from sqlalchemy import bindparam, text
+from db_manager import DatabaseManager
+from account_text import ACCOUNT_TEXT_TABLE, TEXT_COLUMNS
+
+MODES = ('all', 'any', 'phrase', 'raw')
+
+_WORD = re.compile(r'\w+')
+
+
+def _quote(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def build_match_query(query: str, mode: str = 'all', prefix: bool = False,
+                      columns: Optional[Iterable[str]] = None) -> str:
+    """
+    Turns user input into an FTS5 MATCH expression.
+
+    Every word is quoted, so punctuation in free text ('AT&T', 'CHARGE-OFF')
+    cannot be misread as FTS5 syntax. ``raw`` passes the query through
+    unchanged for callers that write FTS5 expressions themselves.
+
+    Args:
+        query (str): Search text.
+        mode (str): 'all' words, 'any' word, an exact 'phrase', or 'raw' FTS5 syntax.
+        prefix (bool): Treat each word (the last one for phrases) as a prefix.
+        columns (Iterable[str], optional): Restrict matching to these text columns.
+
+    Returns:
+        str: MATCH expression, empty when the query has no words.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown search mode: {mode}")
+    if mode == 'raw':
+        expression = query.strip()
+    else:
+        words = _WORD.findall(query)
+        if not words:
+            return ''
+        star = '*' if prefix else ''
+        if mode == 'phrase':
+            expression = _quote(' '.join(words)) + star
+        else:
+            joiner = ' OR ' if mode == 'any' else ' '
+            expression = joiner.join(_quote(w) + star for w in words)
+
+    if columns:
+        unknown = [c for c in columns if c not in TEXT_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown text column(s): {', '.join(unknown)}")
+        expression = f"{{{' '.join(columns)}}} : ({expression})"
+    return expression
+
+
+class AccountTextSearch:
+    def __init__(self, db_path="credit_reports.db"):
+        self.engine = DatabaseManager(db_path).engine
+
+    def search(self, query: str, report_ids: Optional[Iterable[int]] = None,
+               bureau_ids: Optional[Iterable[int]] = None, mode: str = 'all',
+               prefix: bool = False, columns: Optional[Iterable[str]] = None,
+               limit: int = 50) -> List[Dict]:
+        """
+        Ranked full-text search over account comments and remarks.
+
+        Results are ordered by FTS5's bm25 rank, best first.
+
+        Args:
+            query (str): Search text, see build_match_query.
+            report_ids (Iterable[int], optional): Only search these reports.
+            bureau_ids (Iterable[int], optional): Only search these bureaus.
+            mode (str): 'all', 'any', 'phrase' or 'raw'.
+            prefix (bool): Prefix-match the query words.
+            columns (Iterable[str], optional): Text columns to search. All by default.
+            limit (int): Maximum number of matches.
+
+        Returns:
+            List[Dict]: Matches with account_id, report_id, credit_bureau_id,
+            furnisher_name, account_status, rank and a highlighted snippet.
+        """
+        expression = build_match_query(query, mode, prefix, columns)
+        if not expression:
+            return []
+
+        conditions = [f"{ACCOUNT_TEXT_TABLE} MATCH :match"]
+        params = {'match': expression, 'limit': limit}
+        expanding = []
+        if report_ids is not None:
+            conditions.append("f.report_id IN :report_ids")
+            params['report_ids'] = [int(r) for r in report_ids]
+            expanding.append(bindparam('report_ids', expanding=True))
+        if bureau_ids is not None:
+            conditions.append("f.credit_bureau_id IN :bureau_ids")
+            params['bureau_ids'] = [int(b) for b in bureau_ids]
+            expanding.append(bindparam('bureau_ids', expanding=True))
+
+        query = text(f"""
+            SELECT f.rowid AS account_id, f.report_id, f.credit_bureau_id,
+                   a.furnisher_name, a.account_status, f.rank AS rank,
+                   snippet({ACCOUNT_TEXT_TABLE}, -1, '[', ']', '...', 12) AS snippet
+            FROM {ACCOUNT_TEXT_TABLE} f
+            JOIN account_histories a ON a.id = f.rowid
+            WHERE {' AND '.join(conditions)}
+            ORDER BY f.rank
+            LIMIT :limit
+        """)
+        if expanding:
+            query = query.bindparams(*expanding)
+
+        with self.engine.connect() as conn:
+            return [dict(row) for row in conn.execute(query, params).mappings()]
+
+    def search_phrase(self, phrase: str, **filters) -> List[Dict]:
+        return self.search(phrase, mode='phrase', **filters)
+
+    def search_prefix(self, query: str, **filters) -> List[Dict]:
+        return self.search(query, prefix=True, **filters)
+
+    def account_ids(self, query: str, **filters) -> List[int]:
+        """Matching account ids, for feeding the dispute pipeline."""
+        return [match['account_id'] for match in self.search(query, **filters)]
+
+
+def main():
+    import sys
+    import time
+    from tabulate import tabulate
+
+    if len(sys.argv) < 2:
+        print("Usage: text_search.py QUERY [DB_PATH]")
+        sys.exit(1)
+    db_path = sys.argv[2] if len(sys.argv) > 2 else "credit_reports.db"
+    search = AccountTextSearch(db_path)
+    t0 = time.perf_counter()
+    matches = search.search(sys.argv[1])
+    elapsed = (time.perf_counter() - t0) * 1000
+    print(tabulate([(m['account_id'], m['report_id'], m['furnisher_name'], m['snippet']) for m in matches],
+                   headers=['Account', 'Report', 'Furnisher', 'Snippet'], tablefmt='grid'))
+    print(f"{len(matches)} match(es) in {elapsed:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
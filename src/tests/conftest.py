@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The database, vector_db and Global_knowledge modules use flat imports
+# (``from models import Base``), as when they are run from their own directory.
+_SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for _package in ('Global_knowledge', 'vector_db', 'database'):
+    sys.path.insert(0, os.path.join(_SRC, _package))
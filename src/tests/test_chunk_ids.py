@@ -0,0 +1,72 @@
+import os
+import unittest
+import uuid
+
+from local_index import LocalIndex
+
+try:
+    from langchain_core.documents import Document
+    from vectordb import PineconeManager, chunk_id, legacy_source_prefix, source_prefix
+except ImportError:  # vectordb needs pinecone and langchain_pinecone
+    chunk_id = None
+
+ROOT = os.path.join(os.sep, 'corpus')
+
+
+def _chunk(text, source='fcra/part1.pdf', page=3, start_index=120, root=ROOT):
+    return Document(page_content=text, metadata={'source': os.path.join(root, source), 'page': page,
+                                                 'start_index': start_index})
+
+
+@unittest.skipIf(chunk_id is None, "vectordb needs pinecone and langchain_pinecone")
+class ChunkIdTests(unittest.TestCase):
+    def test_unchanged_chunk_keeps_its_id(self):
+        first = chunk_id(_chunk("Section 604"), ROOT)
+        self.assertEqual(chunk_id(_chunk("Section 604"), ROOT), first)
+        self.assertTrue(first.startswith("fcra/part1.pdf#p3#o120#"))
+        # Moving the whole corpus does not change ids
+        moved = os.path.join(os.sep, 'elsewhere', 'corpus')
+        self.assertEqual(chunk_id(_chunk("Section 604", root=moved), moved), first)
+
+    def test_content_position_and_path_change_the_id(self):
+        base = chunk_id(_chunk("Section 604"), ROOT)
+        others = {
+            chunk_id(_chunk("Section 605"), ROOT),
+            chunk_id(_chunk("Section 604", page=4), ROOT),
+            chunk_id(_chunk("Section 604", start_index=0), ROOT),
+            chunk_id(_chunk("Section 604", source='fdcpa/part1.pdf'), ROOT),
+        }
+        self.assertEqual(len(others), 4)
+        self.assertNotIn(base, others)
+
+    def test_prefixes(self):
+        doc = _chunk("Section 604")
+        self.assertEqual(source_prefix(doc, ROOT), "fcra/part1.pdf#")
+        self.assertEqual(legacy_source_prefix(doc), "part1.pdf#")
+        self.assertTrue(chunk_id(doc, ROOT).startswith(source_prefix(doc, ROOT)))
+
+
+class _NoEmbeddings:
+    def embed_documents(self, texts):
+        raise AssertionError("nothing is embedded by a sweep")
+
+    def embed_query(self, text):
+        raise AssertionError("nothing is embedded by a sweep")
+
+
+@unittest.skipIf(chunk_id is None, "vectordb needs pinecone and langchain_pinecone")
+class LegacySweepTests(unittest.TestCase):
+    def test_only_uuid_ids_are_swept(self):
+        index = LocalIndex(2)
+        legacy = [str(uuid.uuid4()) for _ in range(3)]
+        kept = [chunk_id(_chunk("Section 604"), ROOT), "manual-note-1", "0f3c"]
+        index.upsert([{'id': i, 'values': [1.0, 0.0]} for i in legacy + kept], namespace='FCRA')
+        manager = PineconeManager(_NoEmbeddings(), index=index, corpus_root=ROOT)
+
+        self.assertEqual(manager.sweep_legacy_uuid_ids('FCRA'), 3)
+        self.assertEqual(manager.stored_ids('FCRA'), set(kept))
+        self.assertEqual(manager.sweep_legacy_uuid_ids('FCRA'), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from sqlalchemy import inspect
+
+from account_text import ACCOUNT_TEXT_TABLE
+from db_manager import DatabaseManager
+
+
+class DatabaseManagerTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, 'credit_reports.db')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_new_database_gets_the_full_schema(self):
+        manager = DatabaseManager(self.db_path)
+        tables = set(inspect(manager.engine).get_table_names())
+        self.assertIn('account_histories', tables)
+        self.assertIn(ACCOUNT_TEXT_TABLE, tables)
+        manager.engine.dispose()
+        # Opening it again passes the schema check
+        DatabaseManager(self.db_path).engine.dispose()
+
+    def test_out_of_date_database_asks_for_migrations(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE account_histories (id INTEGER PRIMARY KEY, payment_history JSON)")
+        conn.close()
+        with self.assertRaisesRegex(RuntimeError, "migrations.py"):
+            DatabaseManager(self.db_path)
+
+        manager = DatabaseManager(self.db_path, check_schema=False)
+        manager.upgrade()
+        manager.engine.dispose()
+        DatabaseManager(self.db_path).engine.dispose()
+
+
+if __name__ == '__main__':
+    unittest.main()
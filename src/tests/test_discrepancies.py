@@ -0,0 +1,112 @@
+import unittest
+
+from discrepancies import detect_report, match_tradelines, same_account_number, same_furnisher
+from normalize import normalize_account_number
+
+
+def account(id, bureau, furnisher, number, opened, balance='100'):
+    return {
+        'id': id, 'report_id': 1, 'credit_bureau_id': bureau, 'furnisher_name': furnisher,
+        'account_number': number, 'date_opened': opened, 'balance': balance,
+        'account_status': 'Open', 'date_last_payment': None,
+        'payment_history_start': None, 'payment_history_codes': None, 'payment_history': None,
+    }
+
+
+def grouped(rows):
+    return sorted(sorted(row['id'] for row in members.values()) for members in match_tradelines(rows))
+
+
+class TradelineMatchingTests(unittest.TestCase):
+    def test_same_account_across_bureaus(self):
+        rows = [
+            account(1, 1, 'CREDITONEBNK', '444796245865****', '2019-07-05'),
+            account(2, 2, 'CRDTONEBNK', '444796245865****', '2019-07-01'),
+            account(3, 3, 'CREDIT ONE BANK NA', '4447962458650714', '2019-07-01'),
+        ]
+        self.assertEqual(grouped(rows), [[1, 2, 3]])
+
+    def test_different_furnisher_same_suffix(self):
+        rows = [
+            account(1, 1, 'CAPITAL ONE', '****1234', '2020-01-01'),
+            account(2, 2, 'DISCOVER BANK', '****1234', '2020-01-01'),
+        ]
+        self.assertEqual(grouped(rows), [[1], [2]])
+
+    def test_identical_long_number_overrides_the_furnisher_name(self):
+        rows = [
+            account(1, 1, 'CIG FINCL', '28476120', '2023-10-07'),
+            account(2, 2, 'AUTONATION FINANCE', '28476120', '2023-10-01'),
+        ]
+        self.assertEqual(grouped(rows), [[1, 2]])
+
+    def test_partially_matching_long_numbers_still_need_the_furnisher(self):
+        rows = [
+            account(1, 1, 'CAPITAL ONE', '51780512XXXX', '2020-01-01'),
+            account(2, 2, 'DISCOVER BANK', '51780512345678', '2020-01-01'),
+            account(3, 3, 'CAP ONE', '517805123456XXXX', '2020-01-01'),
+        ]
+        self.assertEqual(grouped(rows), [[1, 3], [2]])
+
+    def test_same_suffix_uses_opened_month_as_tie_breaker(self):
+        rows = [
+            account(1, 1, 'DEPTEDNELNET', '90000076212****', '2017-03-16'),
+            account(2, 1, 'DEPTEDNELNET', '90000076212****', '2018-10-05'),
+            account(3, 2, 'DPEDNELNET', '90000076212****', '2018-10-01'),
+            account(4, 2, 'DPEDNELNET', '90000076212****', '2017-03-01'),
+        ]
+        self.assertEqual(grouped(rows), [[1, 4], [2, 3]])
+
+    def test_same_month_different_numbers(self):
+        rows = [
+            account(1, 1, 'DEPTEDNELNET', '90000076211****', '2016-03-04'),
+            account(2, 2, 'DPEDNELNET', '90000076212****', '2016-03-01'),
+        ]
+        self.assertEqual(grouped(rows), [[1], [2]])
+
+    def test_short_numbers_do_not_match_longer_ones(self):
+        rows = [
+            account(1, 1, 'AUSTIN CAPITAL BANK', '85XXXX', '2023-03-08'),
+            account(2, 3, 'AUSTIN CAPITAL BANK', '85INEFXXXX', '2023-03-08'),
+        ]
+        self.assertEqual(grouped(rows), [[1], [2]])
+
+    def test_numbers_masked_at_opposite_ends(self):
+        self.assertTrue(same_account_number('E00120100219240711', '98487051811E00120100'))
+        self.assertTrue(same_account_number('406095522154', '406095'))
+        self.assertFalse(same_account_number('90000076211', '90000076212'))
+
+    def test_only_masking_at_the_ends_is_stripped(self):
+        self.assertEqual(normalize_account_number('-349993045357****'), '349993045357')
+        self.assertEqual(normalize_account_number('XXXX-1234'), '1234')
+        self.assertEqual(normalize_account_number('403216XXXXXX4781'), '403216XXXXXX4781')
+        self.assertEqual(normalize_account_number('4032 16** **47 81'), '403216XXXX4781')
+        self.assertEqual(normalize_account_number('2164149X3'), '2164149X3')
+        self.assertEqual(normalize_account_number('CLXXXX'), 'CL')
+
+    def test_numbers_masked_in_the_middle(self):
+        self.assertTrue(same_account_number('403216XXXXXX4781', '4032164781'))
+        self.assertTrue(same_account_number('403216XXXXXX4781', '403216XXXX4781'))
+        self.assertTrue(same_account_number('403216XXXXXX4781', '4781'))
+        self.assertFalse(same_account_number('403216XXXXXX4781', '4032166886'))
+        self.assertFalse(same_account_number('403216XXXXXX4781', '403216XXXXXX6886'))
+        # The visible parts are not one number
+        self.assertFalse(same_account_number('403216XXXXXX4781', '4032164781000'))
+
+    def test_furnisher_abbreviations(self):
+        self.assertTrue(same_furnisher('creditonebnk', 'crdtonebnk'))
+        self.assertTrue(same_furnisher('syncb ban', 'syncb banana rep'))
+        self.assertFalse(same_furnisher('capital one', 'discover bank'))
+
+    def test_discrepancies_only_within_a_tradeline(self):
+        rows = [
+            account(1, 1, 'CAPITAL ONE', '517805955137', '2023-12-25', balance='100'),
+            account(2, 3, 'CAPITAL ONE', '517805955137', '2023-12-01', balance='250'),
+            account(3, 2, 'DISCOVER BANK', '****5137', '2023-12-01', balance='999'),
+        ]
+        fields = [(d.field, sorted(d.account_ids.values())) for d in detect_report(1, rows)]
+        self.assertIn(('balance', [1, 2]), fields)
+
+
+if __name__ == "__main__":
+    unittest.main()
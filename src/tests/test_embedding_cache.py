@@ -0,0 +1,81 @@
+import itertools
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+try:
+    import embedding_cache
+    from embedding_cache import CachedEmbeddings, EmbeddingCache
+except ImportError:  # embedding_cache needs langchain_core
+    embedding_cache = None
+
+
+class _Counting:
+    """Embeddings that tell documents from queries and count the texts they embed."""
+
+    def __init__(self):
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [[float(len(text)), 0.0] for text in texts]
+
+    def embed_query(self, text):
+        self.embedded.append(text)
+        return [0.0, float(len(text))]
+
+
+@unittest.skipIf(embedding_cache is None, "embedding_cache needs langchain_core")
+class EmbeddingCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'embedding_cache.db')
+        # A clock that ticks on every read, so last_used orders the puts
+        self.clock = mock.patch.object(embedding_cache.time, 'time', side_effect=itertools.count(1000))
+        self.clock.start()
+
+    def tearDown(self):
+        self.clock.stop()
+        self.tmp.cleanup()
+
+    def test_least_recently_used_rows_are_evicted_in_one_batch(self):
+        cache = EmbeddingCache(self.path, max_entries=20)
+        for i in range(20):
+            cache.put_many({f"k{i}": [float(i)]})
+        self.assertEqual(len(cache), 20)
+        # A hit refreshes k0; a miss touches nothing
+        self.assertEqual(cache.get_many(["k0", "absent"]), {"k0": [0.0]})
+
+        cache.put_many({"k20": [20.0]})
+        # Over the limit: down to 5% below it, oldest first
+        self.assertEqual(len(cache), 19)
+        found = cache.get_many([f"k{i}" for i in range(21)])
+        self.assertEqual(sorted(set(f"k{i}" for i in range(21)) - set(found)), ["k1", "k2"])
+
+        # Replacing an existing key does not count twice
+        cache.put_many({"k5": [5.5]})
+        self.assertEqual(len(cache), 19)
+        cache.close()
+        reopened = EmbeddingCache(self.path, max_entries=20)
+        self.assertEqual(len(reopened), 19)
+        reopened.close()
+
+    def test_documents_and_queries_are_cached_separately(self):
+        cache = EmbeddingCache(self.path)
+        underlying = _Counting()
+        cached = CachedEmbeddings(underlying, cache, namespace="test-model")
+
+        self.assertEqual(cached.embed_documents(["abc", "de", "abc"]), [[3.0, 0.0], [2.0, 0.0], [3.0, 0.0]])
+        self.assertEqual(cached.embed_query("abc"), [0.0, 3.0])
+        self.assertEqual(underlying.embedded, ["abc", "de", "abc"])
+
+        self.assertEqual(cached.embed_documents(["de"]), [[2.0, 0.0]])
+        self.assertEqual(cached.embed_query("abc"), [0.0, 3.0])
+        self.assertEqual(len(underlying.embedded), 3)
+        self.assertEqual((cached.hits, cached.misses), (2, 3))
+        cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+
+from furnisher_addresses import furnisher_key
+from furnisher_lookup import FurnisherAddressIndex
+
+
+def _row(name, report_id=1, source='credit_contact'):
+    return {'key': furnisher_key(name), 'report_id': report_id, 'name': name, 'address_line': f'1 {name} Way',
+            'city': 'Wilmington', 'state': 'DE', 'zipcode': '19801', 'phone': None, 'source': source,
+            'source_id': 1}
+
+
+class FurnisherAddressIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.index = FurnisherAddressIndex([
+            _row('SYNCB AAA WHOLESALE CLUB'),
+            _row('SYNCB AMAZON'),
+            _row('SYNCB AMAZON PLCC'),
+            _row('NAVY FCU'),
+        ])
+
+    def test_truncated_query_takes_the_shortest_extension(self):
+        match = self.index.resolve('SYNCB A')
+        self.assertEqual((match.name, match.method), ('SYNCB AMAZON', 'prefix'))
+        self.assertEqual(self.index.resolve('SYNCB AMAZON PL').name, 'SYNCB AMAZON PLCC')
+
+    def test_exact_and_truncated_stored_names(self):
+        self.assertEqual(self.index.resolve('Navy FCU').method, 'exact')
+        match = self.index.resolve('NAVY FCU MORTGAGE')
+        self.assertEqual((match.name, match.method), ('NAVY FCU', 'prefix'))
+
+
+if __name__ == '__main__':
+    unittest.main()
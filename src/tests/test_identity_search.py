@@ -0,0 +1,41 @@
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import text
+
+from identity_search import IdentitySearch
+from normalize import normalize_text
+
+
+class ReportIdsForTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.search = IdentitySearch(os.path.join(self.tmp.name, 'credit_reports.db'))
+        keys = []
+        # Many reports share the name; only the last ones also share the address
+        for report_id in range(1, 151):
+            keys.append((report_id, 'name', 'Jane Q. Doe'))
+            keys.append((report_id, 'current_address', '1 Main St' if report_id > 140 else f'{report_id} Oak Ave'))
+        keys.append((200, 'previous_address', '1 MAIN ST'))
+        with self.search.engine.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO identity_keys (report_id, kind, value, key) VALUES (:report_id, :kind, :value, :key)"
+            ), [{'report_id': r, 'kind': k, 'value': v, 'key': normalize_text(v)} for r, k, v in keys])
+
+    def tearDown(self):
+        self.search.engine.dispose()
+        self.tmp.cleanup()
+
+    def test_limit_applies_after_the_address_intersection(self):
+        self.assertEqual(self.search.report_ids_for('jane q doe', '1 main st.'), list(range(141, 151)))
+        self.assertEqual(self.search.report_ids_for('JANE Q DOE', '1 Main St', limit=3), [141, 142, 143])
+
+    def test_name_only(self):
+        self.assertEqual(len(self.search.report_ids_for('Jane Q Doe', limit=500)), 150)
+        self.assertEqual(self.search.report_ids_for('Jane Q Doe', limit=2), [1, 2])
+        self.assertEqual(self.search.report_ids_for('-'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
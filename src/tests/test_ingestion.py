@@ -0,0 +1,76 @@
+import asyncio
+import time
+import unittest
+from unittest import mock
+
+try:
+    import ingestion
+    from ingestion import IngestionScheduler, TokenBucket
+    from langchain_core.documents import Document
+except ImportError:  # ingestion needs langchain_core
+    ingestion = None
+
+
+@unittest.skipIf(ingestion is None, "ingestion needs langchain_core")
+class TokenBucketTests(unittest.TestCase):
+    def test_deficit_is_slept_off_outside_the_lock(self):
+        slept = []
+
+        async def sleep(seconds):
+            # Other callers can reserve while this one waits
+            self.assertFalse(bucket._lock.locked())
+            slept.append(seconds)
+
+        # A frozen clock: nothing refills between calls
+        with mock.patch.object(ingestion.time, 'monotonic', return_value=100.0), \
+                mock.patch.object(ingestion.asyncio, 'sleep', sleep):
+            bucket = TokenBucket(60, capacity=2)  # one token per second
+
+            async def run():
+                await bucket.acquire(2)
+                await bucket.acquire(1)
+                await bucket.acquire(1)
+                # Larger than the bucket: waits for a full bucket, not forever
+                await bucket.acquire(50)
+
+            asyncio.run(run())
+        self.assertEqual(slept, [1.0, 2.0, 4.0])
+        self.assertEqual(bucket.tokens, -4)
+
+    def test_throttle_halves_and_recover_restores_the_rate(self):
+        bucket = TokenBucket(600)
+        bucket.throttle()
+        self.assertAlmostEqual(bucket.rate, 5.0)
+        for _ in range(20):
+            bucket.recover()
+        self.assertAlmostEqual(bucket.rate, 10.0)
+
+
+class _FailingManager:
+    """Fails the first batch; records every batch that reaches it."""
+
+    def __init__(self):
+        self.batches = []
+
+    def upsert_documents(self, batch, namespace, raise_on_error=False):
+        self.batches.append([doc.page_content for doc in batch])
+        raise ValueError("bad batch")
+
+
+@unittest.skipIf(ingestion is None, "ingestion needs langchain_core")
+class IngestionSchedulerTests(unittest.TestCase):
+    def test_failed_batch_cancels_the_waiting_ones(self):
+        manager = _FailingManager()
+        # One request in the bucket: the second and third batches wait 10s and 20s for theirs
+        scheduler = IngestionScheduler(manager, requests_per_minute=6, concurrency=3)
+        docs = [Document(page_content=f"chunk {i}") for i in range(3)]
+
+        start = time.monotonic()
+        with self.assertRaisesRegex(ValueError, "bad batch"):
+            asyncio.run(scheduler.ingest(docs, "ns", batch_size=1))
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertEqual(manager.batches, [["chunk 0"]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+from datetime import date
+
+from inquiry_analysis import _Creditor, analyze_report, rate_shopping_category
+
+AS_OF = date(2024, 10, 1)
+
+
+def _inquiry(id, creditor, day, bureau='TransUnion', business='Bank', account_history_id=None):
+    return {
+        'id': id, 'report_id': 7, 'creditor_name': creditor, 'type_of_business': business,
+        'date_of_inquiry': day, 'credit_bureau': bureau, 'account_history_id': account_history_id,
+    }
+
+
+class CreditorMatchTests(unittest.TestCase):
+    def test_truncated_and_acronym_names_match(self):
+        self.assertTrue(_Creditor('ALLY FINANCI').matches(_Creditor('Ally Financial')))
+        self.assertTrue(_Creditor('COAF').matches(_Creditor('CAPITAL ONE AUTO FIN')))
+        self.assertFalse(_Creditor('ALLY').matches(_Creditor('AMEX')))
+        self.assertFalse(_Creditor('').matches(_Creditor('')))
+
+    def test_rate_shopping_category(self):
+        self.assertEqual(rate_shopping_category('Automotive Dealer'), 'auto')
+        self.assertEqual(rate_shopping_category('Real Estate Lender'), 'mortgage')
+        self.assertIsNone(rate_shopping_category('Bank Card'))
+
+
+class InquiryClusteringTests(unittest.TestCase):
+    def analyze(self, rows, accounts=None, as_of=AS_OF):
+        return {finding.inquiry_id: finding for finding in analyze_report(rows, as_of, accounts)}
+
+    def test_same_creditor_across_bureaus_is_one_cluster_without_duplicates(self):
+        findings = self.analyze([
+            _inquiry(1, 'ALLY FINANCIAL', '06/01/2024', 'TransUnion', account_history_id=90),
+            _inquiry(2, 'ALLY FINANCI', '06/03/2024', 'Equifax', account_history_id=90),
+            _inquiry(3, 'COAF', '06/05/2024', 'Experian', account_history_id=91),
+        ])
+        self.assertEqual(findings[1].cluster_id, 1)
+        self.assertEqual(findings[2].cluster_id, 1)
+        self.assertEqual(findings[3].cluster_id, 3)
+        self.assertTrue(all(f.duplicate_of is None and not f.disputable for f in findings.values()))
+
+    def test_same_bureau_within_window_is_a_duplicate(self):
+        findings = self.analyze([
+            _inquiry(5, 'DISCOVER', '2024-05-01', account_history_id=92),
+            _inquiry(4, 'DISCOVER BANK', '2024-05-10', account_history_id=92),
+            _inquiry(6, 'DISCOVER', '2024-06-20', account_history_id=92),
+        ])
+        # Clusters are rooted at the lowest id even when it is the later inquiry
+        self.assertEqual(findings[5].cluster_id, 4)
+        self.assertEqual(findings[4].duplicate_of, 5)
+        self.assertIsNone(findings[5].duplicate_of)
+        # Outside DUPLICATE_WINDOW_DAYS of both
+        self.assertEqual(findings[6].cluster_id, 6)
+        self.assertIsNone(findings[6].duplicate_of)
+
+    def test_rate_shopping_clusters_span_creditors_within_the_category(self):
+        findings = self.analyze([
+            _inquiry(10, 'TOYOTA MOTOR CREDIT', '2024-07-01', business='Auto Financing', account_history_id=93),
+            _inquiry(11, 'HONDA FINANCIAL', '2024-07-30', business='Automotive', account_history_id=93),
+            _inquiry(12, 'ROCKET MORTGAGE', '2024-07-15', business='Mortgage', account_history_id=94),
+            _inquiry(13, 'FORD CREDIT', '2024-10-01', business='Auto', account_history_id=95),
+        ])
+        self.assertEqual(findings[10].rate_shopping_cluster, 10)
+        self.assertEqual(findings[11].rate_shopping_cluster, 10)
+        self.assertIsNone(findings[12].rate_shopping_cluster)
+        self.assertIsNone(findings[13].rate_shopping_cluster)
+        self.assertNotEqual(findings[10].cluster_id, findings[11].cluster_id)
+
+    def test_aging_and_undated_inquiries(self):
+        findings = self.analyze([
+            _inquiry(20, 'OLD BANK', '2022-09-01'),
+            _inquiry(21, 'RECENT BANK', '2024-09-01'),
+            _inquiry(22, 'UNKNOWN', None),
+        ], accounts=[])
+        self.assertTrue(findings[20].expired)
+        self.assertEqual(findings[20].reasons, ["Inquiry is older than the two-year reporting period"])
+        self.assertFalse(findings[21].expired)
+        self.assertEqual(findings[21].reasons, ["No account resulted from this inquiry; verify it was authorized"])
+        self.assertFalse(findings[22].expired)
+        self.assertEqual(findings[22].reasons, [])
+        self.assertEqual(findings[22].cluster_id, 22)
+        self.assertEqual(list(analyze_report([], as_of=AS_OF)), [])
+
+    def test_age_defaults_to_the_newest_inquiry_not_today(self):
+        findings = self.analyze([
+            _inquiry(23, 'OLD BANK', '2019-01-10'),
+            _inquiry(24, 'RECENT BANK', '2020-06-01'),
+        ], as_of=None)
+        self.assertFalse(findings[23].expired)
+
+    def test_unlinked_inquiry_needs_accounts_to_be_flagged(self):
+        rows = [_inquiry(30, 'CAP ONE', '2024-05-01')]
+        self.assertEqual(self.analyze(rows)[30].reasons, [])
+        self.assertEqual(len(self.analyze(rows, accounts=[])[30].reasons), 1)
+
+    def test_account_opened_after_the_inquiry_explains_it(self):
+        rows = [
+            _inquiry(31, 'CAP ONE', '2024-05-01'),
+            _inquiry(32, 'CAPITAL ONE', '2024-05-03', 'Experian'),
+            _inquiry(33, 'TOYOTA MOTOR CREDIT', '2024-06-01', business='Auto'),
+            _inquiry(34, 'HONDA FINANCIAL', '2024-06-10', business='Auto'),
+            _inquiry(35, 'SYNCB/LOWES', '2024-03-01'),
+        ]
+        accounts = [
+            {'furnisher_name': 'CAPITAL ONE BANK USA', 'date_opened': '05/20/2024'},
+            {'furnisher_name': 'HONDA FINANCIAL SERVICES', 'date_opened': '2024-06-12'},
+            # Opened long before the inquiry
+            {'furnisher_name': 'SYNCB/LOWES', 'date_opened': '2019-01-01'},
+        ]
+        findings = self.analyze(rows, accounts)
+        for inquiry_id in (31, 32, 34):
+            self.assertEqual(findings[inquiry_id].reasons, [], inquiry_id)
+        # Shopping that ended in a Honda loan is not unauthorized either
+        self.assertEqual(findings[33].reasons, [])
+        self.assertEqual(findings[35].reasons, ["No account resulted from this inquiry; verify it was authorized"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+
+import numpy as np
+
+from local_index import LocalIndex
+
+
+def _clustered(rng, centers, per_center, dimension, spread=0.15):
+    """Vectors scattered around random centers, like embeddings of related chunks."""
+    centers = rng.standard_normal((centers, dimension)).astype(np.float32)
+    noise = rng.standard_normal((len(centers) * per_center, dimension)).astype(np.float32) * spread
+    return np.repeat(centers, per_center, axis=0) + noise
+
+
+class IvfSearchTests(unittest.TestCase):
+    dimension = 32
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.vectors = _clustered(rng, 40, 100, self.dimension)
+        self.queries = self.vectors[rng.choice(len(self.vectors), 50, replace=False)] \
+            + rng.standard_normal((50, self.dimension)).astype(np.float32) * 0.05
+        self.ids = [f"v{i}" for i in range(len(self.vectors))]
+        self.exact = LocalIndex(self.dimension)
+        self.ivf = LocalIndex(self.dimension)
+        for index in (self.exact, self.ivf):
+            index.upsert([{'id': i, 'values': v, 'metadata': {'group': int(i[1:]) % 2}}
+                          for i, v in zip(self.ids, self.vectors)], namespace='ns')
+        self.ivf.train('ns', nlist=40)
+
+    def top(self, index, query, **kwargs):
+        return [m['id'] for m in index.query(vector=query, namespace='ns', top_k=10, **kwargs)['matches']]
+
+    def test_only_the_trained_index_uses_inverted_lists(self):
+        self.assertIsNone(self.exact.namespaces['ns'].centroids)
+        self.assertEqual(sum(len(rows) for rows in self.ivf.namespaces['ns'].lists), len(self.vectors))
+
+    def test_recall_against_brute_force(self):
+        found = total = 0
+        for query in self.queries:
+            expected = set(self.top(self.exact, query))
+            found += len(expected & set(self.top(self.ivf, query)))
+            total += len(expected)
+        self.assertGreaterEqual(found / total, 0.95)
+
+    def test_scores_match_brute_force_for_shared_results(self):
+        query = self.queries[0]
+        exact = {m['id']: m['score'] for m in self.exact.query(vector=query, namespace='ns', top_k=10)['matches']}
+        for match in self.ivf.query(vector=query, namespace='ns', top_k=10)['matches']:
+            if match['id'] in exact:
+                self.assertAlmostEqual(match['score'], exact[match['id']], places=5)
+
+    def test_lists_follow_upserts_and_deletes(self):
+        ns = self.ivf.namespaces['ns']
+        self.ivf.delete(ids=self.ids[:500], namespace='ns')
+        moved = self.vectors[600] * -1
+        self.ivf.upsert([{'id': self.ids[600], 'values': moved}], namespace='ns')
+        self.exact.delete(ids=self.ids[:500], namespace='ns')
+        self.exact.upsert([{'id': self.ids[600], 'values': moved}], namespace='ns')
+
+        filed = sorted(row for rows in ns.lists for row in rows)
+        self.assertEqual(filed, list(range(ns.count)))
+        for row in range(ns.count):
+            self.assertIn(row, ns.lists[ns.assignment[row]])
+        self.assertEqual(self.top(self.ivf, moved)[0], self.ids[600])
+        for query in self.queries[:10]:
+            self.assertEqual(self.top(self.ivf, query, filter={'group': 1})[:3],
+                             self.top(self.exact, query, filter={'group': 1})[:3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import text
+
+from payment_analytics import PaymentAnalytics
+
+
+class LateSummaryTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.analytics = PaymentAnalytics(os.path.join(self.tmp.name, 'credit_reports.db'))
+        with self.analytics.engine.begin() as conn:
+            conn.execute(text("INSERT INTO reports (id, slug) VALUES (1, 'a')"))
+            conn.execute(text(
+                "INSERT INTO account_histories (id, report_id, credit_bureau_id, payment_history_start, "
+                "payment_history_codes) VALUES (1, 1, 1, '2024-10', 'CCCC'), (2, 1, 1, '2024-10', 'CC1C')"
+            ))
+
+    def tearDown(self):
+        self.analytics.engine.dispose()
+        self.tmp.cleanup()
+
+    def test_accounts_without_delinquencies_have_no_month(self):
+        summary = self.analytics.late_summary(1)
+        self.assertIsNone(summary[1]['most_recent_delinquency'])
+        self.assertEqual(summary[2]['most_recent_delinquency'], '2024-08')
+        self.assertEqual(summary[2]['late_30'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import json
+import unittest
+
+from sqlalchemy import create_engine, text
+
+from migrations import pack_payment_histories
+from models import Base
+from payment_codec import SEVERITY, decode_payment_history, encode_payment_history, month_ordinal
+
+PLAIN = {
+    "status": "C1CC",
+    "startDate": "2024-10-09",
+    "MonthlyPayStatus": [
+        {"date": "2024-10-09", "status": "C"},
+        {"date": "2024-09-30", "status": "1"},
+        {"date": "2024-09-01", "status": "C"},
+        {"date": "2024-08-09", "status": "C"},
+        {"date": "2024-07-09", "status": "C"},
+    ],
+}
+AT_KEYS = {
+    "@status": "CC2",
+    "@startDate": "2020-04-26",
+    "MonthlyPayStatus": [
+        {"@date": "2020-04-26", "@status": "C"},
+        {"@date": "2020-03-26", "@status": "C"},
+        {"@date": "2020-02-25", "@status": "2"},
+        {"@date": "2020-01-25", "@status": " "},
+    ],
+}
+GRID = {
+    "Year": ["24", "24", "24", "23"],
+    "Month": ["Feb", "Jan", "Jan", "Dec"],
+    "TransUnion": ["OK", "", "", "OK"],
+    "Equifax": ["", "", "", ""],
+    "Experian": ["60", "OK", "30", "CO"],
+}
+
+
+def _monthly(history):
+    """Worst status per month of a plain or '@' history, as {'YYYY-MM': code}."""
+    months = {}
+    for entry in history.get("MonthlyPayStatus", []):
+        month = month_ordinal(entry.get("date") or entry.get("@date"))
+        code = entry.get("status", entry.get("@status"))
+        if month not in months or (SEVERITY[ord(code)], code != " ") > (SEVERITY[ord(months[month])], True):
+            months[month] = code
+    return months
+
+
+class PaymentCodecRoundTripTests(unittest.TestCase):
+    def assertRoundTrips(self, history):
+        start, codes = encode_payment_history(json.dumps(history))
+        decoded = decode_payment_history(start, codes)
+        self.assertEqual(_monthly(decoded), _monthly(history))
+
+    def test_plain_keys(self):
+        self.assertRoundTrips(PLAIN)
+
+    def test_at_keys(self):
+        self.assertRoundTrips(AT_KEYS)
+
+    def test_duplicate_month_keeps_worst_status(self):
+        start, codes = encode_payment_history(PLAIN)
+        self.assertEqual(start, "2024-10")
+        self.assertEqual(codes, "C1CC")
+
+    def test_grid_uses_own_bureau_column(self):
+        # Jan 2024 is listed twice; the 30-day late wins over OK
+        self.assertEqual(encode_payment_history(GRID, 3), ("2024-02", "219"))
+        self.assertEqual(encode_payment_history(GRID, 1), ("2024-02", "C C"))
+        self.assertEqual(encode_payment_history(GRID, 2), (None, ""))
+
+    def test_empty_shapes(self):
+        for raw in ("[]", '""', "", "null"):
+            self.assertEqual(encode_payment_history(raw), (None, ""))
+            self.assertIsNone(decode_payment_history(None, ""))
+
+
+class PackPaymentHistoriesTests(unittest.TestCase):
+    def test_packing_keeps_the_raw_json(self):
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        shapes = [PLAIN, AT_KEYS, GRID, [], ""]
+        with engine.begin() as conn:
+            for i, shape in enumerate(shapes, 1):
+                conn.execute(text(
+                    "INSERT INTO account_histories (id, credit_bureau_id, payment_history) "
+                    "VALUES (:id, 3, :history)"
+                ), {"id": i, "history": json.dumps(shape)})
+
+        self.assertEqual(pack_payment_histories(engine), len(shapes))
+
+        with engine.connect() as conn:
+            rows = conn.execute(text(
+                "SELECT payment_history, payment_history_start, payment_history_codes "
+                "FROM account_histories ORDER BY id"
+            )).fetchall()
+        for shape, (raw, start, codes) in zip(shapes, rows):
+            self.assertEqual(json.loads(raw), shape)
+            self.assertEqual((start, codes), encode_payment_history(shape, 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+
+from sqlalchemy import create_engine, text
+
+from furnisher_addresses import extract_furnisher_addresses
+from migrations import create_schema, link_provider_report_ids
+from overview import build_report_overview
+
+
+class ProviderReportIdTests(unittest.TestCase):
+    """Two pulls of the same user: scores and contacts must not leak between them."""
+
+    def setUp(self):
+        self.engine = create_engine('sqlite://')
+        create_schema(self.engine)
+        with self.engine.begin() as conn:
+            conn.execute(text("INSERT INTO reports (id, slug) VALUES (1, 'older'), (2, 'newer')"))
+            conn.execute(text(
+                "INSERT INTO account_histories (id, report_id, user_id, credit_bureau_id, account_status, created_at) "
+                "VALUES (10, 1, 42, 1, 'Open', '2024-06-01 10:00:05'), (20, 2, 42, 1, 'Open', '2024-12-01 09:00:05')"
+            ))
+            conn.execute(text(
+                "INSERT INTO credit_scores (id, user_id, credit_bureau_id, credit_score, report_id, created_at) "
+                "VALUES (1, 42, 1, '610', 700, '2024-06-01 10:01:00'), (2, 42, 1, '680', 800, '2024-12-01 09:01:00')"
+            ))
+            conn.execute(text(
+                "INSERT INTO credit_contacts (id, user_id, creditor_name, address_line, report_id, created_at) "
+                "VALUES (1, 42, 'OLD BANK', '1 Main St', 700, '2024-06-01 10:00:00'), "
+                "(2, 42, 'NEW BANK', '2 Main St', 800, '2024-12-01 09:00:00')"
+            ))
+
+    def test_reports_are_linked_to_the_nearest_pull(self):
+        self.assertEqual(sorted(link_provider_report_ids(self.engine)), [1, 2])
+        with self.engine.connect() as conn:
+            linked = dict(conn.execute(text("SELECT id, provider_report_id FROM reports")).fetchall())
+        self.assertEqual(linked, {1: 700, 2: 800})
+        # Already linked reports are left alone
+        self.assertEqual(link_provider_report_ids(self.engine), [])
+
+    def test_overview_and_addresses_use_the_reports_own_pull(self):
+        link_provider_report_ids(self.engine)
+        with self.engine.connect() as conn:
+            self.assertEqual(build_report_overview(conn, 1)['transunion_score'], 610)
+            self.assertEqual(build_report_overview(conn, 2)['transunion_score'], 680)
+            names = [row['name'] for row in extract_furnisher_addresses(conn, 1) if row['source'] == 'credit_contact']
+        self.assertEqual(names, ['OLD BANK'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+import unittest
+
+from sqlalchemy import create_engine, text
+
+from classification_inputs import classification_inputs_hash
+from models import Base
+from report_diff import carry_forward_classifications, diff_report, previous_report_id
+
+USER_ID = 501
+
+
+def _account(id, report_id, furnisher, number, **fields):
+    row = {
+        'id': id, 'report_id': report_id, 'user_id': USER_ID, 'credit_bureau_id': 1,
+        'furnisher_name': furnisher, 'account_number': number, 'date_opened': '03/15/2019',
+        'account_status': 'Open', 'payment_status': 'Current', 'balance': '$1,200',
+        'past_due': '$0', 'credit_limit': '$5,000', 'high_credit': '$2,000',
+        'monthly_payment': '$35', 'date_last_payment': '09/01/2024', 'date_last_active': '09/01/2024',
+        'late_status': '-', 'comments': '-',
+        'payment_history_start': '2024-09', 'payment_history_codes': 'CCCC',
+    }
+    row.update(fields)
+    return row
+
+
+class ReportDiffTests(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine('sqlite://')
+        Base.metadata.create_all(self.engine)
+        previous = [
+            _account(1, 10, 'CAPITAL ONE', '517805XXXXXX1234'),
+            _account(2, 10, 'DISCOVER BANK', '601100XXXXXX9876'),
+            _account(3, 10, 'SYNCB/AMAZON', '604578XXXXXX5555'),
+            _account(4, 10, 'WELLS FARGO', '414720XXXXXX0001'),
+        ]
+        current = [
+            # Only the balance and payment dates moved: classification still holds
+            _account(11, 20, 'CAPITAL ONE', '517805XXXXXX1234', balance='$1,050',
+                     date_last_payment='10/01/2024', payment_history_start='2024-10',
+                     payment_history_codes='CCCCC'),
+            # Status changed: has to be classified again
+            _account(12, 20, 'DISCOVER BANK', '601100XXXXXX9876', account_status='Derogatory'),
+            # New late month in the payment history
+            _account(13, 20, 'SYNCB/AMAZON', '604578XXXXXX5555', payment_history_start='2024-10',
+                     payment_history_codes='1CCCC'),
+            # Unchanged
+            _account(14, 20, 'WELLS FARGO', '414720XXXXXX0001'),
+            # Opened since the last pull
+            _account(15, 20, 'CHASE CARD', '426684XXXXXX7777', date_opened='08/02/2024'),
+        ]
+        with self.engine.begin() as conn:
+            conn.execute(text("INSERT INTO reports (id, slug) VALUES (10, 'a'), (20, 'b')"))
+            columns = list(previous[0])
+            conn.execute(text(
+                f"INSERT INTO account_histories ({', '.join(columns)}) "
+                f"VALUES ({', '.join(':' + c for c in columns)})"
+            ), previous + current)
+            for row in previous:
+                conn.execute(text(
+                    "INSERT INTO account_classifications (account_id, report_id, inputs_hash, category, reason) "
+                    "VALUES (:id, 10, :hash, 'Positive Account', 'On time')"
+                ), {'id': row['id'], 'hash': classification_inputs_hash(row, row['account_status'], 0, None)})
+        self.previous, self.current = previous, current
+
+    def test_diff_against_previous_pull(self):
+        with self.engine.connect() as conn:
+            diff = diff_report(conn, 20)
+        self.assertEqual(diff.previous_report_id, 10)
+        self.assertEqual(diff.added, [15])
+        self.assertEqual(diff.removed, [])
+        self.assertEqual(diff.unchanged, {14: 4})
+        changed = {change.new_id: change for change in diff.changed}
+        self.assertEqual(sorted(changed), [11, 12, 13])
+        self.assertEqual({c.field for c in changed[11].changes}, {'balance', 'date_last_payment'})
+        self.assertFalse(changed[11].needs_reclassification)
+        self.assertTrue(changed[12].needs_reclassification)
+        self.assertEqual([c.field for c in changed[13].changes], ['payment_history'])
+        self.assertEqual(changed[13].changes[0].new, {'2024-10': '1'})
+        self.assertEqual(sorted(diff.needs_classification()), [12, 13, 15])
+
+    def test_carry_forward_copies_only_still_valid_classifications(self):
+        with self.engine.begin() as conn:
+            diff = diff_report(conn, 20)
+            self.assertEqual(carry_forward_classifications(conn, diff), 2)
+            carried = dict(conn.execute(text(
+                "SELECT account_id, carried_from FROM account_classifications WHERE report_id = 20"
+            )).fetchall())
+        self.assertEqual(carried, {11: 1, 14: 4})
+
+    def test_carried_hash_matches_the_new_account(self):
+        # The classification fields did not change, so a lookup by the new
+        # account's hash finds the carried row
+        with self.engine.begin() as conn:
+            carry_forward_classifications(conn, diff_report(conn, 20))
+            new = self.current[0]
+            found = conn.execute(text(
+                "SELECT category FROM account_classifications WHERE account_id = :id AND inputs_hash = :hash"
+            ), {'id': new['id'], 'hash': classification_inputs_hash(new, new['account_status'], 0, None)}).scalar()
+        self.assertEqual(found, 'Positive Account')
+
+    def test_first_report_has_everything_added(self):
+        with self.engine.connect() as conn:
+            diff = diff_report(conn, 10)
+        self.assertIsNone(diff.previous_report_id)
+        self.assertEqual(sorted(diff.added), [1, 2, 3, 4])
+        self.assertEqual(diff.carried_over(), {})
+
+
+class PreviousReportByIdentityTests(unittest.TestCase):
+    """Reports without a shared provider user id are linked through identity_keys."""
+
+    def setUp(self):
+        self.engine = create_engine('sqlite://')
+        Base.metadata.create_all(self.engine)
+        keys = [
+            (1, 'name', 'john smith'), (1, 'dob', '1980 02 03'),
+            (2, 'name', 'john smith'), (2, 'current_address', '9 elm st springfield'),
+            (3, 'name', 'john smith'), (3, 'dob', '1975 11 30'), (3, 'current_address', '1 oak ave'),
+            # Same consumer: the old current address is now a previous one
+            (4, 'name', 'john smith'), (4, 'previous_address', '9 elm st springfield'),
+            # Same name only
+            (5, 'name', 'john smith'), (5, 'dob', '1990 07 07'),
+            (6, 'name', 'john smith'), (6, 'dob', '1980 02 03'),
+        ]
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO identity_keys (report_id, kind, value, key) VALUES (:r, :kind, :key, :key)"
+            ), [{'r': r, 'kind': kind, 'key': key} for r, kind, key in keys])
+
+    def previous(self, report_id):
+        with self.engine.connect() as conn:
+            return previous_report_id(conn, report_id)
+
+    def test_name_needs_a_matching_dob_or_address(self):
+        self.assertEqual(self.previous(4), 2)
+        self.assertEqual(self.previous(6), 1)
+        self.assertIsNone(self.previous(5))
+        self.assertIsNone(self.previous(3))
+
+
+if __name__ == '__main__':
+    unittest.main()
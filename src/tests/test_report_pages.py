@@ -0,0 +1,100 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine, text
+
+from models import Base
+
+# The Django app lives in RAG/; report_store only needs settings for the default database path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'RAG'))
+from api import report_store  # noqa: E402
+
+
+class PageCursorTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.db_path = os.path.join(cls.tmp.name, 'credit_reports.db')
+        engine = create_engine(f'sqlite:///{cls.db_path}')
+        Base.metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO reports (id, slug, provider_report_id) VALUES (1, 'a', 9001), (2, 'b', 9002)"
+            ))
+            # Ids out of insertion order, and many rows sharing every filtered value
+            rows = [{'id': id, 'report_id': 1, 'user_id': 77, 'credit_bureau_id': 1 + id % 3,
+                     'furnisher_name': 'SAME BANK', 'account_status': 'Open'}
+                    for id in (9, 3, 14, 1, 7, 12, 5, 11, 2, 8)]
+            rows += [{'id': 4, 'report_id': 1, 'user_id': 77, 'credit_bureau_id': 1,
+                      'furnisher_name': 'SAME BANK', 'account_status': 'Closed'},
+                     {'id': 6, 'report_id': 2, 'user_id': 78, 'credit_bureau_id': 1,
+                      'furnisher_name': 'SAME BANK', 'account_status': 'Open'}]
+            conn.execute(text(
+                "INSERT INTO account_histories (id, report_id, user_id, credit_bureau_id, furnisher_name, "
+                "account_status) VALUES (:id, :report_id, :user_id, :credit_bureau_id, :furnisher_name, "
+                ":account_status)"
+            ), rows)
+            conn.execute(text(
+                "INSERT INTO credit_contacts (id, user_id, creditor_name, report_id) VALUES "
+                "(1, 77, 'SAME BANK', 9001), (2, 78, 'OTHER BANK', 9002), (3, 77, 'SAME BANK', 9003)"
+            ))
+        engine.dispose()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def page(self, resource, params, fixed=None):
+        query = report_store.build_query(resource, params, fixed)
+        return json.loads(''.join(report_store.stream_page(query, report_store.connect(self.db_path))))
+
+    def walk(self, resource, params, fixed=None):
+        ids, cursor, pages = [], None, 0
+        while True:
+            page = self.page(resource, dict(params, **({'cursor': cursor} if cursor else {})), fixed)
+            ids.extend(row['id'] for row in page['results'])
+            pages += 1
+            cursor = page['next_cursor']
+            if cursor is None:
+                return ids, pages
+
+    def test_pages_cover_duplicate_values_exactly_once(self):
+        ids, pages = self.walk('accounts', {'limit': '3', 'status': 'Open', 'fields': 'id,account_status'},
+                               {'report_id': '1'})
+        self.assertEqual(ids, [1, 2, 3, 5, 7, 8, 9, 11, 12, 14])
+        self.assertEqual(pages, 4)
+
+    def test_exact_multiple_of_limit_ends_without_an_empty_page(self):
+        ids, pages = self.walk('accounts', {'limit': '5', 'status': 'Open'}, {'report_id': '1'})
+        self.assertEqual(len(ids), 10)
+        self.assertEqual(pages, 2)
+
+    def test_filters_combine_with_the_cursor(self):
+        first = self.page('accounts', {'limit': '2', 'bureau': 'transunion'})
+        self.assertEqual([row['id'] for row in first['results']], [3, 4])
+        rest = self.page('accounts', {'limit': '10', 'bureau': 'transunion', 'cursor': first['next_cursor']})
+        self.assertEqual([row['id'] for row in rest['results']], [6, 9, 12])
+        self.assertIsNone(rest['next_cursor'])
+
+    def test_contacts_are_those_of_the_reports_own_pull(self):
+        page = self.page('contacts', {'fields': 'id,provider_report_id'}, {'report_id': '1'})
+        self.assertEqual(page['results'], [{'id': 1, 'provider_report_id': 9001}])
+
+    def test_fetch_one_leaves_a_passed_connection_open(self):
+        conn = report_store.connect(self.db_path)
+        self.assertEqual(report_store.fetch_one('reports', 2, ['id', 'slug'], conn), {'id': 2, 'slug': 'b'})
+        self.assertIsNone(report_store.fetch_one('reports', 99, ['id'], conn))
+        conn.close()
+
+    def test_bad_cursor_and_fields_are_rejected(self):
+        with self.assertRaises(ValueError):
+            report_store.build_query('accounts', {'cursor': '!!!'})
+        with self.assertRaises(ValueError):
+            report_store.build_query('accounts', {'fields': 'id,password'})
+
+
+if __name__ == '__main__':
+    unittest.main()
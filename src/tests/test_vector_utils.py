@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from utils import is_retryable_error, load_vectors, normalize_vectors
+
+
+class _ApiError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+class _Response:
+    status_code = 503
+
+
+class RetryableErrorTests(unittest.TestCase):
+    def test_rate_limits_server_and_connection_errors_are_retried(self):
+        self.assertTrue(is_retryable_error(_ApiError(429)))
+        self.assertTrue(is_retryable_error(_ApiError(500)))
+        error = Exception("upstream")
+        error.response = _Response()
+        self.assertTrue(is_retryable_error(error))
+        self.assertTrue(is_retryable_error(ConnectionResetError()))
+        self.assertTrue(is_retryable_error(TimeoutError()))
+
+    def test_client_errors_are_not(self):
+        self.assertFalse(is_retryable_error(_ApiError(400)))
+        self.assertFalse(is_retryable_error(_ApiError(404)))
+        self.assertFalse(is_retryable_error(ValueError("Vector dimension 3 does not match")))
+
+    def test_cause_chain_is_followed(self):
+        try:
+            try:
+                raise _ApiError(429)
+            except _ApiError as e:
+                raise RuntimeError("upsert failed") from e
+        except RuntimeError as wrapped:
+            self.assertTrue(is_retryable_error(wrapped))
+
+
+class NormalizeVectorsTests(unittest.TestCase):
+    def setUp(self):
+        self.matrix = np.array([[3, 4], [0, 0], [0, 2]], dtype=np.float32)
+        self.expected = np.array([[0.6, 0.8], [0, 0], [0, 1]], dtype=np.float32)
+
+    def test_in_place(self):
+        result = normalize_vectors(self.matrix, out=self.matrix, chunk_rows=2)
+        self.assertIs(result, self.matrix)
+        np.testing.assert_allclose(self.matrix, self.expected)
+
+    def test_read_only_input_is_copied(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'vectors.npy')
+            np.save(path, self.matrix)
+            mapped = load_vectors(path)
+            self.assertFalse(mapped.flags.writeable)
+            result = normalize_vectors(mapped, out=mapped)
+            self.assertIsNot(result, mapped)
+            np.testing.assert_allclose(result, self.expected)
+            np.testing.assert_array_equal(mapped, self.matrix)
+            del mapped
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,10 +4,15 @@ from manager import PineconeManager
 from config import PineconeConfig
 import re
 
+@st.cache_resource
+def get_pinecone_manager() -> PineconeManager:
+    # Built once per server process rather than on every rerun, so the index
+    # lookup and stats calls in the constructor stay off the interaction path
+    return PineconeManager(PineconeConfig())
+
 # Initialize Pinecone Manager
 try:
-    config = PineconeConfig()
-    pinecone_manager = PineconeManager(config)
+    pinecone_manager = get_pinecone_manager()
 except Exception as e:
     st.error(f"Failed to initialize Pinecone Manager: {str(e)}")
     st.stop()
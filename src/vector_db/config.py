@@ -13,12 +13,21 @@ logger = logging.getLogger(__name__)
 class PineconeConfig:
     api_key: str = os.getenv('PINECONE_API_KEY')
     index_name: str = os.getenv('PINECONE_INDEX_NAME')
+    # 'pinecone' or 'local' for the in-process index in local_index.py
+    backend: str = os.getenv('VECTOR_DB_BACKEND', 'pinecone')
+    # Directory the local index is persisted to; empty keeps it in memory
+    local_path: str = os.getenv('VECTOR_DB_LOCAL_PATH', 'local_index')
 
     def __post_init__(self):
+        if self.backend not in ('pinecone', 'local'):
+            error_msg = f"Unknown VECTOR_DB_BACKEND '{self.backend}', expected 'pinecone' or 'local'"
+            logger.error(error_msg)
+            sys.exit(error_msg)
+
         missing = []
-        if not self.api_key:
+        if self.backend == 'pinecone' and not self.api_key:
             missing.append('PINECONE_API_KEY')
-        if not self.index_name:
+        if self.backend == 'pinecone' and not self.index_name:
             missing.append('PINECONE_INDEX_NAME')
         
         if missing:
@@ -26,4 +35,4 @@ class PineconeConfig:
             logger.error(error_msg)
             sys.exit(error_msg)
         else:
-            logger.info("All required Pinecone configuration variables are loaded successfully.")
\ No newline at end of file
+            logger.info(f"All required configuration variables for the {self.backend} backend are loaded successfully.")
\ No newline at end of file
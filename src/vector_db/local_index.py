@@ -0,0 +1,429 @@
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+import json
+import logging
+import os
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Namespaces are clustered into an IVF index once an upsert takes them to this size
+IVF_THRESHOLD = 20_000
+# Inverted lists probed per query
+IVF_NPROBE = 8
+KMEANS_ITERATIONS = 10
+# k-means trains on at most this many vectors per list
+KMEANS_SAMPLE_PER_LIST = 40
+
+
+def _compare(value, op: str, operand) -> bool:
+    if op == '$eq':
+        return value == operand
+    if op == '$ne':
+        return value != operand
+    if op == '$in':
+        return value in operand
+    if op == '$nin':
+        return value not in operand
+    if op == '$exists':
+        return (value is not None) == bool(operand)
+    if value is None:
+        return False
+    if op == '$gt':
+        return value > operand
+    if op == '$gte':
+        return value >= operand
+    if op == '$lt':
+        return value < operand
+    if op == '$lte':
+        return value <= operand
+    raise ValueError(f"Unsupported filter operator: {op}")
+
+
+def matches_filter(metadata: Optional[Dict], filter: Optional[Dict]) -> bool:
+    """
+    Evaluates a Pinecone-style metadata filter.
+
+    Supports implicit equality, $eq, $ne, $gt, $gte, $lt, $lte, $in, $nin,
+    $exists, $and and $or. List-valued metadata matches when any element does.
+    """
+    if not filter:
+        return True
+    metadata = metadata or {}
+    for key, condition in filter.items():
+        if key == '$and':
+            if not all(matches_filter(metadata, c) for c in condition):
+                return False
+            continue
+        if key == '$or':
+            if not any(matches_filter(metadata, c) for c in condition):
+                return False
+            continue
+        value = metadata.get(key)
+        conditions = condition.items() if isinstance(condition, dict) else [('$eq', condition)]
+        for op, operand in conditions:
+            if not isinstance(value, list) or op == '$exists':
+                ok = _compare(value, op, operand)
+            elif op in ('$ne', '$nin'):
+                ok = all(_compare(v, op, operand) for v in value)
+            else:
+                ok = any(_compare(v, op, operand) for v in value)
+            if not ok:
+                return False
+    return True
+
+
+class _Completed:
+    """Stands in for the async result Pinecone returns when ``async_req=True``."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def get(self, timeout=None):
+        return self.value
+
+
+class LocalNamespace:
+    """
+    Vectors of one namespace in a growable float32 matrix.
+
+    Rows are kept contiguous: a deleted row is replaced by the last row, so
+    exhaustive search is a single matrix-vector product over ``unit[:count]``.
+    Unit-normalized copies are stored alongside for the cosine metric.
+
+    Once trained, every row is also filed in the inverted list of its
+    nearest centroid. Upserts and deletes keep the lists current, so a
+    query only touches the rows of the lists it probes.
+    """
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+        self.count = 0
+        self.ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.metadata: List[Optional[Dict]] = []
+        self.values = np.empty((0, dimension), dtype=np.float32)
+        self.unit = np.empty((0, dimension), dtype=np.float32)
+        # IVF state: centroids, the rows filed under each, and each row's list
+        self.centroids: Optional[np.ndarray] = None
+        self.lists: List[Set[int]] = []
+        self.assignment = np.empty(0, dtype=np.int32)
+        self.trained_at = 0
+
+    def _reserve(self, size: int):
+        if size <= len(self.values):
+            return
+        capacity = max(size, 2 * len(self.values), 64)
+        for name, dtype in (('values', np.float32), ('unit', np.float32), ('assignment', np.int32)):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def _assign(self, unit: np.ndarray) -> np.ndarray:
+        return np.argmax(unit @ self.centroids.T, axis=1).astype(np.int32)
+
+    def upsert(self, ids: List[str], values: np.ndarray, metadata: List[Optional[Dict]]):
+        norms = np.linalg.norm(values, axis=1, keepdims=True)
+        unit = np.divide(values, norms, out=np.zeros_like(values), where=norms > 0)
+        self._reserve(self.count + len(ids))
+        rows, added = [], []
+        for vector_id, meta in zip(ids, metadata):
+            row = self.rows.get(vector_id)
+            if row is None:
+                row = self.rows[vector_id] = self.count
+                self.ids.append(vector_id)
+                self.metadata.append(meta)
+                self.count += 1
+                added.append(True)
+            else:
+                self.metadata[row] = meta
+                added.append(False)
+            rows.append(row)
+        self.values[rows] = values
+        self.unit[rows] = unit
+        if self.centroids is not None:
+            for row, is_new, label in zip(rows, added, self._assign(unit).tolist()):
+                if not is_new:
+                    self.lists[self.assignment[row]].discard(row)
+                self.lists[label].add(row)
+                self.assignment[row] = label
+        # (Re)cluster when the namespace first reaches the threshold and again
+        # each time it doubles, so queries never pay for training
+        if self.count >= IVF_THRESHOLD and (self.centroids is None or self.count > 2 * self.trained_at):
+            self.train()
+
+    def delete(self, ids: List[str]) -> int:
+        deleted = 0
+        for vector_id in ids:
+            row = self.rows.pop(vector_id, None)
+            if row is None:
+                continue
+            last = self.count - 1
+            if self.centroids is not None:
+                self.lists[self.assignment[row]].discard(row)
+            if row != last:
+                moved = self.ids[last]
+                self.ids[row], self.metadata[row] = moved, self.metadata[last]
+                self.values[row], self.unit[row] = self.values[last], self.unit[last]
+                self.assignment[row] = self.assignment[last]
+                self.rows[moved] = row
+                if self.centroids is not None:
+                    moved_list = self.lists[self.assignment[row]]
+                    moved_list.discard(last)
+                    moved_list.add(row)
+            self.ids.pop()
+            self.metadata.pop()
+            self.count -= 1
+            deleted += 1
+        return deleted
+
+    def train(self, nlist: Optional[int] = None, seed: int = 0):
+        """Clusters the namespace with spherical k-means and files every row in an inverted list."""
+        if self.count == 0:
+            return
+        unit = self.unit[:self.count]
+        nlist = nlist or max(1, int(np.sqrt(self.count)))
+        rng = np.random.default_rng(seed)
+        sample = unit[rng.choice(self.count, min(self.count, KMEANS_SAMPLE_PER_LIST * nlist), replace=False)]
+        centroids = sample[rng.choice(len(sample), min(nlist, len(sample)), replace=False)].copy()
+        for _ in range(KMEANS_ITERATIONS):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # Empty clusters keep their previous centroid
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+        self.centroids = centroids.astype(np.float32)
+        self.assignment[:self.count] = self._assign(unit)
+        order = np.argsort(self.assignment[:self.count], kind='stable')
+        bounds = np.searchsorted(self.assignment[:self.count][order], np.arange(len(centroids) + 1))
+        self.lists = [set(order[bounds[i]:bounds[i + 1]].tolist()) for i in range(len(centroids))]
+        self.trained_at = self.count
+        logger.info(f"Trained IVF index with {len(centroids)} lists over {self.count} vectors")
+
+    def _candidates(self, query: np.ndarray, nprobe: int) -> Optional[np.ndarray]:
+        """Rows of the nprobe nearest inverted lists, or None to search exhaustively."""
+        if self.centroids is None:
+            return None
+        probe = np.argsort(-(self.centroids @ query))[:nprobe]
+        size = sum(len(self.lists[i]) for i in probe)
+        rows = np.fromiter((row for i in probe for row in self.lists[i]), dtype=np.int64, count=size)
+        rows.sort()  # sequential reads from unit
+        return rows
+
+    def search(self, query: np.ndarray, top_k: int, filter: Optional[Dict] = None,
+               nprobe: int = IVF_NPROBE):
+        """Row indices and cosine scores of the top_k matches, best first."""
+        if self.count == 0 or top_k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        query = query / norm if norm > 0 else query
+        rows = self._candidates(query, nprobe)
+        if filter:
+            allowed = np.fromiter((matches_filter(self.metadata[r], filter)
+                                   for r in (range(self.count) if rows is None else rows)), dtype=bool)
+            rows = np.flatnonzero(allowed) if rows is None else rows[allowed]
+        scores = self.unit[:self.count] @ query if rows is None else self.unit[rows] @ query
+        k = min(top_k, len(scores))
+        if k == 0:
+            return np.empty(0, dtype=np.int64), scores[:0]
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return (best if rows is None else rows[best]), scores[best]
+
+
+class LocalIndex:
+    """
+    In-process replacement for a Pinecone index.
+
+    Implements the subset of ``pinecone.Index`` used by PineconeManager and
+    LangChain's PineconeVectorStore (upsert, query, delete,
+    describe_index_stats) with the cosine metric. Small namespaces are
+    searched exhaustively; an upsert that takes a namespace to
+    IVF_THRESHOLD vectors clusters it into an IVF index (or call train()).
+
+    With a ``path``, namespaces are loaded from that directory and
+    ``save()`` writes the ones changed since the last save.
+    """
+
+    def __init__(self, dimension: int, path: Optional[str] = None):
+        self.dimension = dimension
+        self.path = Path(path) if path else None
+        self.namespaces: Dict[str, LocalNamespace] = {}
+        self.dirty = set()
+        self._lock = threading.RLock()
+        if self.path is not None and (self.path / 'manifest.json').exists():
+            self.load()
+
+    def _namespace(self, namespace: Optional[str], create: bool = False) -> Optional[LocalNamespace]:
+        namespace = namespace or ''
+        ns = self.namespaces.get(namespace)
+        if ns is None and create:
+            ns = self.namespaces[namespace] = LocalNamespace(self.dimension)
+        return ns
+
+    @staticmethod
+    def _unpack(vector):
+        if isinstance(vector, dict):
+            return str(vector['id']), vector['values'], vector.get('metadata')
+        # LangChain passes (id, values, metadata) tuples
+        vector_id, values, *rest = vector
+        return str(vector_id), values, rest[0] if rest else None
+
+    def upsert(self, vectors, namespace: Optional[str] = None, async_req: bool = False, **kwargs):
+        ids, values, metadata = [], [], []
+        for vector in vectors:
+            vector_id, vector_values, meta = self._unpack(vector)
+            ids.append(vector_id)
+            values.append(vector_values)
+            metadata.append(meta)
+        matrix = np.asarray(values, dtype=np.float32).reshape(len(ids), -1)
+        if matrix.shape[1] != self.dimension:
+            raise ValueError(f"Vector dimension {matrix.shape[1]} does not match index dimension {self.dimension}")
+        with self._lock:
+            self._namespace(namespace, create=True).upsert(ids, matrix, metadata)
+            self.dirty.add(namespace or '')
+        result = {'upserted_count': len(ids)}
+        return _Completed(result) if async_req else result
+
+    def query(self, vector=None, namespace: Optional[str] = None, top_k: int = 10,
+              filter: Optional[Dict] = None, include_metadata: bool = False,
+              include_values: bool = False, id: Optional[str] = None, **kwargs) -> Dict:
+        with self._lock:
+            ns = self._namespace(namespace)
+            if ns is None:
+                return {'matches': [], 'namespace': namespace or ''}
+            if vector is None:
+                row = ns.rows.get(id)
+                if row is None:
+                    return {'matches': [], 'namespace': namespace or ''}
+                vector = ns.values[row]
+            rows, scores = ns.search(np.asarray(vector, dtype=np.float32), top_k, filter)
+            matches = []
+            for row, score in zip(rows.tolist(), scores.tolist()):
+                match = {'id': ns.ids[row], 'score': score}
+                if include_metadata:
+                    match['metadata'] = dict(ns.metadata[row] or {})
+                if include_values:
+                    match['values'] = ns.values[row].tolist()
+                matches.append(match)
+        return {'matches': matches, 'namespace': namespace or ''}
+
+    def train(self, namespace: Optional[str] = None, nlist: Optional[int] = None):
+        """Clusters a namespace into an IVF index now, whatever its size."""
+        with self._lock:
+            ns = self._namespace(namespace)
+            if ns is not None:
+                ns.train(nlist)
+
+    def fetch(self, ids: List[str], namespace: Optional[str] = None, **kwargs) -> Dict:
+        with self._lock:
+            ns = self._namespace(namespace) or LocalNamespace(self.dimension)
+            vectors = {}
+            for vector_id in ids:
+                row = ns.rows.get(vector_id)
+                if row is not None:
+                    vectors[vector_id] = {'id': vector_id, 'values': ns.values[row].tolist(),
+                                          'metadata': ns.metadata[row]}
+        return {'vectors': vectors, 'namespace': namespace or ''}
+
+    def list(self, prefix: Optional[str] = None, namespace: Optional[str] = None, limit: int = 100, **kwargs):
+        """Yields pages of ids, optionally only those starting with ``prefix``, like pinecone.Index.list."""
+        with self._lock:
+            ns = self._namespace(namespace)
+            ids = sorted(i for i in (ns.ids if ns is not None else []) if not prefix or i.startswith(prefix))
+        for start in range(0, len(ids), limit):
+            yield ids[start:start + limit]
+
+    def delete(self, ids: Optional[List[str]] = None, delete_all: bool = False,
+               namespace: Optional[str] = None, filter: Optional[Dict] = None, **kwargs) -> Dict:
+        with self._lock:
+            namespace = namespace or ''
+            ns = self._namespace(namespace)
+            if ns is None:
+                return {}
+            if delete_all:
+                del self.namespaces[namespace]
+            else:
+                if filter:
+                    ids = [ns.ids[row] for row in range(ns.count) if matches_filter(ns.metadata[row], filter)]
+                ns.delete([str(i) for i in ids or []])
+            self.dirty.add(namespace)
+        return {}
+
+    def describe_index_stats(self, **kwargs) -> Dict:
+        with self._lock:
+            namespaces = {name: {'vector_count': ns.count} for name, ns in self.namespaces.items()}
+        return {
+            'dimension': self.dimension,
+            'index_fullness': 0.0,
+            'namespaces': namespaces,
+            'total_vector_count': sum(ns['vector_count'] for ns in namespaces.values()),
+        }
+
+    def save(self, everything: bool = False):
+        """
+        Writes changed namespaces (or all with ``everything``) to ``path``.
+
+        Each namespace is one .npy matrix and one JSON file of ids and
+        metadata, listed in a manifest. Files are written then renamed, so a
+        crash leaves the previous copy.
+        """
+        if self.path is None:
+            raise ValueError("LocalIndex has no path to save to")
+        with self._lock:
+            self.path.mkdir(parents=True, exist_ok=True)
+            manifest_path = self.path / 'manifest.json'
+            manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+            files = manifest.get('namespaces', {})
+            names = set(self.namespaces) | set(files) if everything else self.dirty
+            for name in names:
+                ns = self.namespaces.get(name)
+                if ns is None:
+                    if name in files:
+                        self._remove_files(files.pop(name))
+                    continue
+                stem = files.get(name)
+                if stem is None:
+                    used = set(files.values())
+                    stem = next(f"ns{i}" for i in range(len(used) + 1) if f"ns{i}" not in used)
+                    files[name] = stem
+                self._write(self.path / f"{stem}.npy",
+                            lambda f, ns=ns: np.save(f, ns.values[:ns.count]))
+                self._write(self.path / f"{stem}.json",
+                            lambda f, ns=ns: f.write(json.dumps({'ids': ns.ids, 'metadata': ns.metadata}).encode()))
+            self._write(manifest_path, lambda f: f.write(json.dumps(
+                {'dimension': self.dimension, 'namespaces': files}).encode()))
+            self.dirty.clear()
+
+    @staticmethod
+    def _write(path: Path, write):
+        tmp = path.with_name(path.name + '.tmp')
+        with open(tmp, 'wb') as f:
+            write(f)
+        os.replace(tmp, path)
+
+    def _remove_files(self, stem: str):
+        for suffix in ('.npy', '.json'):
+            try:
+                os.remove(self.path / f"{stem}{suffix}")
+            except FileNotFoundError:
+                pass
+
+    def load(self):
+        """Loads every namespace listed in the manifest under ``path``."""
+        manifest = json.loads((self.path / 'manifest.json').read_text())
+        if manifest['dimension'] != self.dimension:
+            raise ValueError(f"Stored index has dimension {manifest['dimension']}, expected {self.dimension}")
+        with self._lock:
+            self.namespaces = {}
+            for name, stem in manifest['namespaces'].items():
+                values = np.load(self.path / f"{stem}.npy")
+                stored = json.loads((self.path / f"{stem}.json").read_text())
+                ns = self.namespaces[name] = LocalNamespace(self.dimension)
+                if len(values):
+                    ns.upsert(stored['ids'], values, stored['metadata'])
+            self.dirty.clear()
+        logger.info(f"Loaded {len(self.namespaces)} namespaces from {self.path}")
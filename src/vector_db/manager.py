@@ -1,21 +1,67 @@
-from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Sequence, Union
+import json
 import logging
+import random
+import threading
+import time
 import uuid
 from pinecone import Pinecone, ServerlessSpec
 from config import PineconeConfig
 from exceptions import ConnectionError, NamespaceError, VectorDBException
+from local_index import LocalIndex
+from utils import is_retryable_error, iter_batches
 
 logger = logging.getLogger(__name__)
 
 class PineconeManager:
     DEFAULT_DIMENSION = 1536  # Define a default dimension
 
+    # Pinecone caps upserts at 1000 vectors and 2 MB per request; stay below both
+    UPSERT_BATCH_SIZE = 100
+    UPSERT_MAX_BYTES = 2 * 1024 * 1024 - 64 * 1024
+    UPSERT_WORKERS = 8
+    UPSERT_RETRIES = 3
+    QUERY_WORKERS = 8
+    RETRY_BACKOFF_SECONDS = 0.5
+    # describe_index_stats results are reused for this long unless invalidated
+    STATS_TTL_SECONDS = 60.0
+
     def __init__(self, config: PineconeConfig):
         self.config = config
-        self.pc = self._connect()
-        self.index = self._initialize_index()
+        self._stats = None
+        self._stats_time = 0.0
+        self._stats_lock = threading.Lock()
+        if config.backend == 'local':
+            self.pc = None
+            self.index = self._initialize_local_index()
+        else:
+            self.pc = self._connect()
+            self.index = self._initialize_index()
         self.dimension = self._get_index_dimension()
 
+    def _initialize_local_index(self) -> LocalIndex:
+        """
+        Opens the in-process index, loading it from ``config.local_path`` if saved there.
+
+        Returns:
+            LocalIndex: An index with the same interface as a Pinecone index.
+
+        Raises:
+            ConnectionError: If the stored index cannot be loaded.
+        """
+        try:
+            index = LocalIndex(self.DEFAULT_DIMENSION, path=self.config.local_path or None)
+            logger.info(f"Using local vector index at '{self.config.local_path or ':memory:'}'")
+            return index
+        except Exception as e:
+            raise ConnectionError(f"Failed to open local index: {str(e)}")
+
+    def _persist(self) -> None:
+        """Saves namespaces changed since the last call when the local backend has a path."""
+        if isinstance(self.index, LocalIndex) and self.index.path is not None:
+            self.index.save()
+
     def _connect(self) -> Pinecone:
         """
         Initializes the Pinecone client by creating an instance of the Pinecone class.
@@ -76,6 +122,40 @@ class PineconeManager:
         except Exception as e:
             raise ConnectionError(f"Failed to initialize Pinecone index: {str(e)}")
 
+    def _index_stats(self, refresh: bool = False) -> Dict:
+        """
+        Returns describe_index_stats, cached for STATS_TTL_SECONDS.
+
+        Every write method of this class calls invalidate_stats with the
+        namespace it changed, so namespace listings only go back to Pinecone
+        after a write or once the TTL has passed.
+
+        Args:
+            refresh (bool, optional): Bypass the cache. Defaults to False.
+
+        Returns:
+            Dict: The index stats.
+        """
+        with self._stats_lock:
+            if refresh or self._stats is None or time.monotonic() - self._stats_time > self.STATS_TTL_SECONDS:
+                self._stats = self.index.describe_index_stats()
+                self._stats_time = time.monotonic()
+            return self._stats
+
+    def invalidate_stats(self, namespace: Optional[str] = None) -> None:
+        """
+        Drops the cached index stats after a write.
+
+        describe_index_stats reports every namespace in one response, so a
+        write to any namespace drops the whole cached response.
+
+        Args:
+            namespace (str, optional): The namespace that was written, for the log.
+        """
+        with self._stats_lock:
+            self._stats = None
+        logger.debug(f"Index stats invalidated after a write to namespace '{namespace}'.")
+
     def _get_index_dimension(self) -> int:
         """
         Retrieves the dimension of the Pinecone index.
@@ -87,11 +167,11 @@ class PineconeManager:
             ConnectionError: If unable to retrieve index dimension.
         """
         try:
-            index_info = self.index.describe_index_stats()
+            index_info = self._index_stats()
             dimension = index_info.get('dimension')
             if not dimension:
                 raise ConnectionError("Unable to retrieve index dimension.")
-            logger.info(f"Index '{self.config.index_name}' has dimension: {dimension}")
+            logger.info(f"Index '{self.config.index_name or self.config.local_path}' has dimension: {dimension}")
             return dimension
         except Exception as e:
             raise ConnectionError(f"Failed to retrieve index dimension: {str(e)}")
@@ -113,14 +193,18 @@ class PineconeManager:
                 'metadata': {'source': 'dummy'}
             }
             self.upsert_vectors([dummy_vector], namespace)
+            self.invalidate_stats(namespace)
             logger.info(f"Namespace '{namespace}' created with a dummy vector.")
         except Exception as e:
             raise NamespaceError(f"Failed to create namespace '{namespace}': {str(e)}")
 
-    def list_namespaces(self) -> List[str]:
+    def list_namespaces(self, refresh: bool = False) -> List[str]:
         """
         Lists all namespaces in the Pinecone index.
 
+        Args:
+            refresh (bool, optional): Bypass the stats cache. Defaults to False.
+
         Returns:
             List[str]: A list of namespace names.
 
@@ -128,13 +212,32 @@ class PineconeManager:
             NamespaceError: If listing namespaces fails.
         """
         try:
-            index_stats = self.index.describe_index_stats()
+            index_stats = self._index_stats(refresh)
             namespaces = list(index_stats.get('namespaces', {}).keys())
             logger.info(f"Retrieved namespaces: {namespaces}")
             return namespaces
         except Exception as e:
             raise NamespaceError(f"Failed to list namespaces: {str(e)}")
 
+    def namespace_vector_counts(self, refresh: bool = False) -> Dict[str, int]:
+        """
+        Vector count of every namespace, from the stats cache.
+
+        Args:
+            refresh (bool, optional): Bypass the stats cache. Defaults to False.
+
+        Returns:
+            Dict[str, int]: Namespace name to vector count.
+
+        Raises:
+            NamespaceError: If retrieving the stats fails.
+        """
+        try:
+            namespaces = self._index_stats(refresh).get('namespaces', {})
+            return {name: info.get('vector_count', 0) for name, info in namespaces.items()}
+        except Exception as e:
+            raise NamespaceError(f"Failed to retrieve namespace stats: {str(e)}")
+
     def delete_namespace(self, namespace: str) -> None:
         """
         Deletes a namespace and all its vectors.
@@ -147,28 +250,162 @@ class PineconeManager:
         """
         try:
             self.index.delete(delete_all=True, namespace=namespace)
+            self.invalidate_stats(namespace)
+            self._persist()
             logger.info(f"Deleted namespace '{namespace}'.")
         except Exception as e:
             raise NamespaceError(f"Failed to delete namespace '{namespace}': {str(e)}")
 
-    def upsert_vectors(self, vectors: List[Dict], namespace: str) -> None:
+    @staticmethod
+    def _estimate_vector_bytes(vector: Dict) -> int:
+        """Approximate JSON size of one vector without serializing its values."""
+        values = vector.get('values')
+        size = 64 + len(str(vector.get('id', ''))) + 20 * len(values if values is not None else [])
+        if vector.get('metadata'):
+            size += len(json.dumps(vector['metadata'], default=str))
+        if vector.get('sparse_values'):
+            size += 24 * len(vector['sparse_values'].get('indices', []))
+        return size
+
+    def _chunk_vectors(self, vectors: List[Dict], batch_size: int, max_bytes: int) -> Iterator[List[Dict]]:
+        """Splits vectors into requests capped by both vector count and payload size."""
+        chunk, chunk_bytes = [], 0
+        for vector in vectors:
+            size = self._estimate_vector_bytes(vector)
+            if chunk and (len(chunk) >= batch_size or chunk_bytes + size > max_bytes):
+                yield chunk
+                chunk, chunk_bytes = [], 0
+            chunk.append(vector)
+            chunk_bytes += size
+        if chunk:
+            yield chunk
+
+    def _upsert_chunk(self, chunk: List[Dict], namespace: str) -> float:
+        """
+        Upserts one chunk, retrying rate limits, server errors and connection
+        failures with exponential backoff and jitter. Other errors are raised
+        at once.
+
+        Returns:
+            float: Latency of the successful attempt in seconds.
+        """
+        if not isinstance(self.index, LocalIndex):
+            # NumPy rows from utils.iter_batches become lists only here, one request at a time
+            chunk = [dict(v, values=v['values'].tolist()) if hasattr(v['values'], 'tolist') else v
+                     for v in chunk]
+        for attempt in range(self.UPSERT_RETRIES + 1):
+            start = time.perf_counter()
+            try:
+                self.index.upsert(vectors=chunk, namespace=namespace)
+                return time.perf_counter() - start
+            except Exception as e:
+                if attempt == self.UPSERT_RETRIES or not is_retryable_error(e):
+                    raise
+                delay = self.RETRY_BACKOFF_SECONDS * (2 ** attempt) * (1 + random.random())
+                logger.warning(f"Upsert of {len(chunk)} vectors failed ({str(e)}), retrying in {delay:.2f}s")
+                time.sleep(delay)
+
+    def upsert_vectors(self, vectors: List[Dict], namespace: str, batch_size: Optional[int] = None,
+                       max_workers: Optional[int] = None) -> Dict:
         """
         Upserts vectors into a specified namespace.
 
+        The input is split into requests of at most ``batch_size`` vectors and
+        UPSERT_MAX_BYTES of payload, which are sent concurrently over a pool
+        of ``max_workers`` threads. Requests failing with a rate limit, server or
+        connection error are retried with backoff.
+
         Args:
             vectors (List[Dict]): A list of vectors to upsert.
             namespace (str): The target namespace.
+            batch_size (int, optional): Vectors per request. Defaults to UPSERT_BATCH_SIZE.
+            max_workers (int, optional): Concurrent requests. Defaults to UPSERT_WORKERS.
+
+        Returns:
+            Dict: Vector and chunk counts, elapsed seconds, vectors per second and
+            per-chunk latencies in seconds.
 
         Raises:
-            VectorDBException: If upserting vectors fails.
+            VectorDBException: If any chunk still fails after retries.
         """
+        chunks = list(self._chunk_vectors(vectors, batch_size or self.UPSERT_BATCH_SIZE,
+                                          self.UPSERT_MAX_BYTES))
+        latencies, failures = [], []
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=min(max_workers or self.UPSERT_WORKERS, max(len(chunks), 1))) as pool:
+            futures = {pool.submit(self._upsert_chunk, chunk, namespace): i for i, chunk in enumerate(chunks)}
+            for future in as_completed(futures):
+                try:
+                    latencies.append(future.result())
+                    logger.debug(f"Chunk {futures[future]} upserted in {latencies[-1] * 1000:.0f} ms")
+                except Exception as e:
+                    failures.append((futures[future], e))
+        elapsed = time.perf_counter() - start
+        # Also after failures: chunks that made it in changed the counts
+        self.invalidate_stats(namespace)
+        self._persist()
+
+        if failures:
+            failed_vectors = sum(len(chunks[i]) for i, _ in failures)
+            raise VectorDBException(
+                f"Failed to upsert {failed_vectors} of {len(vectors)} vectors in {len(failures)} chunk(s): "
+                f"{str(failures[0][1])}"
+            )
+
+        stats = {
+            'vectors': len(vectors),
+            'chunks': len(chunks),
+            'seconds': elapsed,
+            'vectors_per_second': len(vectors) / elapsed if elapsed > 0 else 0.0,
+            'chunk_latencies': latencies,
+        }
+        if latencies:
+            logger.info(
+                f"Upserted {len(vectors)} vectors into namespace '{namespace}' in {len(chunks)} chunk(s), "
+                f"{elapsed:.2f}s ({stats['vectors_per_second']:.0f} vectors/s, "
+                f"chunk latency avg {1000 * sum(latencies) / len(latencies):.0f} ms, max {1000 * max(latencies):.0f} ms)."
+            )
+        return stats
+
+    def upsert_matrix(self, vectors, namespace: str, metadata: Optional[Sequence[Dict]] = None,
+                      ids: Optional[Sequence[str]] = None, start_id: int = 0, normalize: bool = True,
+                      rows_per_pass: int = 10000, max_workers: Optional[int] = None) -> Dict:
+        """
+        Upserts the rows of a float32 matrix without building per-float Python lists.
+
+        The matrix may be memory-mapped (utils.load_vectors); it is read,
+        normalized and upserted ``rows_per_pass`` rows at a time.
+
+        Args:
+            vectors: A 2-D float32 array, one vector per row.
+            namespace (str): The target namespace.
+            metadata (Sequence[Dict], optional): One metadata dict per row.
+            ids (Sequence[str], optional): One id per row. Defaults to row numbers from ``start_id``.
+            start_id (int, optional): First id when ``ids`` is not given. Defaults to 0.
+            normalize (bool, optional): Normalize rows to unit length. Defaults to True.
+            rows_per_pass (int, optional): Rows materialized at once. Defaults to 10000.
+            max_workers (int, optional): Concurrent requests. Defaults to UPSERT_WORKERS.
+
+        Returns:
+            Dict: Totals in the same shape as upsert_vectors.
+
+        Raises:
+            VectorDBException: If any chunk fails after retries.
+        """
+        totals = {'vectors': 0, 'chunks': 0, 'seconds': 0.0, 'chunk_latencies': []}
         try:
-            self.index.upsert(vectors=vectors, namespace=namespace)
-            logger.info(f"Upserted {len(vectors)} vectors into namespace '{namespace}'.")
-        except Exception as e:
-            raise VectorDBException(f"Failed to upsert vectors: {str(e)}")
+            for batch in iter_batches(vectors, metadata, ids, start_id, rows_per_pass, normalize):
+                stats = self.upsert_vectors(batch, namespace, max_workers=max_workers)
+                for key in totals:
+                    totals[key] += stats[key]
+        finally:
+            self.invalidate_stats(namespace)
+        totals['vectors_per_second'] = totals['vectors'] / totals['seconds'] if totals['seconds'] > 0 else 0.0
+        return totals
 
-    def query_vectors(self, query_vector: List[float], namespace: str, top_k: int = 5) -> Dict:
+    def query_vectors(self, query_vector: List[float], namespace: str, top_k: int = 5,
+                      filter: Optional[Dict] = None, include_metadata: bool = True,
+                      include_values: bool = False) -> Dict:
         """
         Queries vectors in a specified namespace.
 
@@ -176,6 +413,9 @@ class PineconeManager:
             query_vector (List[float]): The vector to query against.
             namespace (str): The namespace to query within.
             top_k (int, optional): Number of top results to retrieve. Defaults to 5.
+            filter (Dict, optional): Metadata filter applied before ranking.
+            include_metadata (bool, optional): Return match metadata. Defaults to True.
+            include_values (bool, optional): Return match vectors. Defaults to False.
 
         Returns:
             Dict: The query results.
@@ -188,13 +428,84 @@ class PineconeManager:
                 vector=query_vector,
                 namespace=namespace,
                 top_k=top_k,
-                include_metadata=True
+                filter=filter,
+                include_metadata=include_metadata,
+                include_values=include_values
             )
             logger.info(f"Query successful in namespace '{namespace}'. Retrieved top {top_k} results.")
             return response
         except Exception as e:
             raise VectorDBException(f"Query failed: {str(e)}")
 
+    def query_many(self, query_vectors, namespace: Union[str, Sequence[str]], top_k: int = 5,
+                   filters: Union[None, Dict, Sequence[Optional[Dict]]] = None,
+                   include_metadata: bool = True, include_values: bool = False,
+                   max_workers: Optional[int] = None) -> List[Dict]:
+        """
+        Runs several queries concurrently.
+
+        Args:
+            query_vectors: A matrix of query vectors, one per row (list of lists
+                or a 2-D NumPy array).
+            namespace (str or Sequence[str]): One namespace for every query, or
+                one per query.
+            top_k (int, optional): Number of top results per query. Defaults to 5.
+            filters (Dict or Sequence[Dict], optional): One metadata filter for
+                every query, or one per query (None entries are unfiltered).
+            include_metadata (bool, optional): Return match metadata. Defaults to True.
+            include_values (bool, optional): Return match vectors. Defaults to False.
+            max_workers (int, optional): Concurrent queries. Defaults to QUERY_WORKERS.
+
+        Returns:
+            List[Dict]: One entry per query in input order, with the query's
+            ``namespace``, ``response`` and latency in ``seconds``.
+
+        Raises:
+            VectorDBException: If the per-query arguments do not line up or any query fails.
+        """
+        queries = [q.tolist() if hasattr(q, 'tolist') else list(q) for q in query_vectors]
+        namespaces = [namespace] * len(queries) if isinstance(namespace, str) else list(namespace)
+        if filters is None or isinstance(filters, dict):
+            filters = [filters] * len(queries)
+        else:
+            filters = list(filters)
+        if not len(namespaces) == len(filters) == len(queries):
+            raise VectorDBException(
+                f"Got {len(queries)} queries, {len(namespaces)} namespaces and {len(filters)} filters"
+            )
+        if not queries:
+            return []
+
+        def run(i):
+            start = time.perf_counter()
+            response = self.index.query(
+                vector=queries[i],
+                namespace=namespaces[i],
+                top_k=top_k,
+                filter=filters[i],
+                include_metadata=include_metadata,
+                include_values=include_values
+            )
+            return {'namespace': namespaces[i], 'response': response, 'seconds': time.perf_counter() - start}
+
+        results = [None] * len(queries)
+        start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=min(max_workers or self.QUERY_WORKERS, len(queries))) as pool:
+                futures = {pool.submit(run, i): i for i in range(len(queries))}
+                for future in as_completed(futures):
+                    results[futures[future]] = future.result()
+        except Exception as e:
+            raise VectorDBException(f"Batch query failed: {str(e)}")
+        elapsed = time.perf_counter() - start
+
+        latencies = [r['seconds'] for r in results]
+        logger.info(
+            f"Ran {len(queries)} queries in {elapsed * 1000:.0f} ms "
+            f"(latency avg {1000 * sum(latencies) / len(latencies):.0f} ms, max {1000 * max(latencies):.0f} ms)."
+        )
+        return results
+
     def delete_vectors(self, ids: List[str], namespace: str) -> None:
         """
         Deletes specific vectors from a namespace.
@@ -208,6 +519,8 @@ class PineconeManager:
         """
         try:
             self.index.delete(ids=ids, namespace=namespace)
+            self.invalidate_stats(namespace)
+            self._persist()
             logger.info(f"Deleted {len(ids)} vectors from namespace '{namespace}'.")
         except Exception as e:
             raise VectorDBException(f"Failed to delete vectors: {str(e)}")
\ No newline at end of file
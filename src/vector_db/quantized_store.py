@@ -0,0 +1,216 @@
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+import json
+import logging
+import os
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DTYPES = ('float32', 'float16', 'int8')
+# Quantized rows converted to float32 per pass when scoring; small enough to stay in cache
+SCORE_CHUNK_ROWS = 1024
+# Candidates re-scored in float32 per requested result
+RESCORE_FACTOR = 4
+
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Symmetric scalar quantization with one scale per vector.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: int8 codes and float32 scales such that
+        ``codes * scales[:, None]`` approximates the input.
+    """
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+class QuantizedStore:
+    """
+    Unit-normalized embeddings kept in RAM as float16 or int8.
+
+    int8 rows carry a per-vector float32 scale. Searches score every row
+    against the quantized copy, then, when a full-precision copy is
+    attached, re-score the best ``top_k * RESCORE_FACTOR`` candidates
+    exactly in float32. The full-precision copy lives in a .npy file and is
+    read through a memory map, so only the rows being re-scored are paged in.
+    """
+
+    def __init__(self, dimension: int, dtype: str = 'int8'):
+        if dtype not in DTYPES:
+            raise ValueError(f"dtype must be one of {DTYPES}")
+        self.dimension = dimension
+        self.dtype = dtype
+        self.ids: List[str] = []
+        self.codes = np.empty((0, dimension), dtype=np.dtype(dtype))
+        self.scales = np.empty(0, dtype=np.float32)
+        self.full: Optional[np.ndarray] = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def memory_bytes(self) -> int:
+        """Bytes held in RAM by the vectors (codes and scales, not the memory-mapped copy)."""
+        return self.codes.nbytes + self.scales.nbytes
+
+    def add(self, ids: Sequence[str], vectors: np.ndarray):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+        if self.dtype == 'int8':
+            codes, scales = quantize_int8(vectors)
+        else:
+            codes, scales = vectors.astype(self.dtype), np.ones(len(vectors), dtype=np.float32)
+        self.ids.extend(str(i) for i in ids)
+        self.codes = np.concatenate([self.codes, codes])
+        self.scales = np.concatenate([self.scales, scales])
+
+    def attach_full_precision(self, path: str):
+        """
+        Attaches a float32 .npy matrix, row-aligned with this store, for re-scoring.
+
+        Rows are normalized at re-scoring time, so the raw embeddings can be used.
+        """
+        full = np.load(path, mmap_mode='r')
+        if full.shape != (len(self), self.dimension):
+            raise ValueError(f"Full-precision matrix has shape {full.shape}, expected {(len(self), self.dimension)}")
+        self.full = full
+
+    def _approximate_scores(self, queries: np.ndarray) -> np.ndarray:
+        scores = np.empty((len(self), len(queries)), dtype=np.float32)
+        for start in range(0, len(self), SCORE_CHUNK_ROWS):
+            block = self.codes[start:start + SCORE_CHUNK_ROWS].astype(np.float32, copy=False)
+            scores[start:start + SCORE_CHUNK_ROWS] = block @ queries.T
+        if self.dtype == 'int8':
+            scores *= self.scales[:, None]
+        return scores.T
+
+    def search_many(self, queries, top_k: int = 10, rescore: bool = True) -> List[List[Tuple[str, float]]]:
+        """
+        Cosine top-k for several queries, as lists of (id, score) pairs, best first.
+
+        Each block of quantized rows is converted to float32 once for all
+        queries, which is where most of the time goes, so batching queries
+        is much cheaper per query than calling search() in a loop.
+
+        Args:
+            queries: A matrix of query vectors, one per row.
+            top_k (int, optional): Number of results per query. Defaults to 10.
+            rescore (bool, optional): Re-score candidates in float32 when a
+                full-precision copy is attached. Defaults to True.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if not len(self):
+            return [[] for _ in queries]
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = np.divide(queries, norms, out=np.zeros_like(queries), where=norms > 0)
+
+        rescore = rescore and self.full is not None
+        k = min(len(self), top_k * RESCORE_FACTOR if rescore else top_k)
+        results = []
+        for query, scores in zip(queries, self._approximate_scores(queries)):
+            rows = np.argpartition(-scores, k - 1)[:k]
+            if rescore:
+                rows.sort()  # sequential reads from the memory map
+                full = np.asarray(self.full[rows], dtype=np.float32)
+                full_norms = np.linalg.norm(full, axis=1)
+                scores = np.divide(full @ query, full_norms, out=np.zeros(len(rows), dtype=np.float32),
+                                   where=full_norms > 0)
+            else:
+                scores = scores[rows]
+            order = np.argsort(-scores, kind='stable')[:top_k]
+            results.append([(self.ids[rows[i]], float(scores[i])) for i in order])
+        return results
+
+    def search(self, query, top_k: int = 10, rescore: bool = True) -> List[Tuple[str, float]]:
+        """Cosine top-k for one query; see search_many."""
+        return self.search_many([query], top_k, rescore)[0]
+
+    def save(self, path: str):
+        """Writes codes, scales and ids to a directory."""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        np.save(path / 'codes.npy', self.codes)
+        np.save(path / 'scales.npy', self.scales)
+        with open(path / 'store.json.tmp', 'w') as f:
+            json.dump({'dimension': self.dimension, 'dtype': self.dtype, 'ids': self.ids}, f)
+        os.replace(path / 'store.json.tmp', path / 'store.json')
+
+    @classmethod
+    def load(cls, path: str, full_precision_path: Optional[str] = None) -> 'QuantizedStore':
+        path = Path(path)
+        with open(path / 'store.json') as f:
+            info = json.load(f)
+        store = cls(info['dimension'], info['dtype'])
+        store.ids = info['ids']
+        store.codes = np.load(path / 'codes.npy')
+        store.scales = np.load(path / 'scales.npy')
+        if full_precision_path:
+            store.attach_full_precision(full_precision_path)
+        return store
+
+
+def benchmark(vectors_path: Optional[str] = None, n: int = 50000, dimension: int = 1536,
+              queries: int = 200, top_k: int = 10, seed: int = 0):
+    """
+    Compares memory, query latency and recall@k of each storage type.
+
+    Recall is measured against exact float32 search. Without a .npy file of
+    real embeddings, clustered synthetic vectors are used (uniform random
+    vectors have no near neighbours and understate recall).
+    """
+    import tempfile
+    import time
+
+    rng = np.random.default_rng(seed)
+    if vectors_path:
+        vectors = np.load(vectors_path, mmap_mode='r')
+        n, dimension = vectors.shape
+        vectors = np.asarray(vectors, dtype=np.float32)
+    else:
+        centers = rng.standard_normal((max(n // 50, 1), dimension)).astype(np.float32)
+        vectors = centers[rng.integers(0, len(centers), n)] + 0.5 * rng.standard_normal((n, dimension)).astype(np.float32)
+    picks = rng.integers(0, n, queries)
+    query_matrix = vectors[picks] + 0.1 * rng.standard_normal((queries, dimension)).astype(np.float32)
+    ids = [str(i) for i in range(n)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        full_path = os.path.join(tmp, 'full.npy')
+        np.save(full_path, vectors)
+
+        reference = QuantizedStore(dimension, 'float32')
+        reference.add(ids, vectors)
+        truth = [{i for i, _ in r} for r in reference.search_many(query_matrix, top_k)]
+
+        rows = []
+        for dtype, rescore in (('float32', False), ('float16', False), ('float16', True),
+                               ('int8', False), ('int8', True)):
+            store = reference if dtype == 'float32' else QuantizedStore(dimension, dtype)
+            if store is not reference:
+                store.add(ids, vectors)
+            if rescore:
+                store.attach_full_precision(full_path)
+            single = min(queries, 20)
+            t0 = time.perf_counter()
+            for q in query_matrix[:single]:
+                store.search(q, top_k, rescore=rescore)
+            t1 = time.perf_counter()
+            results = store.search_many(query_matrix, top_k, rescore=rescore)
+            t2 = time.perf_counter()
+            recall = np.mean([len({i for i, _ in r} & t) / top_k for r, t in zip(results, truth)])
+            rows.append((dtype + (' + rescore' if rescore else ''), store.memory_bytes() / 2 ** 20,
+                         (t1 - t0) / single * 1000, (t2 - t1) / queries * 1000, recall))
+
+    print(f"{n} vectors x {dimension} dims, {queries} queries, recall@{top_k} against float32")
+    print(f"{'Storage':<18}{'RAM (MiB)':>12}{'ms/query':>12}{'batched':>12}{'recall':>10}")
+    for name, mib, latency, batched, recall in rows:
+        print(f"{name:<18}{mib:>12.1f}{latency:>12.2f}{batched:>12.2f}{recall:>10.3f}")
+
+
+if __name__ == "__main__":
+    import sys
+
+    benchmark(sys.argv[1] if len(sys.argv) > 1 else None)
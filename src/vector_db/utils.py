@@ -1,22 +1,127 @@
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional, Sequence
 import numpy as np
 
+try:
+    from urllib3.exceptions import MaxRetryError, ProtocolError, TimeoutError as Urllib3TimeoutError
+except ImportError:  # urllib3 comes with pinecone-client; without it only the built-in errors are checked
+    MaxRetryError = ProtocolError = Urllib3TimeoutError = None
+
+# Rows normalized per pass; bounds the temporary memory of memory-mapped inputs
+NORMALIZE_CHUNK_ROWS = 65536
+
 def normalize_vector(vector: List[float]) -> List[float]:
     """Normalize vector to unit length"""
     norm = np.linalg.norm(vector)
     return (vector / norm).tolist() if norm != 0 else vector
 
+def normalize_vectors(vectors, out: Optional[np.ndarray] = None,
+                      chunk_rows: int = NORMALIZE_CHUNK_ROWS) -> np.ndarray:
+    """
+    Normalize every row of a matrix to unit length in float32.
+
+    Rows are processed in chunks of ``chunk_rows``, so a memory-mapped input
+    is never read into memory as a whole. Zero rows are left as zeros.
+
+    Args:
+        vectors: A 2-D array-like, e.g. a float32 matrix or np.load(..., mmap_mode='r').
+        out (np.ndarray, optional): float32 array to write into; pass the input
+            itself to normalize in place. A read-only ``out``, such as a
+            matrix loaded with mmap_mode='r', is left alone and a new array
+            is returned instead. Defaults to a new array.
+        chunk_rows (int, optional): Rows per pass.
+
+    Returns:
+        np.ndarray: The normalized float32 matrix.
+    """
+    vectors = np.asarray(vectors)
+    if vectors.ndim != 2:
+        raise ValueError(f"Expected a 2-D matrix, got shape {vectors.shape}")
+    if out is None or not out.flags.writeable:
+        out = np.empty(vectors.shape, dtype=np.float32)
+    for start in range(0, len(vectors), chunk_rows):
+        chunk = np.asarray(vectors[start:start + chunk_rows], dtype=np.float32)
+        norms = np.linalg.norm(chunk, axis=1, keepdims=True)
+        np.divide(chunk, norms, out=out[start:start + chunk_rows], where=norms > 0)
+        out[start:start + chunk_rows][(norms == 0).ravel()] = 0
+    return out
+
+# Connection failures worth retrying: dropped or refused connections and timeouts
+TRANSIENT_ERRORS = tuple(e for e in (ConnectionError, TimeoutError, MaxRetryError, ProtocolError,
+                                     Urllib3TimeoutError) if e is not None)
+
+def _status_code(error: BaseException) -> Optional[int]:
+    for owner in (error, getattr(error, "response", None)):
+        for attr in ("status_code", "status"):
+            status = getattr(owner, attr, None)
+            if isinstance(status, int):
+                return status
+    return None
+
+def is_retryable_error(error: BaseException) -> bool:
+    """
+    True for errors a retry can fix: HTTP 429 or 5xx, or a connection or
+    timeout error, including errors raised from one. Anything else, such as
+    a 400 for a malformed vector, fails the same way on every attempt.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, TRANSIENT_ERRORS):
+            return True
+        status = _status_code(error)
+        if status == 429 or (status is not None and 500 <= status < 600):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+def load_vectors(path: str, mmap: bool = True) -> np.ndarray:
+    """Open a .npy matrix, memory-mapped read-only by default so it may exceed RAM."""
+    return np.load(path, mmap_mode='r' if mmap else None)
+
+def iter_batches(
+    vectors,
+    metadata: Optional[Sequence[Dict]] = None,
+    ids: Optional[Sequence[str]] = None,
+    start_id: int = 0,
+    batch_size: int = 10000,
+    normalize: bool = True
+) -> Iterator[List[Dict]]:
+    """
+    Yield upsert-ready vector dicts for a matrix, ``batch_size`` rows at a time.
+
+    Each dict's ``values`` is a float32 row view into the batch's buffer
+    (into the input itself when ``normalize`` is False and it is already
+    float32) rather than a list of Python floats; PineconeManager.upsert_vectors
+    passes these to a local index as they are and converts them to lists
+    one request at a time for Pinecone. Only one batch of the (possibly
+    memory-mapped) input is materialized at once.
+    """
+    for start in range(0, len(vectors), batch_size):
+        chunk = np.asarray(vectors[start:start + batch_size], dtype=np.float32)
+        if normalize:
+            # Into a new buffer: chunk may be a view of the caller's matrix
+            chunk = normalize_vectors(chunk)
+        yield [
+            {
+                'id': str(ids[start + i]) if ids is not None else str(start + i + start_id),
+                'values': row,
+                'metadata': metadata[start + i] if metadata is not None else {}
+            }
+            for i, row in enumerate(chunk)
+        ]
+
 def prepare_batch(
-    vectors: List[List[float]], 
+    vectors: List[List[float]],
     metadata: List[Dict],
     start_id: int = 0
 ) -> List[Dict]:
     """Prepare vectors for batch insertion"""
+    normalized = normalize_vectors(np.asarray(vectors, dtype=np.float32)).tolist()
     return [
         {
             'id': str(i + start_id),
-            'values': normalize_vector(vec),
+            'values': vec,
             'metadata': meta
         }
-        for i, (vec, meta) in enumerate(zip(vectors, metadata))
-    ]
\ No newline at end of file
+        for i, (vec, meta) in enumerate(zip(normalized, metadata))
+    ]